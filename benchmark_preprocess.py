@@ -0,0 +1,97 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse     # ใช้สำหรับรับพารามิเตอร์จาก command line
+import time         # ใช้สำหรับวัดเวลา
+import cv2          # ใช้สำหรับตรวจจับใบหน้าและโมเดล LBPH
+import numpy as np  # ใช้สำหรับจัดการ array ของ label
+from preprocessing import PREPROCESS_PROFILES, FacePreprocessor  # โปรไฟล์ที่ต้องการเปรียบเทียบ
+from training import create_face_detector, crop_face, scan_dataset  # ใช้เตรียมใบหน้าสำหรับเทรน
+
+# ฟังก์ชันแบ่งรูปใน dataset เป็นชุดเทรนและชุดทดสอบ
+def split_dataset(dataset_path):
+    """
+    แบ่งรูปของนักศึกษาแต่ละคนสลับกันเป็นชุดเทรน (ลำดับคู่) และชุดทดสอบ (ลำดับคี่)
+    - คืนค่า (train, test) เป็น list ของ (image_path, person_id)
+    """
+    per_person = {}
+    for image_path, info in scan_dataset(dataset_path).items():
+        per_person.setdefault(info[0], []).append(image_path)
+    train, test = [], []
+    for person_id, paths in sorted(per_person.items()):
+        for i, image_path in enumerate(paths):
+            (train if i % 2 == 0 else test).append((image_path, person_id))
+    return train, test
+
+# ฟังก์ชันวัดผลของแต่ละโปรไฟล์
+def benchmark(dataset_path="dataset", confidence_threshold=65, repeat=3):
+    """
+    เปรียบเทียบเวลาและความแม่นยำของโปรไฟล์การเตรียมภาพใบหน้า
+    - เทรนโมเดลจากชุดเทรน แล้วรู้จำใบหน้าในชุดทดสอบผ่านขั้นตอนเดียวกับตอนรู้จำจริง
+    - เวลาที่วัดคือการตรวจคุณภาพและปรับปรุงภาพต่อหนึ่งใบหน้า (ค่าเฉลี่ยจาก repeat รอบ)
+    - คืนค่า list ของ dict หนึ่งรายการต่อโปรไฟล์
+    """
+    face_detector = create_face_detector()
+    train, test = split_dataset(dataset_path)
+    person_ids = sorted({person_id for _, person_id in train + test})
+    id_to_num = {person_id: idx for idx, person_id in enumerate(person_ids)}
+
+    faces, labels = [], []
+    for image_path, person_id in train:
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        face = crop_face(gray, face_detector) if gray is not None else None
+        if face is not None:
+            faces.append(face)
+            labels.append(id_to_num[person_id])
+    if not faces:
+        raise ValueError("No faces found in training split")
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, np.array(labels))
+
+    # ตัดใบหน้าจากชุดทดสอบแบบเดียวกับ analyze_frame (equalize ทั้งภาพก่อนตรวจจับ)
+    rois = []
+    for image_path, person_id in test:
+        frame = cv2.imread(image_path)
+        if frame is None:
+            continue
+        gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        detected = face_detector.detectMultiScale(gray, 1.1, 5)
+        if len(detected) == 0:
+            continue
+        x, y, w, h = max(detected, key=lambda r: r[2] * r[3])
+        rois.append((gray[y:y+h, x:x+w], id_to_num[person_id]))
+
+    results = []
+    for profile in PREPROCESS_PROFILES:
+        preprocessor = FacePreprocessor(profile)
+        prepared = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            prepared = []
+            for roi, label in rois:
+                passed = preprocessor.quality(roi)[0]
+                prepared.append((passed, preprocessor.enhance(cv2.resize(roi, (200, 200))), label))
+        elapsed = (time.perf_counter() - started) / repeat
+
+        correct = 0
+        for passed, face, label in prepared:
+            predicted, confidence = recognizer.predict(face)
+            correct += predicted == label and confidence < confidence_threshold
+        results.append({
+            'profile': profile,
+            'faces': len(rois),
+            'quality_passed': sum(1 for p in prepared if p[0]),
+            'accuracy': correct / len(rois) if rois else 0.0,
+            'ms_per_face': 1000 * elapsed / len(rois) if rois else 0.0,
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="เปรียบเทียบโปรไฟล์การเตรียมภาพใบหน้า")
+    parser.add_argument("--dataset", default="dataset", help="โฟลเดอร์ dataset")
+    parser.add_argument("--threshold", type=float, default=65, help="confidence threshold")
+    args = parser.parse_args()
+
+    print("Profile\t\tFaces\tQuality\tAccuracy\tms/face")
+    print("-" * 56)
+    for r in benchmark(args.dataset, args.threshold):
+        print(f"{r['profile']:<10}\t{r['faces']}\t{r['quality_passed']}\t"
+              f"{r['accuracy']:.1%}\t\t{r['ms_per_face']:.2f}")
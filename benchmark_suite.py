@@ -0,0 +1,424 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse     # ใช้สำหรับรับพารามิเตอร์จาก command line
+import json         # ใช้สำหรับบันทึกและอ่านผลการวัดเป็น JSON
+import os           # ใช้จัดการไฟล์และโฟลเดอร์
+import platform     # ใช้บันทึกข้อมูลเครื่องที่วัดผล
+import shutil       # ใช้ลบข้อมูลสังเคราะห์จากการวัดครั้งก่อน
+import statistics   # ใช้หาค่ามัธยฐานของเวลาที่วัดได้
+import sys          # ใช้กำหนด exit code เมื่อผลแย่ลงกว่า baseline
+import tempfile     # ใช้สร้างโฟลเดอร์ทำงานชั่วคราว
+import threading    # ใช้จำลองหลาย request อ่านฐานข้อมูลพร้อมกับการบันทึก
+import time         # ใช้สำหรับวัดเวลา
+from datetime import datetime, timedelta  # ใช้สร้างวันที่ของข้อมูลการเข้าเรียนสังเคราะห์
+import cv2          # ใช้สร้างรูปภาพสังเคราะห์และตรวจจับใบหน้า
+import numpy as np  # ใช้สุ่มค่าการแปลงภาพแบบกำหนด seed ได้
+from database import DB_PATH, AttendanceDB, AttendanceRecorder  # ฐานข้อมูลที่ต้องการวัด
+from detection import FastFaceDetector  # ตัวตรวจจับแบบย่อภาพและ ROI
+from face_cache import CACHE_DATA_PATH, CACHE_INDEX_PATH  # cache ใบหน้าที่ต้องล้างก่อนวัด
+from face_pack import convert_student, remove_pack  # ใบหน้าแบบ pack
+from matcher import LBPHMatcher  # ตัวรู้จำแบบ batch
+from model_bundle import BUNDLE_PATH, load_bundle  # โมเดลแบบ binary
+from preprocessing import PREPROCESS_PROFILES, FacePreprocessor  # โปรไฟล์การเตรียมภาพใบหน้า
+from recognize_realtime import detect_faces  # ขั้นตอนตรวจจับเดียวกับตอนรู้จำจริง
+from training import (FACE_SIZE, MANIFEST_PATH, MAPPING_PATH, MODEL_PATH, create_face_detector,
+                      scan_dataset, train_model)  # ขั้นตอนเทรนโมเดล
+
+FIXTURE_PATH = "dataset"  # รูปต้นแบบที่ใช้สร้าง dataset สังเคราะห์ (ต้องมีใบหน้าที่ตรวจจับได้)
+
+# ฟังก์ชันสร้าง dataset สังเคราะห์
+def build_dataset(dataset_path, students, images_per_student, fixture_path=FIXTURE_PATH, seed=0):
+    """
+    สร้าง dataset สังเคราะห์ students คน คนละ images_per_student รูป
+    - แต่ละรูปคือรูปต้นแบบจาก fixture_path ที่ถูกหมุน ย่อขยาย เลื่อน ปรับแสง และเติม noise เล็กน้อย
+    - ใช้ seed เดียวกันจะได้รูปเหมือนเดิมทุกครั้ง
+    - คืนค่า list ของรหัสนักศึกษาที่สร้าง
+    """
+    fixtures = [cv2.imread(p) for p in sorted(scan_dataset(fixture_path))]
+    fixtures = [img for img in fixtures if img is not None]
+    if not fixtures:
+        raise ValueError(f"No fixture images found in {fixture_path}")
+    rng = np.random.default_rng(seed)
+    student_ids = [str(90000000 + i) for i in range(students)]
+    for i, student_id in enumerate(student_ids):
+        folder = os.path.join(dataset_path, student_id)
+        os.makedirs(folder, exist_ok=True)
+        for j in range(images_per_student):
+            img = fixtures[(i * images_per_student + j) % len(fixtures)]
+            h, w = img.shape[:2]
+            matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-8, 8), rng.uniform(0.9, 1.1))
+            matrix[:, 2] += rng.uniform(-20, 20, size=2)
+            out = cv2.warpAffine(img, matrix, (w, h), borderMode=cv2.BORDER_REFLECT)
+            out = out.astype(np.int16) + int(rng.integers(-25, 26))
+            out += rng.normal(0, 4, size=out.shape).astype(np.int16)
+            out = np.clip(out, 0, 255).astype(np.uint8)
+            cv2.imwrite(os.path.join(folder, f"{student_id}_{j}.jpg"), out)
+    return student_ids
+
+# ฟังก์ชันสร้างฐานข้อมูลการเข้าเรียนสังเคราะห์
+def build_database(db_path, students, rows, seed=0):
+    """
+    สร้าง attendance.db ที่มีนักศึกษา students คน และรายการเข้าเรียนประมาณ rows รายการ
+    - หนึ่งรายการต่อคนต่อวัน ย้อนหลังไปจากเมื่อวาน (วันนี้ว่างไว้สำหรับวัดการบันทึก)
+    - คืนค่า list ของรหัสนักศึกษา
+    """
+    rng = np.random.default_rng(seed)
+    student_ids = [str(70000000 + i) for i in range(students)]
+    days = max(1, -(-rows // students))
+    yesterday = datetime.now() - timedelta(days=1)
+    conn = AttendanceDB.connect(db_path)
+    conn.executemany('INSERT OR IGNORE INTO students VALUES (?, ?, ?)',
+                     ((sid, f"Student {sid}", '2024-01-01') for sid in student_ids))
+
+    def generate():
+        for d in range(days):
+            date = (yesterday - timedelta(days=d)).strftime('%Y-%m-%d')
+            seconds = rng.integers(8 * 3600, 10 * 3600, size=students)
+            for sid, s in zip(student_ids, seconds):
+                yield sid, date, f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}"
+
+    conn.executemany('INSERT OR IGNORE INTO attendance (student_id, date, time) VALUES (?, ?, ?)',
+                     generate())
+    conn.commit()
+    conn.close()
+    return student_ids
+
+# ฟังก์ชันสร้างวิดีโอสังเคราะห์
+def build_video_frames(dataset_path, cascade, frames=60, size=(1920, 1080), far_scale=None):
+    """
+    สร้างเฟรมวิดีโอโทนสีเทาขนาด size ที่มีรูปจาก dataset เลื่อนผ่านฉากช้าๆ
+    - ใช้เฉพาะรูปที่ตรวจจับใบหน้าได้ และเปลี่ยนรูปทุก 20 เฟรม (เหมือนมีคนใหม่เดินเข้ามา)
+    - far_scale (เช่น 0.4) เพิ่มคนที่ยืนไกลกว่า (รูปย่อตามสัดส่วนนี้) เข้ามาตั้งแต่ครึ่งหลังของวิดีโอ
+      ใช้ตรวจว่าตัวตรวจจับยังพบใบหน้าขนาดต่างจากใบหน้าที่พบก่อนหน้า
+    - คืนค่า list ของภาพที่ปรับ histogram แล้ว (พร้อมส่งให้ตัวตรวจจับ)
+    """
+    images = []
+    for image_path in sorted(scan_dataset(dataset_path)):
+        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if img is not None and len(detect_faces(cv2.equalizeHist(img), cascade)):
+            images.append(img)
+    if not images:
+        raise ValueError(f"No detectable faces in {dataset_path}")
+    width, height = size
+    background = np.tile(np.linspace(70, 180, width, dtype=np.uint8), (height, 1))
+    far = None
+    if far_scale:
+        far = cv2.resize(images[len(images) // 2], None, fx=far_scale, fy=far_scale,
+                         interpolation=cv2.INTER_AREA)
+    result = []
+    for i in range(frames):
+        img = images[(i // 20 * 7) % len(images)]
+        h, w = img.shape[:2]
+        x = int((width - w) * (0.1 + 0.8 * (i % 20) / 20))
+        y = (height - h) // 2 + int(20 * np.sin(i / 5))
+        frame = background.copy()
+        frame[y:y+h, x:x+w] = img
+        if far is not None and i >= frames // 2:
+            fy = height - far.shape[0] - 40
+            frame[fy:fy+far.shape[0], 40:40+far.shape[1]] = far
+        result.append(cv2.equalizeHist(frame))
+    return result
+
+# ฟังก์ชันนับใบหน้าที่ตัวตรวจจับแบบเร็วพบตรงกับตัวตรวจจับแบบเดิม
+def _matched(reference, boxes):
+    """คืนค่าจำนวนกรอบใน reference ที่มีกรอบใน boxes ซ้อนทับ (IoU) อย่างน้อย 0.5"""
+    matched = 0
+    for (x, y, w, h) in reference:
+        for (bx, by, bw, bh) in boxes:
+            iw = min(x + w, bx + bw) - max(x, bx)
+            ih = min(y + h, by + bh) - max(y, by)
+            if iw > 0 and ih > 0 and iw * ih / float(w * h + bw * bh - iw * ih) >= 0.5:
+                matched += 1
+                break
+    return matched
+
+# ฟังก์ชันเปรียบเทียบการตรวจจับแบบเดิมกับ FastFaceDetector
+def benchmark_detection(frames, cascade, repeat=3, name='video'):
+    """
+    วัดเวลาและ recall ของการตรวจจับใบหน้าบนเฟรมวิดีโอ (ชื่อ metric ขึ้นต้นด้วย name)
+    - full: detect_faces แบบเดิมบนภาพขนาดเต็ม (ใช้เป็นคำตอบอ้างอิง)
+    - downscaled: FastFaceDetector ที่ตรวจทั้งภาพทุกเฟรม (ย่อภาพอย่างเดียว)
+    - roi: FastFaceDetector ที่ตรวจทั้งภาพทุก 5 เฟรม และค้นหาเฉพาะ ROI ระหว่างนั้น
+    - recall คือสัดส่วนของใบหน้าที่แบบเดิมพบ และแบบเร็วพบตรงกัน
+    """
+    reference = [detect_faces(g, cascade) for g in frames]
+    total = sum(len(r) for r in reference)
+    results = {
+        f'{name}_detect_full_ms_per_frame':
+            1000 * _median_time(lambda: [detect_faces(g, cascade) for g in frames], repeat) / len(frames),
+    }
+    for mode, interval in (('downscaled', 1), ('roi', 5)):
+        detections = []
+
+        def run():
+            detector = FastFaceDetector(cascade, full_scan_interval=interval)
+            detections[:] = [detector.detect(g) for g in frames]
+
+        results[f'{name}_detect_{mode}_ms_per_frame'] = 1000 * _median_time(run, repeat) / len(frames)
+        matched = sum(_matched(r, d) for r, d in zip(reference, detections))
+        results[f'{name}_detect_{mode}_recall'] = matched / total if total else 1.0
+    return results
+
+# ฟังก์ชันวัดเวลาหลายรอบ
+def _median_time(func, repeat):
+    """เรียก func repeat ครั้ง และคืนค่ามัธยฐานของเวลา (วินาที)"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+# ฟังก์ชันวัดการอ่านและเขียนฐานข้อมูลพร้อมกัน
+def benchmark_concurrency(db_path, readers=4, duration=2.0):
+    """
+    จำลองหน้าเว็บหลาย request อ่าน dashboard จาก AttendanceDB ตัวเดียวกัน (แบบ web_app)
+    ขณะที่โปรแกรมรู้จำบันทึกการเข้าเรียนผ่าน AttendanceDB อีกตัวหนึ่ง
+    - คืนค่า dict ของ p95 เวลาอ่าน, จำนวนการอ่านและการเขียนต่อวินาที และจำนวน error
+    - รายการที่เขียนระหว่างวัดใช้รหัสปลอม (bench-w-*) และถูกลบหลังวัดเสร็จ
+    """
+    shared = AttendanceDB(db_path)
+    writer_db = AttendanceDB(db_path)
+    stop = threading.Event()
+    read_times = []
+    writes = [0]
+    errors = []
+
+    def read_loop():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                shared.get_dashboard_summary()
+            except Exception as e:
+                errors.append(e)
+            read_times.append(time.perf_counter() - started)
+
+    def write_loop():
+        while not stop.is_set():
+            if writer_db.record_attendance(f"bench-w-{writes[0]}"):
+                writes[0] += 1
+            else:
+                errors.append("write failed")
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)]
+    threads.append(threading.Thread(target=write_loop))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with writer_db.conn:
+        writer_db.conn.execute("DELETE FROM attendance WHERE student_id LIKE 'bench-w-%'")
+    shared.close()
+    writer_db.close()
+    return {
+        'concurrent_read_p95_ms': 1000 * float(np.percentile(read_times, 95)) if read_times else 0.0,
+        'concurrent_reads_per_s': len(read_times) / elapsed,
+        'concurrent_writes_per_s': writes[0] / elapsed,
+        'concurrent_errors': len(errors),
+    }
+
+# ฟังก์ชันวัดผลทุกขั้นตอน
+def run_suite(workdir, students=20, images_per_student=20, db_students=2000, db_rows=1000000,
+              workers=1, repeat=3, seed=0, fixture_path=FIXTURE_PATH):
+    """
+    สร้างข้อมูลสังเคราะห์ใน workdir แล้ววัดเวลาของแต่ละขั้นตอน
+    - ชื่อ metric ลงท้ายด้วยหน่วย: _s และ _ms ยิ่งน้อยยิ่งดี ส่วน _per_s และ _recall ยิ่งมากยิ่งดี
+    - คืนค่า dict ของผลการวัด
+    """
+    fixture_path = os.path.abspath(fixture_path)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)  # ไฟล์โมเดล cache และ attendance.db ถูกสร้างใน workdir ทั้งหมด
+    # ล้างข้อมูลจากการวัดครั้งก่อน เพื่อให้ทุกครั้งเริ่มจากสถานะเดียวกัน
+    shutil.rmtree("dataset", ignore_errors=True)
+    for path in (DB_PATH, DB_PATH + "-wal", DB_PATH + "-shm", CACHE_INDEX_PATH, CACHE_DATA_PATH,
+                 MODEL_PATH, MAPPING_PATH, MANIFEST_PATH, BUNDLE_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+    results = {}
+
+    print("Building synthetic dataset...")
+    build_dataset("dataset", students, images_per_student, fixture_path, seed)
+    print("Building synthetic attendance database...")
+    started = time.perf_counter()
+    db_ids = build_database(DB_PATH, db_students, db_rows, seed)
+    results['db_build_s'] = time.perf_counter() - started
+
+    # การเทรน: ครั้งแรกไม่มี cache และครั้งที่สองใช้ cache ใบหน้าที่ตัดแล้ว
+    print("Timing training...")
+    started = time.perf_counter()
+    recognizer, _ = train_model("dataset", full_rebuild=True, workers=workers)
+    results['train_cold_s'] = time.perf_counter() - started
+    started = time.perf_counter()
+    train_model("dataset", full_rebuild=True, workers=workers)
+    results['train_cached_s'] = time.perf_counter() - started
+
+    # การเทรนจากใบหน้าแบบ pack (ไม่ต้องถอดรหัสรูปหรือตรวจจับใบหน้า) แล้วลบ pack ออก
+    # เพื่อให้ขั้นตอนถัดไปใช้รูปใน dataset เหมือนเดิม
+    person_ids = sorted(os.listdir("dataset"))
+    detector = create_face_detector()
+    for person_id in person_ids:
+        convert_student("dataset", person_id, detector)
+    started = time.perf_counter()
+    train_model("dataset", full_rebuild=True, workers=workers)
+    results['train_packed_s'] = time.perf_counter() - started
+    for person_id in person_ids:
+        remove_pack("dataset", person_id)
+
+    # เวลาเริ่มต้นโปรแกรมรู้จำ: อ่าน face_model.yml เทียบกับ memory-map face_model.bin
+    def read_yml():
+        cv2.face.LBPHFaceRecognizer_create().read(MODEL_PATH)
+    results['model_load_yml_ms'] = 1000 * _median_time(read_yml, repeat)
+    results['model_load_bundle_ms'] = 1000 * _median_time(load_bundle, repeat)
+
+    # การตรวจจับใบหน้าต่อเฟรม ใช้รูปใน dataset สังเคราะห์เป็นเฟรมวิดีโอ
+    print("Timing detection, preprocessing and prediction...")
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    frames = [cv2.equalizeHist(cv2.imread(p, cv2.IMREAD_GRAYSCALE))
+              for p in sorted(scan_dataset("dataset"))[:50]]
+    rois = []
+    detect_time = _median_time(lambda: [detect_faces(g, cascade) for g in frames], repeat)
+    results['detect_ms_per_frame'] = 1000 * detect_time / len(frames)
+    for gray in frames:
+        for (x, y, w, h) in detect_faces(gray, cascade):
+            rois.append(gray[y:y+h, x:x+w])
+    results['faces_detected'] = len(rois)
+    results.update(benchmark_detection(build_video_frames("dataset", cascade), cascade, repeat))
+    results.update(benchmark_detection(build_video_frames("dataset", cascade, far_scale=0.4),
+                                       cascade, repeat, name='mixed'))
+
+    faces = []
+    for profile in PREPROCESS_PROFILES:
+        preprocessor = FacePreprocessor(profile)
+        elapsed = _median_time(lambda: [(preprocessor.quality(r), preprocessor.enhance(cv2.resize(r, FACE_SIZE)))
+                                        for r in rois], repeat)
+        results[f'preprocess_{profile}_ms_per_face'] = 1000 * elapsed / max(1, len(rois))
+        faces = [preprocessor.enhance(cv2.resize(r, FACE_SIZE)) for r in rois]
+
+    # การรู้จำ: OpenCV ทีละใบหน้า เทียบกับ LBPHMatcher แบบ batch
+    matcher = LBPHMatcher.from_recognizer(recognizer)
+    elapsed = _median_time(lambda: [recognizer.predict(f) for f in faces], repeat)
+    results['predict_opencv_ms_per_face'] = 1000 * elapsed / max(1, len(faces))
+    elapsed = _median_time(lambda: matcher.match(faces), repeat)
+    results['predict_matcher_ms_per_face'] = 1000 * elapsed / max(1, len(faces))
+
+    # การบันทึกการเข้าเรียน: ทีละรายการผ่าน AttendanceDB และแบบ batch ผ่าน AttendanceRecorder
+    print("Timing attendance inserts...")
+    db = AttendanceDB(DB_PATH)
+    sample = db_ids[:min(200, len(db_ids))]
+    db.conn.execute('DELETE FROM attendance WHERE date = ?', (datetime.now().strftime('%Y-%m-%d'),))
+    db.conn.commit()
+    started = time.perf_counter()
+    for sid in sample:
+        db.record_attendance(sid)
+    results['insert_single_per_s'] = len(sample) / (time.perf_counter() - started)
+
+    when = datetime.now() + timedelta(days=1)
+    recorder = AttendanceRecorder(DB_PATH)
+    started = time.perf_counter()
+    for sid in db_ids:
+        recorder.record(sid, when)
+    recorder.close()
+    results['insert_batched_per_s'] = len(db_ids) / (time.perf_counter() - started)
+
+    # หน้า dashboard: render ผ่าน Flask test client (import หลัง chdir เพื่อใช้ฐานข้อมูลสังเคราะห์)
+    print("Timing dashboard render...")
+    import web_app
+    client = web_app.app.test_client()
+    client.get('/')
+    results['dashboard_ms'] = 1000 * _median_time(lambda: client.get('/'), repeat)
+    results['api_attendance_ms'] = 1000 * _median_time(lambda: client.get('/api/attendance?after=0'), repeat)
+    results['report_students_ms'] = 1000 * _median_time(lambda: client.get('/api/report/students'), repeat)
+
+    print("Timing concurrent reads and writes...")
+    results.update(benchmark_concurrency(DB_PATH))
+    return results
+
+# ฟังก์ชันเปรียบเทียบผลกับ baseline
+def compare(results, baseline, tolerance=0.2):
+    """
+    เปรียบเทียบผลกับ baseline และคืนค่า list ของ (metric, baseline, ปัจจุบัน, อัตราส่วน, แย่ลงหรือไม่)
+    - metric ที่ลงท้ายด้วย _per_s หรือ _recall ยิ่งมากยิ่งดี metric ที่ลงท้ายด้วย _s หรือ _ms ยิ่งน้อยยิ่งดี
+    - ถือว่าแย่ลงเมื่อต่างจาก baseline เกิน tolerance (0.2 = 20%)
+    - metric ที่ลงท้ายด้วย _errors ถือว่าแย่ลงทุกครั้งที่ไม่เป็น 0 (ไม่ขึ้นกับ baseline)
+    """
+    rows = []
+    for metric, new in results.items():
+        if metric.endswith('_errors'):
+            old = baseline.get(metric, 0)
+            ratio = new / old if old else (float('inf') if new else 1.0)
+            rows.append((metric, old, new, ratio, new > 0))
+    for metric, old in baseline.items():
+        new = results.get(metric)
+        if (new is None or not old or not isinstance(old, (int, float))
+                or metric.endswith('_errors')):
+            continue
+        ratio = new / old
+        if metric.endswith('_per_s') or metric.endswith('_recall'):
+            regressed = ratio < 1 - tolerance
+        elif metric.endswith('_s') or metric.endswith('_ms') or '_ms_' in metric:
+            regressed = ratio > 1 + tolerance
+        else:
+            regressed = False
+        rows.append((metric, old, new, ratio, regressed))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="วัดประสิทธิภาพการเทรน การรู้จำ ฐานข้อมูล และหน้าเว็บด้วยข้อมูลสังเคราะห์")
+    parser.add_argument("--students", type=int, default=20, help="จำนวนนักศึกษาใน dataset สังเคราะห์")
+    parser.add_argument("--images", type=int, default=20, help="จำนวนรูปต่อนักศึกษา")
+    parser.add_argument("--db-students", type=int, default=2000, help="จำนวนนักศึกษาในฐานข้อมูลสังเคราะห์")
+    parser.add_argument("--db-rows", type=int, default=1000000, help="จำนวนรายการเข้าเรียนในฐานข้อมูลสังเคราะห์")
+    parser.add_argument("--workers", type=int, default=1, help="จำนวน process ตอนเทรน (0 = ทุกคอร์)")
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบการวัดแต่ละขั้นตอน")
+    parser.add_argument("--seed", type=int, default=0, help="seed ของข้อมูลสังเคราะห์")
+    parser.add_argument("--fixtures", default=FIXTURE_PATH, help="โฟลเดอร์รูปต้นแบบ")
+    parser.add_argument("--workdir", help="โฟลเดอร์ทำงาน (ค่าเริ่มต้น: โฟลเดอร์ชั่วคราว)")
+    parser.add_argument("--output", help="บันทึกผลเป็นไฟล์ JSON")
+    parser.add_argument("--baseline", help="ไฟล์ JSON ของผลครั้งก่อนสำหรับเปรียบเทียบ")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="สัดส่วนที่ยอมให้แย่ลงได้")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    fixtures = os.path.abspath(args.fixtures)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="scancheck-bench-")
+    results = run_suite(workdir, args.students, args.images, args.db_students, args.db_rows,
+                        args.workers, args.repeat, args.seed, fixtures)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'params': {k: v for k, v in vars(args).items()
+                       if k not in ('output', 'baseline', 'tolerance', 'workdir', 'fixtures')},
+        },
+        'results': {k: round(v, 3) for k, v in results.items()},
+    }
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    failed = [metric for metric, value in results.items() if metric.endswith('_errors') and value]
+    if failed and not baseline_path:
+        print(f"Errors during benchmark: {', '.join(failed)}")
+        sys.exit(1)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline['meta']['params'] != report['meta']['params']:
+            print("Warning: baseline was measured with different parameters")
+        rows = compare(results, baseline['results'], args.tolerance)
+        print("\nMetric\t\t\t\tBaseline\tCurrent\t\tRatio")
+        print("-" * 72)
+        for metric, old, new, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{metric:<32}{old:<16.3f}{new:<16.3f}{ratio:.2f}{flag}")
+        if any(row[4] for row in rows):
+            sys.exit(1)
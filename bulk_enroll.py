@@ -0,0 +1,219 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse    # ใช้สำหรับรับพารามิเตอร์จาก command line
+import csv         # ใช้อ่านรายชื่อนักศึกษาจากงานทะเบียน
+import os          # ใช้จัดการไฟล์และโฟลเดอร์
+import zipfile     # ใช้อ่านรูปจากไฟล์ zip โดยไม่ต้องแตกไฟล์
+from concurrent.futures import ProcessPoolExecutor  # ใช้ตัดใบหน้าแบบหลาย process
+import cv2         # ใช้ถอดรหัสรูปและตรวจจับใบหน้า
+import numpy as np  # ใช้แปลงข้อมูลรูปเป็น array
+from database import AttendanceDB  # ใช้บันทึกรายชื่อนักศึกษา
+from face_pack import pack_path, remove_pack  # ใช้จัดการใบหน้าแบบ pack ของนักศึกษาเดิม
+from roster import skip_header  # ใช้ตรวจบรรทัดหัวตารางแบบเดียวกับรายชื่อกลุ่มเรียน
+from training import TRAIN_CHUNK_SIZE, create_face_detector, train_model  # ใช้เทรนโมเดลครั้งเดียวตอนท้าย
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+DETECT_MAX_SIDE = 800  # ย่อรูปให้ด้านยาวไม่เกินค่านี้ก่อนตรวจจับใบหน้า
+SAVE_MAX_SIDE = 400    # ขนาดสูงสุดของรูปใบหน้าที่บันทึกลง dataset
+FACE_MARGIN = 0.5      # ขอบรอบใบหน้าที่ตัดเก็บ (เหมือน capture_faces.py)
+
+# ฟังก์ชันอ่านรายชื่อนักศึกษา
+def read_roster(path):
+    """
+    อ่านรายชื่อจากไฟล์ CSV (คอลัมน์แรกคือรหัสนักศึกษา คอลัมน์ที่สองคือชื่อ)
+    - ข้ามบรรทัดว่าง และบรรทัดหัวตาราง (เช่น student_id,name)
+    - คืนค่า dict ของ {student_id: name}
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    rows = skip_header(rows, path)
+    return {row[0].strip(): (row[1].strip() if len(row) > 1 else '') for row in rows}
+
+# ฟังก์ชันจับคู่รูปกับรหัสนักศึกษา
+def match_photos(names, student_ids):
+    """
+    จับคู่ไฟล์รูปกับรหัสนักศึกษาในรายชื่อ
+    - ใช้ชื่อโฟลเดอร์ (<รหัส>/รูป.jpg) หรือชื่อไฟล์ (<รหัส>.jpg, <รหัส>_1.jpg, <รหัส>-2.jpg)
+    - คืนค่า ({student_id: [ชื่อไฟล์]}, [ชื่อไฟล์ที่ไม่ตรงกับรหัสใด])
+    """
+    photos = {}
+    unmatched = []
+    for name in sorted(names):
+        if not name.lower().endswith(PHOTO_EXTENSIONS):
+            continue
+        parts = name.replace('\\', '/').split('/')
+        stem = os.path.splitext(parts[-1])[0]
+        candidates = [stem, stem.split('_')[0], stem.split('-')[0]]
+        if len(parts) > 1:
+            candidates.insert(0, parts[-2])
+        student_id = next((c for c in candidates if c in student_ids), None)
+        if student_id is None:
+            unmatched.append(name)
+        else:
+            photos.setdefault(student_id, []).append(name)
+    return photos, unmatched
+
+# ฟังก์ชันแสดงรายการไฟล์ในโฟลเดอร์หรือไฟล์ zip
+def list_archive(archive):
+    """คืนค่าชื่อไฟล์ทั้งหมดใน archive (path สัมพัทธ์ถ้าเป็นโฟลเดอร์ หรือชื่อ member ถ้าเป็น zip)"""
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            return [info.filename for info in zf.infolist() if not info.is_dir()]
+    names = []
+    for root, _, files in os.walk(archive):
+        names.extend(os.path.relpath(os.path.join(root, f), archive) for f in files)
+    return names
+
+# detector ของแต่ละ process ใน process pool (สร้างครั้งแรกที่ใช้งาน)
+_worker_detector = None
+
+# ฟังก์ชันตัดใบหน้าพร้อมขอบจากรูปหนึ่งรูป
+def crop_photo(image, face_detector):
+    """
+    ตรวจจับใบหน้าที่ใหญ่ที่สุดบนรูปที่ย่อแล้ว และตัดจากรูปขนาดเต็มพร้อมขอบ FACE_MARGIN
+    - คืนค่ารูปใบหน้า (ไม่เกิน SAVE_MAX_SIDE พิกเซล) หรือ None ถ้าไม่พบใบหน้า
+    """
+    scale = min(1.0, DETECT_MAX_SIDE / float(max(image.shape[:2])))
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    faces = face_detector.detectMultiScale(gray, 1.1, 5, minSize=(40, 40))
+    if len(faces) == 0:
+        return None
+    x, y, w, h = [int(v / scale) for v in max(faces, key=lambda r: r[2] * r[3])]
+    margin_x, margin_y = int(w * FACE_MARGIN), int(h * FACE_MARGIN)
+    face = image[max(0, y - margin_y):min(image.shape[0], y + h + margin_y),
+                 max(0, x - margin_x):min(image.shape[1], x + w + margin_x)]
+    shrink = min(1.0, SAVE_MAX_SIDE / float(max(face.shape[:2])))
+    if shrink < 1.0:
+        face = cv2.resize(face, None, fx=shrink, fy=shrink, interpolation=cv2.INTER_AREA)
+    return face
+
+# ฟังก์ชันนำเข้ารูปของนักศึกษาหนึ่งคน (ทำงานใน process ลูกได้)
+def enroll_student(task):
+    """
+    ถอดรหัสรูป ตัดใบหน้า และบันทึกลง dataset/<student_id>/ ของนักศึกษาหนึ่งคน
+    - รูปของนักศึกษาคนเดียวกันอยู่ใน task เดียว จึงไม่มีสอง process เขียนโฟลเดอร์เดียวกัน
+    - replace=True ลบรูปเดิมในโฟลเดอร์และ pack ก่อน (เหมือนการอัปเดตใน capture_faces.py)
+    - คืนค่า (student_id, จำนวนรูปที่บันทึก, list ของ (ชื่อไฟล์, สาเหตุ) ที่ใช้ไม่ได้)
+    """
+    global _worker_detector
+    student_id, archive, names, dataset_path, replace = task
+    if _worker_detector is None:
+        _worker_detector = create_face_detector()
+
+    folder = os.path.join(dataset_path, student_id)
+    os.makedirs(folder, exist_ok=True)
+    if replace:
+        for file in os.listdir(folder):
+            os.remove(os.path.join(folder, file))
+        remove_pack(dataset_path, student_id)
+    existing = set(os.listdir(folder))
+
+    zf = zipfile.ZipFile(archive) if zipfile.is_zipfile(archive) else None
+    saved = 0
+    failures = []
+    index = 0
+    try:
+        for name in names:
+            data = zf.read(name) if zf else np.fromfile(os.path.join(archive, name), dtype=np.uint8)
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                failures.append((name, "unreadable"))
+                continue
+            face = crop_photo(image, _worker_detector)
+            if face is None:
+                failures.append((name, "no face"))
+                continue
+            while f"{student_id}_import_{index}.jpg" in existing:
+                index += 1
+            img_path = os.path.join(folder, f"{student_id}_import_{index}.jpg")
+            if cv2.imwrite(img_path, face):
+                existing.add(os.path.basename(img_path))
+                saved += 1
+            else:
+                failures.append((name, "could not save"))
+    finally:
+        if zf:
+            zf.close()
+    if not saved and not os.listdir(folder):
+        os.rmdir(folder)
+    return student_id, saved, failures
+
+# ฟังก์ชันหลักสำหรับนำเข้านักศึกษาจำนวนมาก
+def bulk_enroll(roster_path, archive, dataset_path="dataset", workers=0, replace=False,
+                section=None, train=True, chunk_size=TRAIN_CHUNK_SIZE):
+    """
+    นำเข้านักศึกษาจากรายชื่อ CSV และรูปจากงานทะเบียน (โฟลเดอร์หรือไฟล์ zip)
+    - ตัดใบหน้าและบันทึกลง dataset/<student_id>/ แบบขนานด้วย workers process (0 = ทุกคอร์)
+    - บันทึกนักศึกษาที่มีรูปใบหน้าอย่างน้อยหนึ่งรูปลงฐานข้อมูลใน transaction เดียว
+      (และเพิ่มเข้ากลุ่มเรียน section ถ้ากำหนด)
+    - เทรนโมเดลครั้งเดียวตอนท้าย (เทรนเพิ่มเฉพาะรูปใหม่)
+    - คืนค่าจำนวนนักศึกษาที่นำเข้าสำเร็จ
+    """
+    roster = read_roster(roster_path)
+    photos, unmatched = match_photos(list_archive(archive), roster)
+    print(f"Roster: {len(roster)} students, photos found for {len(photos)}")
+
+    tasks = [(sid, archive, names, dataset_path, replace) for sid, names in sorted(photos.items())]
+    workers = workers or os.cpu_count() or 1
+    enrolled = []
+    failures = []
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(enroll_student, tasks, chunksize=max(1, len(tasks) // (workers * 8)))
+            for done, (sid, saved, failed) in enumerate(results, 1):
+                if saved:
+                    enrolled.append(sid)
+                failures.extend(failed)
+                if done % 100 == 0:
+                    print(f"  {done}/{len(tasks)} students processed")
+    else:
+        for sid, saved, failed in map(enroll_student, tasks):
+            if saved:
+                enrolled.append(sid)
+            failures.extend(failed)
+
+    for name, reason in failures:
+        print(f"Skipped {name} ({reason})")
+    if unmatched:
+        print(f"Skipped {len(unmatched)} photos that match no student ID in the roster")
+    packed = [sid for sid in enrolled if os.path.exists(pack_path(dataset_path, sid))]
+    if packed:
+        print(f"{len(packed)} students already have a face pack, which is used instead of the new "
+              f"photos (use --replace, or run face_pack.py again): {', '.join(packed)}")
+    missing = sorted(set(roster) - set(enrolled))
+    if missing:
+        print(f"No usable photo for {len(missing)} students: {', '.join(missing)}")
+    if not enrolled:
+        print("No students enrolled")
+        return 0
+
+    db = AttendanceDB()
+    try:
+        db.add_students([(sid, roster[sid]) for sid in enrolled])
+        if section:
+            db.add_to_roster(section, enrolled)
+    finally:
+        db.close()
+    print(f"Enrolled {len(enrolled)} students")
+
+    if train:
+        train_model(dataset_path, workers=workers, chunk_size=chunk_size)
+    return len(enrolled)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="นำเข้านักศึกษาจำนวนมากจากรายชื่อ CSV และรูปถ่าย")
+    parser.add_argument("roster", help="ไฟล์ CSV: รหัสนักศึกษา,ชื่อ")
+    parser.add_argument("photos", help="โฟลเดอร์หรือไฟล์ zip ของรูป (ชื่อไฟล์หรือโฟลเดอร์เป็นรหัสนักศึกษา)")
+    parser.add_argument("--workers", type=int, default=0, help="จำนวน process (0 = ทุกคอร์)")
+    parser.add_argument("--replace", action="store_true", help="ลบรูปเดิมของนักศึกษาที่นำเข้าก่อน")
+    parser.add_argument("--section", help="เพิ่มนักศึกษาที่นำเข้าเข้ากลุ่มเรียนนี้ด้วย")
+    parser.add_argument("--no-train", action="store_true", help="ไม่ต้องเทรนโมเดลหลังนำเข้า")
+    parser.add_argument("--chunk-size", type=int, default=TRAIN_CHUNK_SIZE,
+                        help="จำนวนรูปที่ตัดใบหน้าและเทรนต่อครั้ง")
+    args = parser.parse_args()
+
+    if not os.path.exists("dataset"):
+        os.makedirs("dataset")
+    bulk_enroll(args.roster, args.photos, workers=args.workers, replace=args.replace,
+                section=args.section, train=not args.no_train, chunk_size=max(1, args.chunk_size))
@@ -1,15 +1,21 @@
 import cv2
+import numpy as np
 import os
-import sqlite3
+import queue
+import threading
+import time
 from datetime import datetime
+from database import AttendanceDB
+from face_pack import remove_pack
+from preprocessing import check_face_quality
+
+CAPTURE_COUNT = 20           # Number of images captured per student
+AUTO_CAPTURE_INTERVAL = 0.2  # Minimum seconds between two automatic shots
+AUTO_MAX_SIMILARITY = 0.92   # Reject a shot whose thumbnail correlates more than this with a kept shot
 
 def init_database():
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS students
-                 (student_id TEXT PRIMARY KEY, name TEXT, register_date DATE)''')
-    conn.commit()
-    return conn
+    """Open attendance.db with the schema migrated to the latest version"""
+    return AttendanceDB.connect()
 
 def create_dataset_folder(student_id):
     """Create folder for student images if not exists"""
@@ -18,6 +24,99 @@ def create_dataset_folder(student_id):
         os.makedirs(path)
     return path
 
+def crop_with_margin(frame, box):
+    """Crop a detected face from frame with a 50% margin on each side"""
+    x, y, w, h = box
+    # เพิ่มขอบรอบใบหน้า 50%
+    margin_x = int(w * 0.5)
+    margin_y = int(h * 0.5)
+    
+    # คำนวณพื้นที่ใหม่โดยเพิ่มขอบ
+    x1 = max(0, x - margin_x)
+    y1 = max(0, y - margin_y)
+    x2 = min(frame.shape[1], x + w + margin_x)
+    y2 = min(frame.shape[0], y + h + margin_y)
+    
+    # ตัดภาพใบหน้าพร้อมขอบ
+    return frame[y1:y2, x1:x2].copy()
+
+class ImageWriter:
+    """
+    Write images on a background thread so the camera preview never waits for JPEG encoding
+    - save() only queues the image
+    - close() waits until every queued image is written
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.failed = []  # paths that could not be written
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def save(self, path, image):
+        """Queue image to be written to path"""
+        self._queue.put((path, image))
+
+    def _write_loop(self):
+        """Encode and write queued images until close() is called"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, image = item
+            if cv2.imwrite(path, image):
+                self.written += 1
+            else:
+                self.failed.append(path)
+
+    def close(self):
+        """Write all remaining images, then stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+class AutoCaptureSelector:
+    """
+    Decide which frames to keep in auto-capture mode
+    - the face must pass check_face_quality (sharpness and brightness)
+    - the face must look different enough from every shot already kept
+      (normalized correlation of a 32x32 thumbnail, so a new head pose or expression is needed)
+    - shots are at least AUTO_CAPTURE_INTERVAL seconds apart
+    """
+
+    def __init__(self, max_similarity=AUTO_MAX_SIMILARITY, interval=AUTO_CAPTURE_INTERVAL):
+        self.max_similarity = max_similarity
+        self.interval = interval
+        self.kept = []  # normalized thumbnails of kept shots
+        self.last_time = 0.0
+
+    @staticmethod
+    def _thumbnail(face):
+        """Zero-mean, unit-length 32x32 thumbnail of an equalized grayscale face"""
+        thumb = cv2.resize(cv2.equalizeHist(face), (32, 32), interpolation=cv2.INTER_AREA)
+        thumb = thumb.astype(np.float32).ravel()
+        thumb -= thumb.mean()
+        return thumb / (np.linalg.norm(thumb) + 1e-6)
+
+    def consider(self, gray, box):
+        """
+        Check the face at box in a grayscale frame
+        - returns (accepted, reason) where reason explains a rejection for the preview
+        """
+        now = time.monotonic()
+        if now - self.last_time < self.interval:
+            return False, ""
+        x, y, w, h = box
+        face = cv2.resize(gray[y:y+h, x:x+w], (200, 200))
+        if not check_face_quality(face):
+            return False, "Hold still / improve lighting"
+        thumb = self._thumbnail(face)
+        if self.kept and max(float(np.dot(thumb, k)) for k in self.kept) > self.max_similarity:
+            return False, "Turn your head slowly"
+        self.kept.append(thumb)
+        self.last_time = now
+        return True, ""
+
 def capture_faces():
     conn = init_database()
     cap = cv2.VideoCapture(0)
@@ -59,6 +158,8 @@ def capture_faces():
                 if os.path.exists(dataset_path):
                     for file in os.listdir(dataset_path):
                         os.remove(os.path.join(dataset_path, file))
+                # A face pack would take precedence over the new images
+                remove_pack("dataset", student_id)
                 break
             else:
                 continue
@@ -75,11 +176,18 @@ def capture_faces():
             break
 
     dataset_path = create_dataset_folder(student_id)
-    print(f"Press 'c' to capture face (20 remaining)")
+    auto = input("Use auto capture? (y/n): ").lower() != 'n'
+    if auto:
+        print("Auto capture: look at the camera and turn your head slowly")
+    else:
+        print(f"Press 'c' to capture face ({CAPTURE_COUNT} remaining)")
     print("Press 'q' to quit")
     
+    writer = ImageWriter()
+    selector = AutoCaptureSelector()
     count = 0
-    while count < 20:  # Changed from 10 to 20
+    hint = ""
+    while count < CAPTURE_COUNT:
         ret, frame = cap.read()
         if not ret:
             print("Error: Could not read frame")
@@ -88,42 +196,37 @@ def capture_faces():
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = face_cascade.detectMultiScale(gray, 1.3, 5)
         
-        # Draw rectangle and text
+        # Auto capture needs exactly one face so the shot belongs to this student
+        if auto and len(faces) == 1:
+            accepted, reason = selector.consider(gray, faces[0])
+            hint = reason or hint
+            if accepted:
+                img_path = os.path.join(dataset_path, f"{student_id}_{count}.jpg")
+                writer.save(img_path, crop_with_margin(frame, faces[0]))
+                count += 1
+                hint = ""
+                print(f"Captured image {count}/{CAPTURE_COUNT} - Saving to {img_path}")
+        
+        # Draw rectangle and text on a copy, so saved images stay clean
+        display = frame.copy()
         for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-            cv2.putText(frame, f"Face detected! Press 'c' to capture", (x, y-10), 
+            cv2.rectangle(display, (x, y), (x+w, y+h), (255, 0, 0), 2)
+            label = f"Auto {count}/{CAPTURE_COUNT} {hint}" if auto else "Face detected! Press 'c' to capture"
+            cv2.putText(display, label, (x, y-10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
             
-        cv2.imshow('Capturing Face', frame)
+        cv2.imshow('Capturing Face', display)
         
         key = cv2.waitKey(1) & 0xFF
-        if key == ord('c'):
+        if key == ord('c') and not auto:
             if len(faces) > 0:
-                x, y, w, h = faces[0]  # Get first detected face
-                
-                # เพิ่มขอบรอบใบหน้า 50%
-                margin_x = int(w * 0.5)
-                margin_y = int(h * 0.5)
-                
-                # คำนวณพื้นที่ใหม่โดยเพิ่มขอบ
-                x1 = max(0, x - margin_x)
-                y1 = max(0, y - margin_y)
-                x2 = min(frame.shape[1], x + w + margin_x)
-                y2 = min(frame.shape[0], y + h + margin_y)
-                
-                # ตัดภาพใบหน้าพร้อมขอบ
-                face_img = frame[y1:y2, x1:x2]
-                
-                # บันทึกภาพ
+                # บันทึกภาพ (เขียนไฟล์ใน thread เบื้องหลัง)
                 img_path = os.path.join(dataset_path, f"{student_id}_{count}.jpg")
-                
-                if cv2.imwrite(img_path, face_img):
-                    print(f"Captured image {count+1}/20 - Saved to {img_path}")  # Changed from 10 to 20
-                    count += 1
-                    if count < 20:  # Changed from 10 to 20
-                        print(f"Press 'c' to capture ({20-count} remaining)")  # Changed from 10 to 20
-                else:
-                    print("Error: Could not save image")
+                writer.save(img_path, crop_with_margin(frame, faces[0]))  # Get first detected face
+                print(f"Captured image {count+1}/{CAPTURE_COUNT} - Saving to {img_path}")
+                count += 1
+                if count < CAPTURE_COUNT:
+                    print(f"Press 'c' to capture ({CAPTURE_COUNT-count} remaining)")
             else:
                 print("No face detected! Please try again")
                 
@@ -132,11 +235,14 @@ def capture_faces():
     
     cap.release()
     cv2.destroyAllWindows()
+    writer.close()
+    for path in writer.failed:
+        print(f"Error: Could not save image {path}")
     
-    if count == 20:  # Changed from 10 to 20
-        print("Successfully captured all 20 images!")  # Changed from 10 to 20
+    if writer.written == CAPTURE_COUNT:
+        print(f"Successfully captured all {CAPTURE_COUNT} images!")
     else:
-        print(f"Captured {count} images before exiting")
+        print(f"Captured {writer.written} images before exiting")
 
 if __name__ == "__main__":
     if not os.path.exists("dataset"):
@@ -1,40 +1,294 @@
 # นำเข้าไลบรารีที่จำเป็น
-import sqlite3  # สำหรับจัดการฐานข้อมูล SQLite
+import bisect     # สำหรับนับวันเรียนตั้งแต่วันลงทะเบียนของแต่ละคน
+import contextlib  # สำหรับยืมการเชื่อมต่อจาก pool ด้วย with
+import functools  # สำหรับสร้าง decorator จับเวลา query
+import queue      # สำหรับคิวส่งข้อมูลให้ thread เขียนฐานข้อมูล
+import sqlite3    # สำหรับจัดการฐานข้อมูล SQLite
+import threading  # สำหรับ thread เขียนฐานข้อมูลเบื้องหลัง
+import time       # สำหรับกำหนดเวลารอสะสมรายการก่อน commit
 from datetime import datetime, timedelta  # สำหรับจัดการวันที่และเวลา
+from metrics import StageMetrics  # สำหรับเก็บเวลาของแต่ละ query
+
+DB_PATH = 'attendance.db'  # ไฟล์ฐานข้อมูลที่ทุกโปรแกรมใช้ร่วมกัน
+BUSY_TIMEOUT_MS = 5000     # เวลารอ (มิลลิวินาที) เมื่อโปรแกรมอื่นกำลังเขียน แทนการ error ทันที
+CACHE_SIZE_KB = 16384      # page cache ของแต่ละการเชื่อมต่อ
+POOL_SIZE = 8              # จำนวนการเชื่อมต่อว่างสูงสุดที่เก็บไว้ใช้ซ้ำใน AttendanceDB
+WRITE_RETRIES = 4          # จำนวนครั้งที่ AttendanceRecorder ลองเขียนชุดรายการซ้ำเมื่อเกิด error
+WRITE_RETRY_DELAY = 0.5    # เวลารอ (วินาที) ก่อนลองใหม่ครั้งแรก (เพิ่มเป็นสองเท่าทุกครั้ง)
+
+# ฟังก์ชันตั้งค่าการเชื่อมต่อฐานข้อมูล
+def configure_connection(conn):
+    """
+    ตั้งค่าการเชื่อมต่อให้หลายโปรแกรม/หลาย thread ใช้ฐานข้อมูลพร้อมกันได้
+    - WAL: ผู้อ่าน (หน้าเว็บ) ไม่ขวางผู้เขียน (โปรแกรมรู้จำ) และผู้เขียนไม่ขวางผู้อ่าน
+    - busy_timeout: รอเมื่อมีผู้เขียนอื่นถือ lock อยู่ แทนการ error "database is locked"
+    - synchronous=NORMAL: ปลอดภัยเมื่อใช้ WAL และ commit เร็วกว่า FULL
+    - cache_size: page cache ของการเชื่อมต่อ (pool ใช้การเชื่อมต่อซ้ำ cache จึงยังอยู่)
+    """
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    return conn
+
+# Migration 1: ตารางพื้นฐาน
+def _create_base_tables(conn):
+    """
+    สร้างตาราง students และ attendance
+    - ฐานข้อมูลเดิมที่สร้างจาก recognize_realtime.py ไม่มีคอลัมน์ id ในตาราง attendance
+      จึงสร้างตารางใหม่และคัดลอกข้อมูลเดิมมา
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS students
+                    (student_id TEXT PRIMARY KEY,
+                     name TEXT,
+                     register_date DATE)''')
+    columns = [r[1] for r in conn.execute('PRAGMA table_info(attendance)')]
+    if 'id' in columns:
+        return
+    if columns:
+        conn.execute('ALTER TABLE attendance RENAME TO attendance_old')
+    conn.execute('''CREATE TABLE attendance
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     student_id TEXT,
+                     date DATE,
+                     time TIME,
+                     FOREIGN KEY(student_id) REFERENCES students(student_id))''')
+    if columns:
+        conn.execute('''INSERT INTO attendance (student_id, date, time)
+                        SELECT student_id, date, time FROM attendance_old
+                        ORDER BY date, time''')
+        conn.execute('DROP TABLE attendance_old')
+
+# Migration 2: index และกฎหนึ่งรายการต่อคนต่อวัน
+def _add_attendance_indexes(conn):
+    """
+    เพิ่ม index ของตาราง attendance
+    - ลบรายการซ้ำในวันเดียวกัน โดยเก็บรายการที่เวลาเร็วที่สุดไว้
+    - unique index บน (student_id, date) ใช้ทั้งบังคับกฎหนึ่งรายการต่อวันและค้นหาตามนักศึกษา
+    - index บน (date, time) สำหรับหน้า dashboard และการค้นหาประวัติ
+    """
+    conn.execute('''DELETE FROM attendance WHERE id NOT IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (
+                                PARTITION BY student_id, date ORDER BY time, id) AS rn
+                            FROM attendance)
+                        WHERE rn = 1)''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_student_date
+                    ON attendance(student_id, date)''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_date_time
+                    ON attendance(date, time)''')
+
+# Migration 3: รายชื่อนักศึกษาของแต่ละกลุ่มเรียน (ใช้แบ่งโมเดลเป็น shard)
+def _add_rosters(conn):
+    """
+    สร้างตาราง sections (กลุ่มเรียนหรือห้อง) และ roster (นักศึกษาในแต่ละกลุ่ม)
+    - primary key (section_id, student_id) ใช้ดึงรายชื่อของกลุ่มเรียน
+    - index บน student_id ใช้ลบนักศึกษาออกจากทุกกลุ่ม
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS sections
+                    (section_id TEXT PRIMARY KEY,
+                     name TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS roster
+                    (section_id TEXT NOT NULL,
+                     student_id TEXT NOT NULL,
+                     PRIMARY KEY (section_id, student_id),
+                     FOREIGN KEY(section_id) REFERENCES sections(section_id))''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_roster_student ON roster(student_id)')
+
+# trigger ที่ปรับตารางสรุปเมื่อตาราง attendance เปลี่ยน (ใช้ทั้งใน migration 4 และ delete_all_attendance)
+ROLLUP_TRIGGERS = {
+    'attendance_rollup_insert': '''
+        CREATE TRIGGER IF NOT EXISTS attendance_rollup_insert AFTER INSERT ON attendance
+        BEGIN
+            INSERT INTO attendance_daily (date, present) VALUES (NEW.date, 1)
+                ON CONFLICT(date) DO UPDATE SET present = present + 1;
+            INSERT INTO attendance_monthly (month, student_id, days)
+                VALUES (substr(NEW.date, 1, 7), NEW.student_id, 1)
+                ON CONFLICT(month, student_id) DO UPDATE SET days = days + 1;
+        END''',
+    'attendance_rollup_delete': '''
+        CREATE TRIGGER IF NOT EXISTS attendance_rollup_delete AFTER DELETE ON attendance
+        BEGIN
+            UPDATE attendance_daily SET present = present - 1 WHERE date = OLD.date;
+            DELETE FROM attendance_daily WHERE date = OLD.date AND present <= 0;
+            UPDATE attendance_monthly SET days = days - 1
+                WHERE month = substr(OLD.date, 1, 7) AND student_id = OLD.student_id;
+            DELETE FROM attendance_monthly
+                WHERE month = substr(OLD.date, 1, 7) AND student_id = OLD.student_id
+                  AND days <= 0;
+        END''',
+}
+
+# Migration 4: ตารางสรุปการเข้าเรียนรายวันและรายเดือน (ใช้ทำรายงานทั้งภาคเรียน)
+def _add_rollups(conn):
+    """
+    สร้างตารางสรุปที่ถูกปรับทุกครั้งที่ตาราง attendance เปลี่ยน
+    - attendance_daily: จำนวนผู้เข้าเรียนของแต่ละวัน
+    - attendance_monthly: จำนวนวันที่นักศึกษาแต่ละคนเข้าเรียนในแต่ละเดือน (YYYY-MM)
+      (ตาราง attendance มีหนึ่งรายการต่อคนต่อวันอยู่แล้ว จึงสรุปเป็นรายเดือนแทนการคัดลอกเป็นรายวัน)
+    - trigger ปรับตารางสรุปใน transaction เดียวกับการเขียน จึงครอบคลุม record_attendance,
+      AttendanceRecorder และการลบข้อมูลทุกแบบ (INSERT OR IGNORE ที่ซ้ำจะไม่เรียก trigger)
+    - คำนวณตารางสรุปจากข้อมูลเดิมครั้งเดียวตอนรัน migration
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_daily
+                    (date DATE PRIMARY KEY,
+                     present INTEGER NOT NULL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS attendance_monthly
+                    (month TEXT NOT NULL,
+                     student_id TEXT NOT NULL,
+                     days INTEGER NOT NULL,
+                     PRIMARY KEY (month, student_id))''')
+    conn.execute('''INSERT INTO attendance_daily (date, present)
+                    SELECT date, COUNT(*) FROM attendance GROUP BY date''')
+    conn.execute('''INSERT INTO attendance_monthly (month, student_id, days)
+                    SELECT substr(date, 1, 7), student_id, COUNT(*) FROM attendance
+                    GROUP BY substr(date, 1, 7), student_id''')
+    for sql in ROLLUP_TRIGGERS.values():
+        conn.execute(sql)
+
+# รายการ migration เรียงตามเวอร์ชัน (เวอร์ชันที่ N คือ MIGRATIONS[N-1])
+MIGRATIONS = [
+    _create_base_tables,
+    _add_attendance_indexes,
+    _add_rosters,
+    _add_rollups,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Decorator จับเวลา query ของ AttendanceDB
+def _timed_query(method):
+    """
+    ยืมการเชื่อมต่อจาก pool ให้ method (self.conn ภายใน method คือการเชื่อมต่อที่ยืมมา)
+    และเก็บเวลาที่ใช้ใน self.metrics โดยใช้ชื่อ method เป็นชื่อ query
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with self.connection():
+                return method(self, *args, **kwargs)
+        finally:
+            self.metrics.observe(method.__name__, time.perf_counter() - started)
+    return wrapper
 
 class AttendanceDB:
-    """คลาสสำหรับจัดการฐานข้อมูลการเข้าเรียน"""
+    """
+    คลาสสำหรับจัดการฐานข้อมูลการเข้าเรียน
+    - ใช้ร่วมกันได้หลาย thread (เช่น request ของ Flask): แต่ละ query ยืมการเชื่อมต่อของตัวเองจาก pool
+      จึงไม่มี cursor ของสอง thread ปนกัน และ query ของแต่ละ thread ไม่ต้องรอกัน
+    """
     
-    def __init__(self):
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE):
         """
-        สร้างการเชื่อมต่อกับฐานข้อมูล
-        - เชื่อมต่อกับไฟล์ attendance.db
-        - อนุญาตให้ใช้งานจากหลาย thread
+        เตรียม pool การเชื่อมต่อกับฐานข้อมูล
+        - เชื่อมต่อกับไฟล์ attendance.db (ทุกการเชื่อมต่อตั้งค่าด้วย configure_connection)
+        - เก็บการเชื่อมต่อว่างไว้ใช้ซ้ำไม่เกิน pool_size
+        - metrics เก็บเวลาของแต่ละ query (แสดงที่ /metrics ของ web_app)
         """
-        self.conn = sqlite3.connect('attendance.db', check_same_thread=False)
+        self.metrics = StageMetrics()
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()  # การเชื่อมต่อว่าง (ใช้ตัวล่าสุดก่อน cache จึงยังอุ่นอยู่)
+        self._local = threading.local()  # การเชื่อมต่อที่ thread ปัจจุบันยืมอยู่
+        self._owned = []                 # การเชื่อมต่อที่ผู้เรียกใช้ผ่าน self.conn นอก method
+        self._lock = threading.Lock()
         self.init_db()
     
     def init_db(self):
+        """ปรับโครงสร้างฐานข้อมูลให้เป็นเวอร์ชันล่าสุด"""
+        with self.connection() as conn:
+            self.migrate(conn)
+
+    def _open(self):
+        """เปิดการเชื่อมต่อใหม่ (ปิดจาก thread อื่นได้ตอน close)"""
+        return configure_connection(sqlite3.connect(self.db_path, check_same_thread=False))
+
+    @contextlib.contextmanager
+    def connection(self):
         """
-        สร้างตารางในฐานข้อมูลถ้ายังไม่มี
-        - ตาราง students เก็บข้อมูลนักศึกษา
-        - ตาราง attendance เก็บประวัติการเข้าเรียน
+        ยืมการเชื่อมต่อจาก pool ให้ thread ปัจจุบัน แล้วคืนเมื่อจบ with
+        - ถ้า thread นี้ยืมอยู่แล้ว (เช่น method เรียก method อื่น) จะใช้การเชื่อมต่อเดิม
+        - transaction ที่ค้างอยู่ถูก rollback ก่อนคืน การเชื่อมต่อใน pool จึงสะอาดเสมอ
         """
-        c = self.conn.cursor()
-        # Create students table
-        c.execute('''CREATE TABLE IF NOT EXISTS students
-                     (student_id TEXT PRIMARY KEY, 
-                      name TEXT, 
-                      register_date DATE)''')
-        # Create attendance table
-        c.execute('''CREATE TABLE IF NOT EXISTS attendance
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      student_id TEXT,
-                      date DATE,
-                      time TIME,
-                      FOREIGN KEY(student_id) REFERENCES students(student_id))''')
-        self.conn.commit()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            if self._idle.qsize() < self.pool_size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    @property
+    def conn(self):
+        """
+        การเชื่อมต่อของ thread ปัจจุบัน
+        - ภายใน method คือการเชื่อมต่อที่ยืมจาก pool
+        - นอก method (เช่น สคริปต์ที่รัน SQL เอง) เป็นการเชื่อมต่อประจำ thread ที่ถูกปิดใน close()
+        """
+        conn = getattr(self._local, 'conn', None) or getattr(self._local, 'owned', None)
+        if conn is None:
+            conn = self._local.owned = self._open()
+            with self._lock:
+                self._owned.append(conn)
+        return conn
 
+    def close(self):
+        """ปิดการเชื่อมต่อทั้งหมดใน pool และการเชื่อมต่อประจำ thread"""
+        with self._lock:
+            owned, self._owned = self._owned, []
+        while True:
+            try:
+                owned.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for conn in owned:
+            conn.close()
+        self._local = threading.local()
+
+    @staticmethod
+    def connect(db_path=DB_PATH):
+        """เปิดการเชื่อมต่อฐานข้อมูลที่ปรับโครงสร้างเป็นเวอร์ชันล่าสุดแล้ว (สำหรับโปรแกรมอื่นๆ)"""
+        conn = configure_connection(sqlite3.connect(db_path))
+        AttendanceDB.migrate(conn)
+        return conn
+
+    @staticmethod
+    def migrate(conn):
+        """
+        รัน migration ที่ยังไม่ได้รันกับฐานข้อมูล
+        - เก็บเวอร์ชันของโครงสร้างใน PRAGMA user_version
+        - แต่ละ migration รันใน transaction เดียวกับการเปลี่ยนเวอร์ชัน
+          (ใช้ BEGIN IMMEDIATE เพื่อไม่ให้หลายโปรแกรมรัน migration เดียวกันพร้อมกัน)
+        - คืนค่าเวอร์ชันของโครงสร้างหลังจากรันเสร็จ
+        """
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        while version < SCHEMA_VERSION:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version < SCHEMA_VERSION:
+                    MIGRATIONS[version](conn)
+                    version += 1
+                    conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return version
+
+    @_timed_query
     def get_all_students(self):
         """
         ดึงข้อมูลนักศึกษาทั้งหมด
@@ -45,6 +299,41 @@ class AttendanceDB:
         rows = c.fetchall()
         return [{'id': r[0], 'name': r[1], 'register_date': r[2]} for r in rows]
 
+    @_timed_query
+    def get_dashboard_summary(self, date=None, days=7):
+        """
+        ดึงข้อมูลสรุปของนักศึกษาทุกคนสำหรับหน้า dashboard ด้วย query เดียว
+        - attended_today: เข้าเรียนในวันที่ date แล้วหรือไม่ (ค่าเริ่มต้นคือวันนี้)
+        - last_attendance: เวลาเข้าเรียนครั้งล่าสุดภายใน days วันย้อนหลัง
+        - ใช้ index (student_id, date) ทั้งการ join และ subquery
+        - คืนค่า dict ที่มี students, today_count และ total_students
+        """
+        date = date or datetime.now().date()
+        start_date = date - timedelta(days=days)
+        c = self.conn.cursor()
+        c.execute('''
+            SELECT s.student_id, s.name, s.register_date,
+                   t.student_id IS NOT NULL AS attended_today,
+                   (SELECT a.time FROM attendance a
+                    WHERE a.student_id = s.student_id AND a.date >= ?
+                    ORDER BY a.date DESC LIMIT 1) AS last_attendance
+            FROM students s
+            LEFT JOIN attendance t ON t.student_id = s.student_id AND t.date = ?
+        ''', (str(start_date), str(date)))
+        students = [{
+            'id': r[0],
+            'name': r[1],
+            'register_date': r[2],
+            'attended_today': bool(r[3]),
+            'last_attendance': r[4]
+        } for r in c.fetchall()]
+        return {
+            'students': students,
+            'today_count': sum(1 for s in students if s['attended_today']),
+            'total_students': len(students)
+        }
+
+    @_timed_query
     def get_recent_attendance(self, days=7):
         """
         ดึงข้อมูลการเข้าเรียนย้อนหลัง N วัน
@@ -64,16 +353,42 @@ class AttendanceDB:
         rows = c.fetchall()
         return [{'date': r[0], 'time': r[1], 'student_id': r[2], 'name': r[3]} for r in rows]
 
+    @_timed_query
+    def get_attendance_since(self, last_id=0, limit=500):
+        """
+        ดึงรายการเข้าเรียนที่บันทึกหลังรายการ last_id (cursor คือ attendance.id)
+        - ค้นหาด้วย primary key จึงไม่ขึ้นกับจำนวนข้อมูลทั้งหมด
+        - คืนค่าเป็น list ของ dict เรียงตาม id จากเก่าไปใหม่
+        """
+        c = self.conn.cursor()
+        c.execute('''
+            SELECT a.id, a.date, a.time, a.student_id, s.name
+            FROM attendance a
+            LEFT JOIN students s ON a.student_id = s.student_id
+            WHERE a.id > ?
+            ORDER BY a.id
+            LIMIT ?
+        ''', (last_id, limit))
+        return [{'id': r[0], 'date': r[1], 'time': r[2], 'student_id': r[3],
+                 'name': r[4] if r[4] else 'Unknown'} for r in c.fetchall()]
+
+    @_timed_query
+    def get_last_attendance_id(self):
+        """คืนค่า id ของรายการเข้าเรียนล่าสุด (0 ถ้ายังไม่มี) ใช้เป็น cursor เริ่มต้น"""
+        row = self.conn.execute('SELECT MAX(id) FROM attendance').fetchone()
+        return row[0] or 0
+
+    @_timed_query
     def record_attendance(self, student_id):
         """
         บันทึกการเข้าเรียนของนักศึกษา
-        - บันทึกวันที่และเวลาปัจจุบัน
+        - บันทึกวันที่และเวลาปัจจุบัน (ข้ามถ้าบันทึกไปแล้ววันนี้)
         - คืนค่า True ถ้าสำเร็จ, False ถ้าเกิดข้อผิดพลาด
         """
         try:
             current_date = datetime.now().date()
-            current_time = datetime.now().time()
-            self.conn.execute('''INSERT INTO attendance (student_id, date, time)
+            current_time = datetime.now().strftime('%H:%M:%S')
+            self.conn.execute('''INSERT OR IGNORE INTO attendance (student_id, date, time)
                                VALUES (?, ?, ?)''',
                             (student_id, current_date, current_time))
             self.conn.commit()
@@ -82,20 +397,89 @@ class AttendanceDB:
             print(f"Error recording attendance: {e}")
             return False
 
+    @_timed_query
     def delete_all_attendance(self):
         """
         ลบข้อมูลการเข้าเรียนทั้งหมด
-        - ล้างข้อมูลในตาราง attendance
+        - ล้างข้อมูลในตาราง attendance และตารางสรุปใน transaction เดียว
+        - ถอด trigger ของตารางสรุปชั่วคราว จึงไม่ต้องปรับตารางสรุปทีละแถว และ SQLite ล้างตารางได้ทันที
+          (BEGIN IMMEDIATE ให้การถอดและใส่ trigger กลับอยู่ใน transaction เดียวกับการลบ)
         - คืนค่า True ถ้าสำเร็จ, False ถ้าเกิดข้อผิดพลาด
         """
         try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            for name in ROLLUP_TRIGGERS:
+                self.conn.execute(f'DROP TRIGGER IF EXISTS {name}')
             self.conn.execute("DELETE FROM attendance")
+            self.conn.execute("DELETE FROM attendance_daily")
+            self.conn.execute("DELETE FROM attendance_monthly")
+            for sql in ROLLUP_TRIGGERS.values():
+                self.conn.execute(sql)
             self.conn.commit()
             return True
         except Exception as e:
+            self.conn.rollback()
             print(f"Error deleting attendance: {e}")
             return False
     
+    @_timed_query
+    def add_students(self, students, register_date=None):
+        """
+        เพิ่มหรืออัปเดตนักศึกษาหลายคนใน transaction เดียว (ใช้ตอนนำเข้าจำนวนมาก)
+        - students คือ list ของ (student_id, name)
+        - นักศึกษาที่มีอยู่แล้วจะถูกอัปเดตเฉพาะชื่อ วันที่ลงทะเบียนเดิมไม่เปลี่ยน
+        - คืนค่าจำนวนนักศึกษาที่บันทึก
+        """
+        register_date = register_date or datetime.now().date()
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO students (student_id, name, register_date) VALUES (?, ?, ?)
+                ON CONFLICT(student_id) DO UPDATE SET name = excluded.name
+            ''', ((sid, name, register_date) for sid, name in students))
+        return len(students)
+
+    @_timed_query
+    def add_to_roster(self, section_id, student_ids, name=None, replace=False):
+        """
+        เพิ่มนักศึกษาเข้ากลุ่มเรียน section_id (สร้างกลุ่มเรียนถ้ายังไม่มี)
+        - name คือชื่อกลุ่มเรียน (None = ไม่เปลี่ยนชื่อเดิม)
+        - replace=True ล้างรายชื่อเดิมของกลุ่มเรียนก่อน
+        - คืนค่าจำนวนนักศึกษาในกลุ่มเรียนหลังเพิ่ม
+        """
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO sections (section_id, name) VALUES (?, ?)',
+                              (section_id, name))
+            if name is not None:
+                self.conn.execute('UPDATE sections SET name = ? WHERE section_id = ?',
+                                  (name, section_id))
+            if replace:
+                self.conn.execute('DELETE FROM roster WHERE section_id = ?', (section_id,))
+            self.conn.executemany('INSERT OR IGNORE INTO roster (section_id, student_id) VALUES (?, ?)',
+                                  ((section_id, sid) for sid in student_ids))
+        row = self.conn.execute('SELECT COUNT(*) FROM roster WHERE section_id = ?',
+                                (section_id,)).fetchone()
+        return row[0]
+
+    @_timed_query
+    def get_roster(self, section_id):
+        """คืนค่า list ของรหัสนักศึกษาในกลุ่มเรียน section_id เรียงตามรหัส"""
+        rows = self.conn.execute('SELECT student_id FROM roster WHERE section_id = ? ORDER BY student_id',
+                                 (section_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    @_timed_query
+    def get_sections(self):
+        """คืนค่า list ของ dict ที่มี id, name และจำนวนนักศึกษา (students) ของทุกกลุ่มเรียน"""
+        rows = self.conn.execute('''
+            SELECT s.section_id, s.name, COUNT(r.student_id)
+            FROM sections s
+            LEFT JOIN roster r ON r.section_id = s.section_id
+            GROUP BY s.section_id
+            ORDER BY s.section_id
+        ''').fetchall()
+        return [{'id': r[0], 'name': r[1], 'students': r[2]} for r in rows]
+
+    @_timed_query
     def get_all_records(self):
         """
         ดึงข้อมูลการเข้าเรียนทั้งหมดพร้อมข้อมูลนักศึกษา
@@ -109,41 +493,146 @@ class AttendanceDB:
                 s.student_id,
                 s.name,
                 a.date,
-                a.first_time,
+                a.time,
                 strftime('%w', a.date) as weekday
             FROM students s
             LEFT JOIN attendance a ON s.student_id = a.student_id
-            ORDER BY a.date DESC, a.first_time DESC
+            ORDER BY a.date DESC, a.time DESC
         ''')
         return c.fetchall()
 
-    def search_attendance(self, student_id=None, start_date=None, end_date=None):
+    @_timed_query
+    def get_daily_totals(self, start_date, end_date):
         """
-        ค้นหาข้อมูลการเข้าเรียนตามเงื่อนไข
-        - กรองตาม student_id (ถ้ามี)
-        - กรองตามช่วงวันที่ start_date ถึง end_date (ถ้ามี)
-        - เรียงลำดับตามวันที่และเวลาล่าสุด
-        - คืนค่าเป็น list ของ dict ที่มีข้อมูลการเข้าเรียน
+        จำนวนผู้เข้าเรียนรายวันในช่วง start_date ถึง end_date (อ่านจากตาราง attendance_daily)
+        - enrolled คือจำนวนนักศึกษาที่ลงทะเบียนแล้วในวันนั้น ใช้คำนวณ rate
+        - คืนค่า list ของ dict (date, present, enrolled, rate) เฉพาะวันที่มีการเข้าเรียน เรียงตามวันที่
         """
-        query = """
-            SELECT a.date, a.time, a.student_id, s.name
-            FROM attendance a
-            LEFT JOIN students s ON a.student_id = s.id
-            WHERE 1=1
+        rows = self.conn.execute('''SELECT date, present FROM attendance_daily
+                                    WHERE date BETWEEN ? AND ? ORDER BY date''',
+                                 (str(start_date), str(end_date))).fetchall()
+        registered = sorted(str(r[0]) for r in self.conn.execute('SELECT register_date FROM students'))
+        days = []
+        for date, present in rows:
+            enrolled = bisect.bisect_right(registered, str(date))
+            days.append({'date': date, 'present': present, 'enrolled': enrolled,
+                         'rate': present / enrolled if enrolled else 0.0})
+        return days
+
+    @staticmethod
+    def _month_span(start_date, end_date):
         """
+        แบ่งช่วงวันที่ (datetime.date) เป็นเดือนเต็มและส่วนที่ไม่เต็มเดือน
+        - คืนค่า (เดือนเต็มแรก, เดือนเต็มสุดท้าย, ช่วงที่ไม่เต็มเดือน) โดยเดือนเป็น "YYYY-MM"
+          (None ถ้าไม่มีเดือนเต็ม) และช่วงที่ไม่เต็มเดือนเป็น list ของ (วันเริ่ม, วันสิ้นสุด)
+        """
+        first = start_date.replace(day=1)
+        if first < start_date:
+            first = (first + timedelta(days=32)).replace(day=1)  # วันแรกของเดือนถัดไป
+        after = end_date + timedelta(days=1)
+        last = after.replace(day=1)  # วันแรกถัดจากเดือนเต็มสุดท้าย
+        if first >= last:
+            return None, None, [(start_date, end_date)]
+        edges = []
+        if start_date < first:
+            edges.append((start_date, first - timedelta(days=1)))
+        if last < after:
+            edges.append((last, end_date))
+        return first.strftime('%Y-%m'), (last - timedelta(days=1)).strftime('%Y-%m'), edges
+
+    @_timed_query
+    def get_student_rates(self, start_date, end_date, section_id=None):
+        """
+        อัตราการเข้าเรียนของนักศึกษาแต่ละคนในช่วง start_date ถึง end_date (datetime.date) เช่น ทั้งภาคเรียน
+        - วันเรียน (class_days) คือวันที่มีผู้เข้าเรียนอย่างน้อยหนึ่งคน (ของกลุ่มเรียน ถ้าระบุ section_id)
+          นับตั้งแต่วันลงทะเบียนของแต่ละคน
+        - เดือนเต็มรวมจากตาราง attendance_monthly ส่วนต้นและท้ายช่วงที่ไม่เต็มเดือนนับจาก attendance
+          ด้วย index (date, time) จึงไม่ต้องอ่านรายการเข้าเรียนทั้งภาคเรียน
+        - section_id (ถ้ามี) กรองเฉพาะนักศึกษาในกลุ่มเรียน
+        - คืนค่า list ของ dict (id, name, attended, class_days, rate) เรียงจาก rate น้อยไปมาก
+        """
+        if section_id:
+            # วันที่นักศึกษาในกลุ่มเรียนเข้าเรียน (ค้นหาด้วย index (student_id, date) ของแต่ละคน)
+            class_dates = [str(r[0]) for r in self.conn.execute('''
+                SELECT DISTINCT a.date FROM roster r
+                JOIN attendance a ON a.student_id = r.student_id
+                WHERE r.section_id = ? AND a.date BETWEEN ? AND ?
+                ORDER BY a.date
+            ''', (section_id, str(start_date), str(end_date)))]
+        else:
+            class_dates = [str(r[0]) for r in self.conn.execute(
+                'SELECT date FROM attendance_daily WHERE date BETWEEN ? AND ? ORDER BY date',
+                (str(start_date), str(end_date)))]
+        first_month, last_month, edges = self._month_span(start_date, end_date)
+        attended = {}
+        if first_month:
+            attended.update(self.conn.execute('''
+                SELECT student_id, SUM(days) FROM attendance_monthly
+                WHERE month BETWEEN ? AND ? GROUP BY student_id
+            ''', (first_month, last_month)))
+        for begin, end in edges:
+            for sid, days in self.conn.execute('''
+                SELECT student_id, COUNT(*) FROM attendance
+                WHERE date BETWEEN ? AND ? GROUP BY student_id
+            ''', (str(begin), str(end))):
+                attended[sid] = attended.get(sid, 0) + days
+
+        query = 'SELECT s.student_id, s.name, s.register_date FROM students s'
+        params = ()
+        if section_id:
+            query += ' JOIN roster r ON r.student_id = s.student_id WHERE r.section_id = ?'
+            params = (section_id,)
+        students = []
+        for sid, name, register_date in self.conn.execute(query, params):
+            since = max(str(start_date), str(register_date or start_date))
+            class_days = len(class_dates) - bisect.bisect_left(class_dates, since)
+            count = attended.get(sid, 0)
+            students.append({'id': sid, 'name': name, 'attended': count, 'class_days': class_days,
+                             'rate': min(1.0, count / class_days) if class_days else 0.0})
+        students.sort(key=lambda s: (s['rate'], s['id']))
+        return students
+
+    @staticmethod
+    def _attendance_filter(student_id=None, start_date=None, end_date=None):
+        """สร้างเงื่อนไข WHERE และพารามิเตอร์สำหรับกรองตาราง attendance (alias a)"""
+        query = " WHERE 1=1"
         params = []
-        
         if student_id:
             query += " AND a.student_id = ?"
             params.append(student_id)
         if start_date:
             query += " AND a.date >= ?"
-            params.append(start_date)
+            params.append(str(start_date))
         if end_date:
             query += " AND a.date <= ?"
-            params.append(end_date)
-        
-        query += " ORDER BY a.date DESC, a.time DESC"
+            params.append(str(end_date))
+        return query, params
+
+    @_timed_query
+    def search_attendance(self, student_id=None, start_date=None, end_date=None,
+                          limit=None, before=None):
+        """
+        ค้นหาข้อมูลการเข้าเรียนตามเงื่อนไข
+        - กรองตาม student_id (ถ้ามี)
+        - กรองตามช่วงวันที่ start_date ถึง end_date (ถ้ามี)
+        - เรียงลำดับตามวันที่และเวลาล่าสุด
+        - แบ่งหน้าแบบ keyset: limit คือจำนวนรายการต่อหน้า และ before คือ cursor (date, time, id)
+          ของรายการสุดท้ายในหน้าก่อน จึงไม่ต้องข้ามรายการด้วย OFFSET ไม่ว่าจะอยู่หน้าไหน
+        - คืนค่าเป็น list ของ dict ที่มีข้อมูลการเข้าเรียน
+        """
+        where, params = self._attendance_filter(student_id, start_date, end_date)
+        query = """
+            SELECT a.date, a.time, a.student_id, s.name, a.id
+            FROM attendance a
+            LEFT JOIN students s ON a.student_id = s.student_id
+        """ + where
+        if before:
+            query += " AND (a.date, a.time, a.id) < (?, ?, ?)"
+            params.extend(before)
+        query += " ORDER BY a.date DESC, a.time DESC, a.id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
         
         cursor = self.conn.execute(query, params)
         results = cursor.fetchall()
@@ -152,5 +641,162 @@ class AttendanceDB:
             'date': row[0],
             'time': row[1],
             'student_id': row[2],
-            'name': row[3] if row[3] else 'Unknown'
+            'name': row[3] if row[3] else 'Unknown',
+            'id': row[4]
         } for row in results]
+
+    def iter_attendance(self, student_id=None, start_date=None, end_date=None, batch_size=1000):
+        """
+        generator ที่ส่งรายการเข้าเรียน (date, time, student_id, name) ทีละแถว เรียงจากเก่าไปใหม่
+        - ใช้การเชื่อมต่อแยกและอ่านทีละ batch_size แถวด้วย fetchmany หน่วยความจำจึงคงที่
+          ไม่ว่าผลลัพธ์จะมีกี่แถว (เหมาะกับการ export ข้อมูลทั้งปี)
+        - ไม่ใช้ self.conn จึงไม่ขวาง query อื่นระหว่างการ export ที่ใช้เวลานาน
+        """
+        where, params = self._attendance_filter(student_id, start_date, end_date)
+        conn = configure_connection(sqlite3.connect(self.db_path))
+        try:
+            cursor = conn.execute("""
+                SELECT a.date, a.time, a.student_id, COALESCE(s.name, 'Unknown')
+                FROM attendance a
+                LEFT JOIN students s ON a.student_id = s.student_id
+            """ + where + " ORDER BY a.date, a.time, a.id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+class AttendanceRecorder:
+    """
+    ตัวบันทึกการเข้าเรียนแบบ write-behind สำหรับลูปกล้อง
+    - จำ (student_id, date) ที่บันทึกแล้วไว้ใน set จึงตรวจการซ้ำได้โดยไม่ต้อง query
+    - ใช้ร่วมกันได้หลาย thread จึงตัดรายการซ้ำจากหลายกล้องได้ในที่เดียว
+    - ส่งรายการใหม่ให้ thread เบื้องหลังเขียนลงฐานข้อมูลเป็นชุด (group commit) ในโหมด WAL
+    - close() จะเขียนรายการที่ค้างอยู่ทั้งหมดก่อนปิด
+    """
+
+    def __init__(self, db_path=DB_PATH, batch_size=50, flush_interval=0.5):
+        """
+        โหลดรายชื่อที่บันทึกแล้ววันนี้ และเริ่ม thread เขียนฐานข้อมูล
+        - batch_size จำนวนรายการสูงสุดต่อหนึ่ง commit
+        - flush_interval เวลารอสะสมรายการ (วินาที) ก่อน commit
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = set()       # {(student_id, date)} ที่บันทึกแล้ว
+        self.loaded_dates = set()   # วันที่ที่โหลดรายการจากฐานข้อมูลมาแล้ว
+        self.written = 0            # แถวที่เพิ่มลงตารางจริง (ไม่นับแถวที่ INSERT OR IGNORE ข้าม)
+        self.failed = 0             # รายการที่เขียนไม่สำเร็จหลังลองซ้ำครบแล้ว
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()  # record() ถูกเรียกได้จากหลาย thread (เช่น หลายกล้อง)
+
+        AttendanceDB.connect(db_path).close()  # ปรับโครงสร้างและเปิด WAL ก่อนเริ่ม
+        self._load_date(str(datetime.now().date()))
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _load_date(self, date):
+        """โหลดรายชื่อที่บันทึกแล้วของวันที่ date จากฐานข้อมูล (ครั้งเดียวต่อวัน)"""
+        conn = configure_connection(sqlite3.connect(self.db_path))
+        rows = conn.execute('SELECT student_id FROM attendance WHERE date = ?',
+                            (date,)).fetchall()
+        conn.close()
+        self.recorded.update((r[0], date) for r in rows)
+        self.loaded_dates.add(date)
+
+    def record(self, student_id, when=None):
+        """
+        บันทึกการเข้าเรียนของนักศึกษา (ไม่รอการเขียนฐานข้อมูล)
+        - when คือเวลาที่พบใบหน้า (ค่าเริ่มต้นคือเวลาปัจจุบัน)
+        - คืนค่า True ถ้าเป็นรายการใหม่, False ถ้าบันทึกไปแล้วในวันนั้น
+        - ถ้า thread เขียนฐานข้อมูลหยุดทำงานไปแล้ว จะ raise RuntimeError แทนการรับรายการที่ไม่มีวันถูกเขียน
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("attendance writer thread has stopped")
+        when = when or datetime.now()
+        date = str(when.date())
+        key = (student_id, date)
+        with self._lock:
+            if date not in self.loaded_dates:
+                self._load_date(date)
+            if key in self.recorded:
+                return False
+            self.recorded.add(key)
+        self._queue.put((student_id, date, when.strftime('%H:%M:%S')))
+        print(f"Recorded attendance for {student_id}")
+        return True
+
+    def _next_batch(self):
+        """
+        รอรายการแรก แล้วสะสมรายการต่อจนครบ batch_size หรือครบ flush_interval
+        - คืนค่า (batch, closing) โดย closing เป็น True เมื่อได้รับสัญญาณปิด
+        """
+        batch = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _write_loop(self):
+        """ลูปของ thread เขียนฐานข้อมูล: commit รายการทีละชุดจนกว่าจะถูกสั่งปิด"""
+        conn = configure_connection(sqlite3.connect(self.db_path))
+        closing = False
+        while not closing:
+            batch, closing = self._next_batch()
+            if batch:
+                self._write_batch(conn, batch)
+        conn.close()
+
+    def _write_batch(self, conn, batch):
+        """
+        เขียนรายการหนึ่งชุดใน transaction เดียว
+        - เมื่อเกิด error (เช่น database is locked นานกว่า busy_timeout) จะลองใหม่ WRITE_RETRIES ครั้ง
+          โดยรอนานขึ้นเป็นสองเท่าทุกครั้ง
+        - ถ้ายังไม่สำเร็จ จะลบรายการออกจาก recorded เพื่อให้บันทึกได้อีกเมื่อพบใบหน้าครั้งถัดไป
+          แทนการทิ้งรายการโดยที่ระบบยังเข้าใจว่าบันทึกแล้ว
+        - error อื่นที่ไม่ใช่ของ sqlite จะไม่ลองใหม่ แต่จัดการแบบเดียวกัน thread เขียนจึงไม่หยุดทำงาน
+        - written นับเฉพาะแถวที่เพิ่มจริง (rowcount ไม่รวมแถวที่ trigger ของตารางสรุปแก้ไข)
+        """
+        delay = WRITE_RETRY_DELAY
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                with conn:
+                    cursor = conn.executemany('''INSERT OR IGNORE INTO attendance (student_id, date, time)
+                                                 VALUES (?, ?, ?)''', batch)
+                self.written += cursor.rowcount
+                return True
+            except sqlite3.Error as e:
+                print(f"Error recording attendance (attempt {attempt + 1}): {e}")
+                if attempt < WRITE_RETRIES:
+                    time.sleep(delay)
+                    delay *= 2
+            except Exception as e:
+                print(f"Unexpected error recording attendance: {e!r}")
+                break
+        with self._lock:
+            self.recorded.difference_update((student_id, date) for student_id, date, _ in batch)
+        self.failed += len(batch)
+        print(f"Failed to record {len(batch)} attendance entries; they will be recorded on next sighting")
+        return False
+
+    def close(self):
+        """
+        เขียนรายการที่ค้างอยู่ทั้งหมด แล้วหยุด thread เขียนฐานข้อมูล
+        - ถ้า thread หยุดทำงานไปก่อนแล้ว จะแจ้งจำนวนรายการที่ไม่ได้เขียน
+        """
+        if not self._thread.is_alive():
+            print(f"Error: attendance writer thread stopped; {self._queue.qsize()} entries were not recorded")
+            return
+        self._queue.put(None)
+        self._thread.join()
@@ -1,10 +1,11 @@
-import sqlite3
 import os
 import shutil
+from database import AttendanceDB
+from face_pack import remove_pack
 
 def delete_student():
     # เชื่อมต่อฐานข้อมูล
-    conn = sqlite3.connect('attendance.db')
+    conn = AttendanceDB.connect()
     c = conn.cursor()
     
     while True:
@@ -41,12 +42,16 @@ def delete_student():
                 c.execute("DELETE FROM students WHERE student_id = ?", (student_id,))
                 # ลบข้อมูลจากตาราง attendance
                 c.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
+                # ลบออกจากรายชื่อทุกกลุ่มเรียน
+                c.execute("DELETE FROM roster WHERE student_id = ?", (student_id,))
                 conn.commit()
                 
                 # ลบโฟลเดอร์รูปภาพ
                 student_folder = os.path.join("dataset", student_id)
                 if os.path.exists(student_folder):
                     shutil.rmtree(student_folder)
+                # ลบไฟล์ใบหน้าแบบ pack (ถ้ามี)
+                remove_pack("dataset", student_id)
                 
                 print(f"ลบข้อมูลรหัส {student_id} เรียบร้อยแล้ว")
                 
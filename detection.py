@@ -0,0 +1,107 @@
+# นำเข้าไลบรารีที่จำเป็น
+from collections import deque  # ใช้เก็บขนาดใบหน้าที่พบล่าสุด
+import cv2                      # ใช้สำหรับตรวจจับใบหน้าและย่อภาพ
+
+class FastFaceDetector:
+    """
+    ตัวตรวจจับใบหน้าแบบย่อภาพและค้นหาเฉพาะบริเวณ (ROI) รอบใบหน้าเดิม
+    - ทุก full_scan_interval เฟรม ตรวจจับทั้งภาพที่ย่อขนาดแล้ว
+    - เฟรมระหว่างนั้นค้นหาเฉพาะบริเวณรอบใบหน้าที่พบในเฟรมก่อน
+    - อัตราการย่อ minSize และ maxSize ปรับตามขนาดใบหน้าที่พบจริง
+      (ใบหน้าที่เล็กที่สุดถูกย่อให้เหลือประมาณ min_detect_size พิกเซล)
+    - การตรวจทั้งภาพอย่างน้อยทุก wide_scan_interval เฟรม ใช้ขอบเขต min_size ถึง max_size เต็มช่วง
+      เพื่อให้พบใบหน้าที่อยู่ใกล้หรือไกลกว่าใบหน้าเดิม และเริ่มเก็บขนาดใบหน้าใหม่จากผลครั้งนั้น
+    - คืนค่ากรอบใบหน้า (x, y, w, h) ในพิกัดของภาพขนาดเต็ม
+    - เก็บสถานะของเฟรมก่อน จึงต้องใช้หนึ่งตัวต่อกล้องหรือต่อ thread
+    """
+
+    def __init__(self, cascade, min_neighbors=5, scale_factor=1.1, min_size=(60, 60),
+                 max_size=(300, 300), min_detect_size=48, full_scan_interval=5, roi_margin=0.5,
+                 history=50, wide_scan_interval=30):
+        """
+        สร้างตัวตรวจจับ
+        - cascade คือ cv2.CascadeClassifier (ไม่ปลอดภัยเมื่อใช้ร่วมกันหลาย thread)
+        - min_size / max_size คือขอบเขตขนาดใบหน้าในภาพขนาดเต็ม เหมือน detect_faces
+        - min_detect_size คือขนาด (พิกเซล) ของใบหน้าที่เล็กที่สุดหลังย่อภาพ (cascade ต้องการอย่างน้อย 24)
+        - roi_margin คือสัดส่วนที่ขยายกรอบใบหน้าเดิมออกไปแต่ละด้านเมื่อค้นหาแบบ ROI
+        """
+        self.cascade = cascade
+        self.min_neighbors = min_neighbors
+        self.scale_factor = scale_factor
+        self.min_size = min_size[0]
+        self.max_size = max_size[0]
+        self.min_detect_size = max(24, min_detect_size)
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.roi_margin = roi_margin
+        self.wide_scan_interval = max(1, wide_scan_interval)
+        self.last_wide_scan = None          # เฟรมล่าสุดที่ตรวจทั้งภาพด้วยขอบเขตเต็มช่วง
+        self.sizes = deque(maxlen=history)  # ขนาดใบหน้าที่พบจากการตรวจทั้งภาพ
+        self.boxes = []                     # ใบหน้าที่พบในเฟรมก่อน
+        self.frame_index = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    def size_bounds(self):
+        """
+        คืนค่าขอบเขตขนาดใบหน้า (min, max) ที่คาดว่าจะพบในภาพขนาดเต็ม
+        - ถ้ายังไม่มีขนาดใบหน้าที่พบ ใช้ min_size และ max_size ที่กำหนด
+        - ถ้าเคยพบแล้ว ใช้ช่วงขนาดที่พบจริงขยายออก 25% (แต่ไม่เกินขอบเขตที่กำหนด)
+        """
+        if not self.sizes:
+            return self.min_size, self.max_size
+        return (max(self.min_size, int(min(self.sizes) * 0.75)),
+                min(self.max_size, int(max(self.sizes) * 1.25) + 1))
+
+    def _detect(self, gray, min_face, max_face, offset=(0, 0)):
+        """ย่อภาพตามขนาดใบหน้าที่เล็กที่สุด ตรวจจับ แล้วแปลงกรอบกลับเป็นพิกัดภาพขนาดเต็ม"""
+        scale = min(1.0, self.min_detect_size / float(min_face))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(gray, (max(1, int(gray.shape[1] * scale)),
+                                      max(1, int(gray.shape[0] * scale))),
+                               interpolation=cv2.INTER_AREA)
+        min_small = max(24, int(min_face * scale))
+        max_small = max(min_small, int(max_face * scale) + 1)
+        found = self.cascade.detectMultiScale(small, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors,
+                                              minSize=(min_small, min_small),
+                                              maxSize=(max_small, max_small))
+        ox, oy = offset
+        return [(int(x / scale) + ox, int(y / scale) + oy, int(w / scale), int(h / scale))
+                for (x, y, w, h) in found]
+
+    def detect(self, gray):
+        """ตรวจจับใบหน้าในภาพโทนสีเทาที่ปรับ histogram แล้ว คืนค่า list ของ (x, y, w, h)"""
+        full_scan = not self.boxes or self.frame_index % self.full_scan_interval == 0
+        wide = (self.last_wide_scan is None
+                or self.frame_index - self.last_wide_scan >= self.wide_scan_interval)
+        self.frame_index += 1
+        if full_scan:
+            self.full_scans += 1
+            if wide:
+                self.last_wide_scan = self.frame_index - 1
+                boxes = self._detect(gray, self.min_size, self.max_size)
+                self.sizes.clear()  # ขนาดเดิมอาจเป็นของใบหน้าที่ออกไปแล้ว
+            else:
+                boxes = self._detect(gray, *self.size_bounds())
+            self.sizes.extend(w for (_, _, w, _) in boxes)
+        else:
+            self.roi_scans += 1
+            rows, cols = gray.shape[:2]
+            boxes = []
+            for (x, y, w, h) in self.boxes:
+                margin = int(max(w, h) * self.roi_margin)
+                x0, y0 = max(0, x - margin), max(0, y - margin)
+                x1, y1 = min(cols, x + w + margin), min(rows, y + h + margin)
+                min_face = max(self.min_size, int(w * 0.75))
+                max_face = min(self.max_size, int(w * 1.33) + 1, x1 - x0, y1 - y0)
+                if max_face < min_face:
+                    continue
+                for box in self._detect(gray[y0:y1, x0:x1], min_face, max_face, (x0, y0)):
+                    # ROI ที่ซ้อนกันอาจพบใบหน้าเดียวกัน ให้เก็บไว้ครั้งเดียว
+                    cx, cy = box[0] + box[2] // 2, box[1] + box[3] // 2
+                    if not any(bx <= cx < bx + bw and by <= cy < by + bh
+                               for (bx, by, bw, bh) in boxes):
+                        boxes.append(box)
+        self.boxes = boxes
+        return boxes
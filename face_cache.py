@@ -0,0 +1,117 @@
+# นำเข้าไลบรารีที่จำเป็น
+import hashlib      # ใช้สำหรับคำนวณ hash ของเนื้อหารูปภาพ
+import numpy as np  # ใช้สำหรับ memory-map ไฟล์ใบหน้าที่ตัดไว้แล้ว
+import os           # ใช้จัดการไฟล์
+import pickle       # ใช้สำหรับบันทึก index ของ cache
+
+CACHE_INDEX_PATH = "face_cache.pickle"  # index ของ cache (path -> hash, hash -> ตำแหน่ง)
+CACHE_DATA_PATH = "face_cache.bin"      # ใบหน้าที่ตัดแล้ว เก็บต่อกันเป็น uint8 แบบ raw
+CACHE_VERSION = 2
+NO_FACE = -1     # ตำแหน่งพิเศษ: อ่านรูปได้แต่ไม่พบใบหน้า
+UNREADABLE = -2  # ตำแหน่งพิเศษ: อ่านรูปไม่ได้
+
+class FaceCropCache:
+    """
+    Cache บนดิสก์ของใบหน้าที่ตัด ปรับ histogram และปรับขนาดแล้ว
+    - อ้างอิงด้วย path, ขนาดไฟล์, mtime และ hash ของเนื้อหารูปภาพ
+    - เก็บใบหน้าทั้งหมดต่อกันในไฟล์เดียว และอ่านด้วย np.memmap
+    - รูปที่ไม่พบใบหน้าหรืออ่านไม่ได้ก็ถูกจำไว้ เพื่อไม่ต้องตรวจจับซ้ำ
+    """
+
+    def __init__(self, face_size, index_path=CACHE_INDEX_PATH, data_path=CACHE_DATA_PATH):
+        """โหลด index ของ cache ถ้ามีและตรงกับ face_size ปัจจุบัน มิฉะนั้นเริ่มใหม่"""
+        self.face_size = tuple(face_size)
+        self.index_path = index_path
+        self.data_path = data_path
+        self.paths = {}   # {image_path: (size, mtime, digest)}
+        self.crops = {}   # {digest: ตำแหน่งใน data_path หรือ NO_FACE / UNREADABLE}
+        self.count = 0    # จำนวนใบหน้าใน data_path
+        self.hits = 0
+        self.misses = 0
+        self._data = None
+        self._dirty = False
+
+        index = None
+        try:
+            with open(index_path, "rb") as f:
+                index = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+        data_size = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+        if (index is not None and index.get('version') == CACHE_VERSION
+                and tuple(index['face_size']) == self.face_size
+                and data_size == index['count'] * self._crop_bytes()):
+            self.paths = index['paths']
+            self.crops = index['crops']
+            self.count = index['count']
+        elif data_size:
+            # index ไม่ตรงกับไฟล์ข้อมูล ให้เริ่ม cache ใหม่
+            os.remove(data_path)
+
+    def _crop_bytes(self):
+        """จำนวน byte ของใบหน้าหนึ่งใบ"""
+        return self.face_size[0] * self.face_size[1]
+
+    def _read_slot(self, slot):
+        """อ่านใบหน้าจากตำแหน่ง slot ผ่าน memory-map"""
+        if self._data is None or slot >= len(self._data):
+            self._data = np.memmap(self.data_path, dtype=np.uint8, mode="r",
+                                   shape=(self.count, self.face_size[1], self.face_size[0]))
+        return np.array(self._data[slot])
+
+    def _append(self, face):
+        """ต่อท้ายใบหน้าใหม่ลงในไฟล์ข้อมูล และคืนค่าตำแหน่ง"""
+        with open(self.data_path, "ab") as f:
+            f.write(np.ascontiguousarray(face, dtype=np.uint8).tobytes())
+        self.count += 1
+        return self.count - 1
+
+    def lookup(self, image_path, size, mtime):
+        """
+        ค้นหาใบหน้าของรูป image_path ใน cache
+        - ถ้า path, size และ mtime ตรงกับที่บันทึกไว้ ใช้ hash เดิมโดยไม่ต้องอ่านไฟล์
+        - ถ้าไม่ตรง อ่านไฟล์และคำนวณ hash ใหม่ (รูปที่ถูกย้ายหรือ touch ยังใช้ cache ได้)
+        - คืนค่า (digest, entry) โดย entry เป็น None ถ้าไม่มีใน cache
+          หรือ (face, reason) ถ้ามี (face เป็น None เมื่อไม่พบใบหน้าหรืออ่านรูปไม่ได้)
+        """
+        entry = self.paths.get(image_path)
+        if entry is not None and entry[:2] == (size, mtime):
+            digest = entry[2]
+        else:
+            with open(image_path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self.paths[image_path] = (size, mtime, digest)
+            self._dirty = True
+
+        slot = self.crops.get(digest)
+        if slot is None:
+            self.misses += 1
+            return digest, None
+        self.hits += 1
+        if slot == NO_FACE:
+            return digest, (None, "no face")
+        if slot == UNREADABLE:
+            return digest, (None, "unreadable")
+        return digest, (self._read_slot(slot), None)
+
+    def store(self, digest, face, reason=None):
+        """บันทึกผลการตัดใบหน้าของรูปที่มี hash เป็น digest"""
+        if face is not None:
+            self.crops[digest] = self._append(face)
+        else:
+            self.crops[digest] = UNREADABLE if reason == "unreadable" else NO_FACE
+        self._dirty = True
+
+    def save(self):
+        """บันทึก index ของ cache ถ้ามีการเปลี่ยนแปลง"""
+        if not self._dirty:
+            return
+        with open(self.index_path, "wb") as f:
+            pickle.dump({
+                'version': CACHE_VERSION,
+                'face_size': self.face_size,
+                'paths': self.paths,
+                'crops': self.crops,
+                'count': self.count,
+            }, f)
+        self._dirty = False
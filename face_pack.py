@@ -0,0 +1,124 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse     # ใช้สำหรับรับพารามิเตอร์จาก command line
+import os           # ใช้จัดการไฟล์และโฟลเดอร์
+import shutil       # ใช้ลบโฟลเดอร์รูปเดิมหลังแปลง
+import struct       # ใช้อ่านและเขียนส่วนหัวแบบ binary
+import cv2          # ใช้ถอดรหัสรูปและตรวจจับใบหน้าตอนแปลง
+import numpy as np  # ใช้ memory-map ใบหน้าในไฟล์ pack
+
+PACK_SUFFIX = ".faces"       # dataset/<student_id>.faces
+PACK_MAGIC = b"SCKFACES"
+PACK_VERSION = 1
+_HEADER = struct.Struct("<8sIIII")  # magic, เวอร์ชัน, จำนวนใบหน้า, ความสูง, ความกว้าง
+_DATA_OFFSET = 64  # ใบหน้าเริ่มที่ byte ที่ 64 (ส่วนหัวเติม 0 ให้ครบ)
+ENTRY_SEPARATOR = "#"  # รูปใน pack ใช้ path เป็น "<pack>#<ลำดับ>" ใน scan_dataset และ manifest
+
+# ฟังก์ชันหาตำแหน่งไฟล์ pack ของนักศึกษา
+def pack_path(dataset_path, student_id):
+    """คืนค่า path ของไฟล์ pack ของนักศึกษา student_id"""
+    return os.path.join(dataset_path, student_id + PACK_SUFFIX)
+
+# ฟังก์ชันแยก path ของรูปใน pack
+def split_entry(image_path):
+    """คืนค่า (path ของ pack, ลำดับใบหน้า) ถ้า image_path เป็นรูปใน pack มิฉะนั้นคืนค่า None"""
+    path, sep, index = image_path.rpartition(ENTRY_SEPARATOR)
+    if not sep or not path.endswith(PACK_SUFFIX) or not index.isdigit():
+        return None
+    return path, int(index)
+
+# ฟังก์ชันอ่านส่วนหัวของ pack
+def read_pack_header(path):
+    """อ่านส่วนหัว คืนค่า (จำนวนใบหน้า, ความสูง, ความกว้าง) (ValueError ถ้าไฟล์ผิดรูปแบบ)"""
+    with open(path, "rb") as f:
+        data = f.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path} is not a face pack")
+    magic, version, count, height, width = _HEADER.unpack(data)
+    if magic != PACK_MAGIC:
+        raise ValueError(f"{path} is not a face pack")
+    if version != PACK_VERSION:
+        raise ValueError(f"{path} has version {version}, expected {PACK_VERSION}")
+    if os.path.getsize(path) < _DATA_OFFSET + count * height * width:
+        raise ValueError(f"{path} is truncated")
+    return count, height, width
+
+# ฟังก์ชันโหลดใบหน้าทั้งหมดใน pack
+def load_pack(path):
+    """คืนค่าใบหน้าทั้งหมดเป็น np.memmap ขนาด (จำนวน, สูง, กว้าง) แบบ uint8 ด้วยการ map ครั้งเดียว"""
+    count, height, width = read_pack_header(path)
+    if count == 0:
+        return np.zeros((0, height, width), dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=_DATA_OFFSET,
+                     shape=(count, height, width))
+
+# ฟังก์ชันบันทึก pack
+def write_pack(path, faces):
+    """
+    บันทึกใบหน้าโทนสีเทา uint8 ขนาดเท่ากันทั้งหมดต่อกันในไฟล์เดียว
+    - เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อ ผู้อ่านจึงไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+    """
+    faces = np.ascontiguousarray(faces, dtype=np.uint8)
+    count, height, width = faces.shape
+    header = _HEADER.pack(PACK_MAGIC, PACK_VERSION, count, height, width)
+    with open(path + ".tmp", "wb") as f:
+        f.write(header + b"\0" * (_DATA_OFFSET - len(header)))
+        f.write(faces.tobytes())
+    os.replace(path + ".tmp", path)
+
+# ฟังก์ชันลบ pack ของนักศึกษา
+def remove_pack(dataset_path, student_id):
+    """ลบไฟล์ pack ของนักศึกษา (ถ้ามี) คืนค่า True ถ้าลบ"""
+    path = pack_path(dataset_path, student_id)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+# ฟังก์ชันแปลงโฟลเดอร์รูปของนักศึกษาเป็น pack
+def convert_student(dataset_path, student_id, face_detector, remove_folder=False):
+    """
+    ตัดใบหน้าจาก dataset/<student_id>/ แบบเดียวกับการเทรน (ใบหน้าใหญ่สุด ปรับ histogram 200x200)
+    แล้วบันทึกเป็น dataset/<student_id>.faces
+    - รูปที่อ่านไม่ได้หรือไม่พบใบหน้าจะถูกข้าม
+    - remove_folder=True ลบโฟลเดอร์รูปเดิมหลังบันทึก pack สำเร็จ
+    - คืนค่า (จำนวนใบหน้าใน pack, จำนวนรูปที่ข้าม)
+    """
+    from training import crop_face  # import ตอนใช้ เพราะ training ใช้ฟังก์ชันในไฟล์นี้
+    folder = os.path.join(dataset_path, student_id)
+    faces = []
+    skipped = 0
+    for image_name in sorted(os.listdir(folder)):
+        gray = cv2.imread(os.path.join(folder, image_name), cv2.IMREAD_GRAYSCALE)
+        face = crop_face(gray, face_detector) if gray is not None else None
+        if face is None:
+            skipped += 1
+            continue
+        faces.append(face)
+    if not faces:
+        return 0, skipped
+    write_pack(pack_path(dataset_path, student_id), np.stack(faces))
+    if remove_folder:
+        shutil.rmtree(folder)
+    return len(faces), skipped
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="แปลงโฟลเดอร์รูปใน dataset เป็นไฟล์ใบหน้าแบบ pack (หนึ่งไฟล์ต่อคน)")
+    parser.add_argument("students", nargs="*", help="รหัสนักศึกษา (ไม่ระบุ = ทุกคน)")
+    parser.add_argument("--dataset", default="dataset", help="โฟลเดอร์ dataset")
+    parser.add_argument("--remove-folders", action="store_true",
+                        help="ลบโฟลเดอร์รูปเดิมหลังแปลงสำเร็จ (ลดจำนวนไฟล์)")
+    args = parser.parse_args()
+
+    from training import create_face_detector
+    detector = create_face_detector()
+    student_ids = args.students or sorted(
+        d for d in os.listdir(args.dataset) if os.path.isdir(os.path.join(args.dataset, d)))
+    total = 0
+    for student_id in student_ids:
+        if not os.path.isdir(os.path.join(args.dataset, student_id)):
+            print(f"Skipped {student_id}: no image folder")
+            continue
+        count, skipped = convert_student(args.dataset, student_id, detector, args.remove_folders)
+        total += count
+        print(f"{student_id}: {count} faces packed" + (f", {skipped} images skipped" if skipped else ""))
+    print(f"Packed {total} faces for {len(student_ids)} students")
@@ -0,0 +1,164 @@
+# นำเข้าไลบรารีที่จำเป็น
+import math         # ใช้สำหรับคำนวณตำแหน่งจุดรอบวงกลมของ LBP
+import numpy as np  # ใช้สำหรับคำนวณ histogram และระยะทางแบบ vectorized
+
+class LBPHMatcher:
+    """
+    ตัวรู้จำใบหน้าแบบ batch ที่ให้ผลเหมือน LBPHFaceRecognizer.predict
+    - เก็บ histogram ของใบหน้าที่เทรนไว้ทั้งหมดใน matrix float32 ต่อเนื่องกัน
+    - คำนวณระยะ chi-square (HISTCMP_CHISQR_ALT) ของใบหน้าในเฟรมกับทุกตัวอย่างแบบ vectorized
+    - ระยะของแต่ละคลาสคือระยะของตัวอย่างที่ใกล้ที่สุด จึงใช้ confidence_threshold เดิมได้
+    """
+
+    def __init__(self, histograms, labels, radius=1, neighbors=8, grid_x=8, grid_y=8,
+                 chunk_elements=1 << 22, bin_major=False, row_sums=None):
+        """
+        สร้าง matcher จาก histogram (หนึ่งแถวต่อตัวอย่าง) และ label ของตัวอย่างที่เทรนไว้
+        - chunk_elements จำกัดขนาด array ชั่วคราวระหว่างคำนวณระยะ (จำนวน element)
+        - bin_major=True: histograms อยู่ในรูป (จำนวน bin, จำนวนตัวอย่าง) และเรียงตาม label แล้ว
+          จะใช้ array นั้นตรงๆ โดยไม่คัดลอก (เช่น np.memmap จาก model bundle)
+        - row_sums คือผลรวมของแต่ละตัวอย่างที่คำนวณไว้แล้ว (None = คำนวณใหม่)
+        """
+        labels = np.asarray(labels, dtype=np.int32).reshape(-1)
+        if bin_major:
+            self.labels = labels
+            self.histograms = histograms
+        else:
+            order = np.argsort(labels, kind="stable")
+            self.labels = labels[order]
+            # เก็บแบบ (จำนวน bin, จำนวนตัวอย่าง) เพื่อให้ดึงเฉพาะ bin ที่ต้องใช้ได้เป็นแถวต่อเนื่องกัน
+            self.histograms = np.ascontiguousarray(
+                np.asarray(histograms, dtype=np.float32).reshape(len(labels), -1)[order].T)
+        if row_sums is None:
+            row_sums = self.histograms.sum(axis=0, dtype=np.float64)
+        self.row_sums = np.asarray(row_sums, dtype=np.float64)
+        # ตำแหน่งแถวแรกของแต่ละคลาส (แถวเรียงตาม label แล้ว) สำหรับหาค่าต่ำสุดรายคลาส
+        self.classes, self.class_starts = np.unique(self.labels, return_index=True)
+        self.radius = radius
+        self.neighbors = neighbors
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.chunk_elements = chunk_elements
+
+    @classmethod
+    def from_recognizer(cls, recognizer):
+        """ดึง histogram, label และพารามิเตอร์จาก cv2.face.LBPHFaceRecognizer ที่เทรนแล้ว"""
+        histograms = recognizer.getHistograms()
+        if not histograms:
+            raise ValueError("Recognizer has no trained histograms")
+        return cls(np.vstack([h.reshape(1, -1) for h in histograms]),
+                   recognizer.getLabels(),
+                   radius=recognizer.getRadius(), neighbors=recognizer.getNeighbors(),
+                   grid_x=recognizer.getGridX(), grid_y=recognizer.getGridY())
+
+    def compute_histogram(self, face):
+        """
+        คำนวณ spatial LBP histogram ของภาพใบหน้าโทนสีเทา
+        - ใช้ extended LBP แบบ interpolate จุดรอบวงกลม เหมือน OpenCV
+        - แบ่งภาพเป็น grid_x x grid_y ช่อง และ normalize แต่ละช่องด้วยจำนวนพิกเซล
+        """
+        src = np.asarray(face, dtype=np.float32)
+        r = self.radius
+        rows, cols = src.shape
+        center = src[r:rows-r, r:cols-r]
+        codes = np.zeros(center.shape, dtype=np.int64)
+        eps = np.finfo(np.float32).eps
+        for n in range(self.neighbors):
+            x = r * math.cos(2.0 * math.pi * n / self.neighbors)
+            y = -r * math.sin(2.0 * math.pi * n / self.neighbors)
+            fx, fy = int(math.floor(x)), int(math.floor(y))
+            cx, cy = int(math.ceil(x)), int(math.ceil(y))
+            tx, ty = np.float32(x - fx), np.float32(y - fy)
+            w1 = (1 - tx) * (1 - ty)
+            w2 = tx * (1 - ty)
+            w3 = (1 - tx) * ty
+            w4 = tx * ty
+            t = (w1 * src[r+fy:rows-r+fy, r+fx:cols-r+fx]
+                 + w2 * src[r+fy:rows-r+fy, r+cx:cols-r+cx]
+                 + w3 * src[r+cy:rows-r+cy, r+fx:cols-r+fx]
+                 + w4 * src[r+cy:rows-r+cy, r+cx:cols-r+cx])
+            codes |= ((t > center) | (np.abs(t - center) < eps)).astype(np.int64) << n
+
+        bins = 1 << self.neighbors
+        height, width = codes.shape[0] // self.grid_y, codes.shape[1] // self.grid_x
+        cells = (codes[:height * self.grid_y, :width * self.grid_x]
+                 .reshape(self.grid_y, height, self.grid_x, width)
+                 .transpose(0, 2, 1, 3)
+                 .reshape(self.grid_y * self.grid_x, height * width))
+        offsets = np.arange(len(cells))[:, None] * bins
+        hist = np.bincount((cells + offsets).ravel(), minlength=len(cells) * bins)
+        return hist.astype(np.float32) / np.float32(height * width)
+
+    def distances(self, faces):
+        """
+        คำนวณระยะ chi-square ระหว่างทุกใบหน้ากับทุกตัวอย่าง
+        - ใช้ (a-b)^2/(a+b) = a + b - 4ab/(a+b) จึงคำนวณเฉพาะ bin ที่ใบหน้าที่ถามไม่เป็นศูนย์
+          (histogram ของใบหน้าจริงมีค่าไม่เป็นศูนย์ราว 30% ของ bin)
+        - คืนค่า array ขนาด (จำนวนใบหน้า, จำนวนตัวอย่าง)
+        """
+        n_rows = self.histograms.shape[1]
+        result = np.empty((len(faces), n_rows), dtype=np.float64)
+        for i, face in enumerate(faces):
+            query = self.compute_histogram(face)
+            nonzero = np.flatnonzero(query)
+            b = query[nonzero][:, None]
+            step = max(1, self.chunk_elements // max(1, len(nonzero)))
+            for start in range(0, n_rows, step):
+                a = self.histograms[nonzero, start:start+step]
+                cross = a * b
+                a += b
+                cross /= a
+                result[i, start:start+step] = cross.sum(axis=0, dtype=np.float64)
+            result[i] = 2.0 * (self.row_sums + query.sum(dtype=np.float64)) - 8.0 * result[i]
+        # ปัดค่าติดลบเล็กน้อยจากการปัดเศษ float ให้เป็นศูนย์
+        np.maximum(result, 0.0, out=result)
+        return result
+
+    def match(self, faces, k=1):
+        """
+        รู้จำใบหน้าหลายใบพร้อมกัน
+        - คืนค่า list (หนึ่งรายการต่อใบหน้า) ของ [(label, distance), ...] k คลาสที่ใกล้ที่สุด
+        - distance มีความหมายเดียวกับ confidence ของ recognizer.predict
+        """
+        if len(faces) == 0:
+            return []
+        per_class = np.minimum.reduceat(self.distances(faces), self.class_starts, axis=1)
+        k = min(k, len(self.classes))
+        top = np.argsort(per_class, axis=1, kind="stable")[:, :k]
+        return [[(int(self.classes[c]), float(row[c])) for c in idx]
+                for row, idx in zip(per_class, top)]
+
+    def predict(self, face):
+        """รู้จำใบหน้าหนึ่งใบ คืนค่า (label, confidence) เหมือน recognizer.predict"""
+        return self.match([face])[0][0]
+
+class ShardedMatcher:
+    """
+    รู้จำด้วย shard ของกลุ่มเรียนก่อน แล้วเทียบกับโมเดลรวมเฉพาะใบหน้าที่ shard ไม่รู้จัก
+    - shard และ fallback เป็น LBPHMatcher ที่ใช้ label ชุดเดียวกัน
+    - ใบหน้าที่ระยะใน shard ไม่ต่ำกว่า fallback_threshold จะถูกรู้จำใหม่ด้วย fallback (ถ้ามี)
+    """
+
+    def __init__(self, shard, fallback=None, fallback_threshold=65):
+        """สร้าง matcher จาก shard ของกลุ่มเรียน และโมเดลรวม (None = ไม่ใช้ fallback)"""
+        self.shard = shard
+        self.fallback = fallback
+        self.fallback_threshold = fallback_threshold
+        self.histograms = shard.histograms
+        self.fallbacks = 0  # จำนวนใบหน้าที่ต้องเทียบกับโมเดลรวม
+
+    def match(self, faces, k=1):
+        """รู้จำใบหน้าหลายใบพร้อมกัน คืนค่าแบบเดียวกับ LBPHMatcher.match"""
+        results = self.shard.match(faces, k)
+        if self.fallback is None:
+            return results
+        misses = [i for i, top in enumerate(results) if top[0][1] >= self.fallback_threshold]
+        if misses:
+            self.fallbacks += len(misses)
+            for i, top in zip(misses, self.fallback.match([faces[i] for i in misses], k)):
+                results[i] = top
+        return results
+
+    def predict(self, face):
+        """รู้จำใบหน้าหนึ่งใบ คืนค่า (label, confidence) เหมือน recognizer.predict"""
+        return self.match([face])[0][0]
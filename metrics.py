@@ -0,0 +1,121 @@
+# นำเข้าไลบรารีที่จำเป็น
+import bisect     # ใช้หาช่วง (bucket) ของ histogram
+import json       # ใช้บันทึก snapshot ให้ web_app อ่าน
+import os         # ใช้เขียนไฟล์แบบ atomic
+import threading  # ใช้ป้องกันการแก้ไขค่าพร้อมกันจากหลาย thread
+import time       # ใช้สำหรับเวลาของ snapshot
+
+METRICS_PATH = "recognition_metrics.json"  # snapshot ของโปรแกรมรู้จำใบหน้า สำหรับ /metrics ใน web_app
+METRICS_DUMP_INTERVAL = 5.0                 # วินาทีระหว่างการบันทึก snapshot
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)  # ขอบบนของแต่ละ bucket (มิลลิวินาที)
+
+class StageMetrics:
+    """
+    ตัวเก็บสถิติเวลาแยกตามขั้นตอน (histogram) และตัวนับ สำหรับเปิดไว้ตลอดในระบบจริง
+    - observe() เพิ่มค่าใน bucket ที่กำหนดไว้ล่วงหน้า ไม่เก็บค่าดิบ จึงใช้หน่วยความจำคงที่
+    - ใช้ร่วมกันได้หลาย thread
+    - snapshot มีตัวนับที่เพิ่มขึ้นตั้งแต่ dump() ครั้งก่อน ('window') ใช้คำนวณอัตราช่วงล่าสุด
+    """
+
+    def __init__(self, buckets=BUCKETS_MS):
+        """สร้างตัวเก็บสถิติว่างๆ"""
+        self.buckets = tuple(buckets)
+        self.histograms = {}  # {ขั้นตอน: [จำนวนต่อ bucket, เวลารวม (วินาที), จำนวนครั้ง]}
+        self.counters = {}    # {ชื่อ: จำนวน}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._last_dump = 0.0
+        self._window_start = self.started_at  # เวลาของ snapshot ที่ dump() ครั้งก่อน
+        self._window_counters = {}            # ตัวนับ ณ dump() ครั้งก่อน
+
+    def observe(self, stage, seconds):
+        """บันทึกเวลาที่ใช้ในขั้นตอน stage หนึ่งครั้ง"""
+        index = bisect.bisect_left(self.buckets, seconds * 1000)
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][index] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def inc(self, name, amount=1):
+        """เพิ่มค่าตัวนับ name"""
+        if amount:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """คืนค่าสถิติปัจจุบันเป็น dict ที่แปลงเป็น JSON ได้"""
+        with self._lock:
+            now = time.time()
+            return {
+                'started_at': self.started_at,
+                'updated_at': now,
+                'buckets_ms': list(self.buckets),
+                'histograms': {stage: {'counts': list(h[0]), 'sum': h[1], 'count': h[2]}
+                               for stage, h in self.histograms.items()},
+                'counters': dict(self.counters),
+                'window': {
+                    'seconds': now - self._window_start,
+                    'counters': {name: value - self._window_counters.get(name, 0)
+                                 for name, value in self.counters.items()},
+                },
+            }
+
+    def dump(self, path=METRICS_PATH, interval=0.0):
+        """
+        บันทึก snapshot ลงไฟล์ให้โปรแกรมอื่น (web_app) อ่าน
+        - ถ้าบันทึกไปแล้วภายใน interval วินาที จะไม่ทำอะไร จึงเรียกได้ทุกเฟรม
+        - เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อ ผู้อ่านจึงไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+        - window ของ snapshot ถัดไปเริ่มนับจากครั้งนี้
+        """
+        now = time.monotonic()
+        if interval and now - self._last_dump < interval:
+            return
+        self._last_dump = now
+        snapshot = self.snapshot()
+        with self._lock:
+            self._window_start = snapshot['updated_at']
+            self._window_counters = snapshot['counters']
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(snapshot, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+# สถิติของโปรแกรมรู้จำใบหน้าใน process นี้ (ใช้ร่วมกันทุกโหมดและทุก thread)
+RECOGNITION_METRICS = StageMetrics()
+
+# ฟังก์ชันอ่าน snapshot ที่บันทึกไว้
+def load_snapshot(path=METRICS_PATH):
+    """อ่าน snapshot จากไฟล์ คืนค่า None ถ้ายังไม่มีหรืออ่านไม่ได้"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# ฟังก์ชันแปลง snapshot เป็นข้อความรูปแบบ Prometheus
+def render_prometheus(snapshot, histogram_name, label, counter_prefix=None):
+    """
+    แปลง snapshot เป็นบรรทัดข้อความรูปแบบ Prometheus text exposition
+    - histogram ของแต่ละขั้นตอนใช้ชื่อ histogram_name และ label ชื่อ label (หน่วยวินาที)
+    - ตัวนับใช้ชื่อ counter_prefix + ชื่อ + '_total'
+    - คืนค่า list ของบรรทัด
+    """
+    lines = [f"# TYPE {histogram_name} histogram"]
+    bounds = [ms / 1000 for ms in snapshot['buckets_ms']] + ['+Inf']
+    for stage, hist in sorted(snapshot['histograms'].items()):
+        cumulative = 0
+        for bound, count in zip(bounds, hist['counts']):
+            cumulative += count
+            lines.append(f'{histogram_name}_bucket{{{label}="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{histogram_name}_sum{{{label}="{stage}"}} {hist["sum"]:.6f}')
+        lines.append(f'{histogram_name}_count{{{label}="{stage}"}} {hist["count"]}')
+    if counter_prefix:
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {counter_prefix}{name}_total counter")
+            lines.append(f"{counter_prefix}{name}_total {value}")
+    return lines
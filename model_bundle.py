@@ -0,0 +1,182 @@
+# นำเข้าไลบรารีที่จำเป็น
+import hashlib      # ใช้คำนวณ fingerprint ของ dataset
+import json         # ใช้เก็บข้อมูลส่วนหัวของ bundle
+import os           # ใช้เขียนไฟล์แบบ atomic
+import re           # ใช้แปลงรหัสกลุ่มเรียนเป็นชื่อไฟล์
+import struct       # ใช้อ่านและเขียนส่วนหัวแบบ binary
+import numpy as np  # ใช้ memory-map histogram และ label
+from matcher import LBPHMatcher  # ตัวรู้จำที่ใช้ histogram จาก bundle โดยตรง
+
+BUNDLE_PATH = "face_model.bin"  # โมเดลสำหรับรู้จำ (histogram, label, mapping และ fingerprint ในไฟล์เดียว)
+BUNDLE_MAGIC = b"SCKMODEL"
+BUNDLE_VERSION = 1
+SHARD_DIR = "shards"  # โฟลเดอร์เก็บ shard ของแต่ละกลุ่มเรียน
+_ALIGN = 64  # จัดตำแหน่งข้อมูลแต่ละส่วนให้ตรงขอบ 64 byte
+_WRITE_BLOCK = 256  # จำนวน histogram ที่จัดเรียงต่อครั้งตอนบันทึก bundle
+
+# ฟังก์ชันคำนวณ fingerprint ของ dataset
+def dataset_fingerprint(images):
+    """
+    คำนวณ fingerprint จาก {image_path: (person_id, size, mtime, ...)} เช่นผลของ scan_dataset
+    - ใช้เฉพาะ path, รหัสนักศึกษา, ขนาดไฟล์ และ mtime จึงไม่ต้องอ่านรูป
+    """
+    digest = hashlib.sha1()
+    for image_path in sorted(images):
+        person_id, size, mtime = images[image_path][:3]
+        digest.update(f"{image_path}\0{person_id}\0{size}\0{mtime}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+# ฟังก์ชันปัดตำแหน่งขึ้นให้ตรงขอบ
+def _aligned(offset):
+    """ปัด offset ขึ้นเป็นพหุคูณของ _ALIGN"""
+    return -(-offset // _ALIGN) * _ALIGN
+
+# ฟังก์ชันคำนวณ fingerprint ของรายชื่อกลุ่มเรียน
+def roster_fingerprint(student_ids):
+    """คำนวณ fingerprint ของรายชื่อนักศึกษา (ไม่ขึ้นกับลำดับ)"""
+    return hashlib.sha1("\n".join(sorted(student_ids)).encode("utf-8")).hexdigest()
+
+# ฟังก์ชันหาตำแหน่งไฟล์ shard ของกลุ่มเรียน
+def shard_path(section_id):
+    """คืนค่า path ของ shard ของกลุ่มเรียน (อักขระที่ใช้ในชื่อไฟล์ไม่ได้ถูกแทนด้วย _)"""
+    return os.path.join(SHARD_DIR, re.sub(r"[^\w.-]", "_", section_id) + ".bin")
+
+# ฟังก์ชันบันทึก model bundle
+def write_bundle(recognizer, id_to_num, images, path=BUNDLE_PATH):
+    """
+    บันทึกโมเดล LBPH ที่เทรนแล้วเป็นไฟล์ binary ไฟล์เดียว
+    - ส่วนหัว: magic, เวอร์ชัน และ JSON (พารามิเตอร์ LBPH, mapping, fingerprint, ตำแหน่งข้อมูล)
+    - histogram เรียงตาม label และเก็บแบบ (จำนวน bin, จำนวนตัวอย่าง) พร้อมผลรวมของแต่ละตัวอย่าง
+      จึง memory-map เข้า LBPHMatcher ได้ทันทีโดยไม่ต้องคำนวณหรือคัดลอก
+    """
+    labels = np.asarray(recognizer.getLabels(), dtype=np.int32).reshape(-1)
+    order = np.argsort(labels, kind="stable")
+    source = recognizer.getHistograms()
+    # จัดเรียงเป็นแบบ bin-major ทีละช่วง เพื่อไม่ต้องมีสำเนาของ histogram ทั้งหมดหลายชุด
+    histograms = np.empty((source[0].size if source else 0, len(source)), dtype=np.float32)
+    for begin in range(0, len(order), _WRITE_BLOCK):
+        block = order[begin:begin + _WRITE_BLOCK]
+        histograms[:, begin:begin + len(block)] = np.vstack([source[i].reshape(1, -1) for i in block]).T
+    del source
+    header = {
+        'radius': recognizer.getRadius(),
+        'neighbors': recognizer.getNeighbors(),
+        'grid_x': recognizer.getGridX(),
+        'grid_y': recognizer.getGridY(),
+        'num_to_id': {str(num): person_id for person_id, num in id_to_num.items()},
+        'fingerprint': dataset_fingerprint(images),
+    }
+    _write_arrays(path, header, histograms, histograms.sum(axis=0, dtype=np.float64), labels[order])
+
+# ฟังก์ชันสร้าง shard ของกลุ่มเรียนจาก bundle รวม
+def write_shard(student_ids, path, bundle_path=BUNDLE_PATH):
+    """
+    สร้าง shard ที่มีเฉพาะ histogram ของนักศึกษาใน student_ids จาก bundle รวม
+    - ใช้ label และ fingerprint ของ dataset เดียวกับ bundle รวม จึงใช้ mapping เดียวกันได้
+    - เก็บ fingerprint ของรายชื่อไว้ด้วย เพื่อรู้ว่า shard ล้าสมัยเมื่อรายชื่อเปลี่ยน
+    - คืนค่าจำนวนนักศึกษาที่มี histogram ใน shard จริง (ValueError ถ้าไม่มีเลย)
+    """
+    header = read_bundle_header(bundle_path)
+    matcher, num_to_id = load_bundle(bundle_path)
+    id_to_num = {person_id: num for num, person_id in num_to_id.items()}
+    wanted = [id_to_num[sid] for sid in student_ids if sid in id_to_num]
+    columns = np.flatnonzero(np.isin(matcher.labels, wanted))
+    if len(columns) == 0:
+        raise ValueError("No enrolled faces for any student in the roster")
+    written = np.unique(matcher.labels[columns]).tolist()
+    shard_header = {key: header[key] for key in ('radius', 'neighbors', 'grid_x', 'grid_y', 'fingerprint')}
+    shard_header['num_to_id'] = {str(num): num_to_id[num] for num in written}
+    shard_header['roster'] = roster_fingerprint(student_ids)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _write_arrays(path, shard_header, np.ascontiguousarray(matcher.histograms[:, columns]),
+                  np.asarray(matcher.row_sums[columns]), matcher.labels[columns])
+    return len(written)
+
+# ฟังก์ชันเขียน array ของโมเดลลงไฟล์ bundle
+def _write_arrays(path, header, histograms, row_sums, labels):
+    """
+    เขียนส่วนหัวและ array (histogram แบบ bin-major, ผลรวม, label) ลงไฟล์
+    - เขียนไฟล์ชั่วคราวแล้วเปลี่ยนชื่อ ผู้อ่านจึงไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+    """
+    histograms = np.asarray(histograms, dtype=np.float32)
+    row_sums = np.asarray(row_sums, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int32)
+    dim, rows = histograms.shape
+    header = dict(header, rows=int(rows), dim=int(dim))
+    # คำนวณตำแหน่งของแต่ละส่วน (ขนาดส่วนหัวต้องคงที่ก่อนจึงจะรู้ตำแหน่งข้อมูล)
+    prefix = len(BUNDLE_MAGIC) + 8
+    header['histograms_offset'] = 0
+    while True:
+        encoded = json.dumps(header, sort_keys=True).encode("utf-8")
+        start = _aligned(prefix + len(encoded))
+        if header['histograms_offset'] == start:
+            break
+        header['histograms_offset'] = start
+        header['row_sums_offset'] = _aligned(start + histograms.nbytes)
+        header['labels_offset'] = _aligned(header['row_sums_offset'] + row_sums.nbytes)
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(BUNDLE_MAGIC + struct.pack("<II", BUNDLE_VERSION, len(encoded)) + encoded)
+        for offset, array in ((header['histograms_offset'], histograms),
+                              (header['row_sums_offset'], row_sums),
+                              (header['labels_offset'], labels)):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.tobytes())
+    os.replace(path + ".tmp", path)
+
+# ฟังก์ชันอ่านส่วนหัวของ model bundle
+def read_bundle_header(path=BUNDLE_PATH):
+    """อ่านและตรวจสอบส่วนหัวของ bundle คืนค่า dict (ValueError ถ้าไฟล์ผิดรูปแบบหรือผิดเวอร์ชัน)"""
+    with open(path, "rb") as f:
+        prefix = f.read(len(BUNDLE_MAGIC) + 8)
+        if len(prefix) < len(BUNDLE_MAGIC) + 8 or prefix[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        version, header_size = struct.unpack("<II", prefix[len(BUNDLE_MAGIC):])
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"{path} has version {version}, expected {BUNDLE_VERSION}")
+        return json.loads(f.read(header_size).decode("utf-8"))
+
+# ฟังก์ชันตรวจว่า bundle ตรงกับรูปที่เทรนหรือไม่
+def bundle_is_current(images, path=BUNDLE_PATH):
+    """คืนค่า True ถ้ามี bundle ที่อ่านได้และ fingerprint ตรงกับ images"""
+    try:
+        return read_bundle_header(path)['fingerprint'] == dataset_fingerprint(images)
+    except (OSError, ValueError, KeyError):
+        return False
+
+# ฟังก์ชันโหลด model bundle
+def load_bundle(path=BUNDLE_PATH, fingerprint=None, roster=None):
+    """
+    โหลด bundle เป็น (LBPHMatcher, num_to_id) ด้วย np.memmap (ไม่อ่านข้อมูลทั้งไฟล์ตอนเริ่ม)
+    - fingerprint ที่ส่งมาต้องตรงกับของ dataset ตอนเทรน มิฉะนั้นถือว่าโมเดลล้าสมัย
+    - roster (สำหรับ shard) คือรายชื่อนักศึกษาปัจจุบันของกลุ่มเรียน ต้องตรงกับตอนสร้าง shard
+    - ทุก label ในโมเดลต้องมีรหัสนักศึกษาใน mapping และ mapping ต้องไม่ซ้ำกัน
+    - ไม่ผ่านการตรวจสอบข้อใด จะ raise ValueError แทนการรู้จำผิดคนโดยไม่รู้ตัว
+    """
+    header = read_bundle_header(path)
+    if fingerprint is not None and header['fingerprint'] != fingerprint:
+        raise ValueError("Model bundle is stale: dataset changed since training")
+    if roster is not None and header.get('roster') != roster_fingerprint(roster):
+        raise ValueError("Model shard is stale: roster changed since it was built")
+    rows, dim = header['rows'], header['dim']
+    expected = header['labels_offset'] + 4 * rows
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"{path} is truncated")
+
+    histograms = np.memmap(path, dtype=np.float32, mode="r",
+                           offset=header['histograms_offset'], shape=(dim, rows))
+    row_sums = np.memmap(path, dtype=np.float64, mode="r",
+                         offset=header['row_sums_offset'], shape=(rows,))
+    labels = np.fromfile(path, dtype=np.int32, count=rows, offset=header['labels_offset'])
+
+    num_to_id = {int(num): person_id for num, person_id in header['num_to_id'].items()}
+    if len(set(num_to_id.values())) != len(num_to_id):
+        raise ValueError("Model bundle maps several labels to the same student")
+    missing = set(np.unique(labels).tolist()) - set(num_to_id)
+    if missing:
+        raise ValueError(f"Model bundle has labels without a student: {sorted(missing)}")
+
+    matcher = LBPHMatcher(histograms, labels, radius=header['radius'],
+                          neighbors=header['neighbors'], grid_x=header['grid_x'],
+                          grid_y=header['grid_y'], bin_major=True, row_sums=row_sums)
+    return matcher, num_to_id
@@ -0,0 +1,127 @@
+# นำเข้าไลบรารีที่จำเป็น
+import cv2        # ใช้สำหรับเปิดกล้อง ไฟล์วิดีโอ หรือ stream
+import threading  # ใช้สำหรับสร้าง thread ของแต่ละกล้อง
+import time       # ใช้สำหรับวัดเวลาและอัตราเฟรม
+from metrics import RECOGNITION_METRICS  # ใช้เก็บเวลาอ่านภาพ
+
+# ฟังก์ชันแปลงข้อความเป็นแหล่งภาพของ cv2.VideoCapture
+def parse_source(text):
+    """แปลงเลขอุปกรณ์ (เช่น '0') เป็น int ส่วนไฟล์วิดีโอหรือ URL ใช้ข้อความเดิม"""
+    text = text.strip()
+    return int(text) if text.isdigit() else text
+
+class CameraWorker(threading.Thread):
+    """Thread ของกล้องหนึ่งตัว: อ่านภาพ ประมวลผล และเก็บสถิติของกล้องนั้น"""
+
+    def __init__(self, name, source, process, handle=None):
+        """
+        สร้าง thread สำหรับกล้องหนึ่งตัว
+        - source คือเลขอุปกรณ์ ไฟล์วิดีโอ หรือ URL ของ stream
+        - process(frame) คืนค่าผลการรู้จำของเฟรม
+        - handle(frame, results) ยืนยันผล บันทึกการเข้าเรียน และวาดผลลงบนเฟรม
+        """
+        super().__init__(name=name, daemon=True)
+        self.source = source
+        self.process = process
+        self.handle = handle
+        self.stop_event = threading.Event()
+        self.frames = 0
+        self.busy = 0.0         # เวลาประมวลผลรวม (วินาที)
+        self.started_at = None
+        self.error = None
+        self._latest = None     # เฟรมล่าสุดที่วาดผลแล้ว สำหรับแสดงผล
+        self._lock = threading.Lock()
+
+    def run(self):
+        """อ่านและประมวลผลภาพจนกว่าจะถูกสั่งหยุดหรือแหล่งภาพหมด"""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            self.error = f"Could not open source {self.source!r}"
+            print(f"Error: {self.error}")
+            return
+        self.started_at = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                RECOGNITION_METRICS.observe('capture', time.perf_counter() - started)
+                started = time.perf_counter()
+                results = self.process(frame)
+                if self.handle is not None:
+                    self.handle(frame, results)
+                self.busy += time.perf_counter() - started
+                self.frames += 1
+                with self._lock:
+                    self._latest = frame
+        finally:
+            cap.release()
+
+    def latest_frame(self):
+        """คืนค่าเฟรมล่าสุดแล้วล้างออก (None ถ้ายังไม่มีเฟรมใหม่)"""
+        with self._lock:
+            frame, self._latest = self._latest, None
+        return frame
+
+    def stop(self):
+        """สั่งให้ thread หยุดอ่านภาพ"""
+        self.stop_event.set()
+
+    def stats(self):
+        """คืนค่าสถิติของกล้องเป็น dict (อัตราเฟรม และเวลาประมวลผลเฉลี่ยต่อเฟรม)"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            'source': self.source,
+            'frames_processed': self.frames,
+            'fps': round(self.frames / elapsed, 1) if elapsed else 0.0,
+            'avg_latency_ms': round(1000 * self.busy / self.frames, 1) if self.frames else 0.0,
+            'error': self.error,
+        }
+
+class MultiCameraServer:
+    """
+    รันการรู้จำจากหลายกล้องใน process เดียว
+    - ทุกกล้องใช้โมเดลและตัวบันทึกการเข้าเรียนร่วมกัน (ส่งผ่าน worker_factory)
+    - แต่ละกล้องมี thread และสถิติของตัวเอง
+    """
+
+    def __init__(self, sources, worker_factory):
+        """
+        สร้าง thread ของทุกกล้อง
+        - worker_factory(name, source) ถูกเรียกหนึ่งครั้งต่อกล้อง และต้องคืนค่า (process, handle)
+        """
+        self.workers = []
+        for index, source in enumerate(sources):
+            name = f"cam{index}"
+            process, handle = worker_factory(name, source)
+            self.workers.append(CameraWorker(name, source, process, handle))
+
+    def start(self):
+        """เริ่มการทำงานของทุกกล้อง"""
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """หยุดการทำงานของทุกกล้องและรอให้จบ"""
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(timeout=2.0)
+
+    def alive(self):
+        """ตรวจสอบว่ายังมีกล้องที่ทำงานอยู่หรือไม่"""
+        return any(worker.is_alive() for worker in self.workers)
+
+    def latest_frames(self):
+        """คืนค่า {ชื่อกล้อง: เฟรมล่าสุด} ของกล้องที่มีเฟรมใหม่"""
+        frames = {}
+        for worker in self.workers:
+            frame = worker.latest_frame()
+            if frame is not None:
+                frames[worker.name] = frame
+        return frames
+
+    def stats(self):
+        """คืนค่า {ชื่อกล้อง: สถิติ} ของทุกกล้อง"""
+        return {worker.name: worker.stats() for worker in self.workers}
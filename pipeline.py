@@ -0,0 +1,144 @@
+# นำเข้าไลบรารีที่จำเป็น
+import queue      # ใช้สำหรับคิวแบบจำกัดขนาดระหว่างแต่ละขั้นตอน
+import threading  # ใช้สำหรับสร้าง thread ของแต่ละขั้นตอน
+import time       # ใช้สำหรับวัดเวลาและรอ
+from metrics import RECOGNITION_METRICS  # ใช้เก็บเวลาอ่านภาพและจำนวนเฟรมที่ถูกทิ้ง
+
+# ฟังก์ชันใส่ข้อมูลลงคิวโดยทิ้งข้อมูลเก่าที่สุดเมื่อคิวเต็ม
+def put_latest(q, item):
+    """
+    ใส่ข้อมูลลงในคิวแบบจำกัดขนาด
+    - ถ้าคิวเต็ม ให้ทิ้งข้อมูลที่เก่าที่สุดออกก่อน (drop-stale)
+    - คืนค่าจำนวนรายการที่ถูกทิ้ง
+    """
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+class FrameGrabber(threading.Thread):
+    """Thread สำหรับอ่านภาพจากกล้องตลอดเวลา และเก็บไว้เฉพาะเฟรมล่าสุด"""
+
+    def __init__(self, cap, output_queue):
+        """
+        สร้าง thread สำหรับอ่านภาพ
+        - cap คือ cv2.VideoCapture ที่เปิดแล้ว
+        - output_queue คือคิวที่ส่งเฟรม (ลำดับเฟรม, เฟรม) ให้ขั้นตอนถัดไป
+        """
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.output_queue = output_queue
+        self.stop_event = threading.Event()
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def run(self):
+        """อ่านภาพจนกว่าจะถูกสั่งหยุดหรือกล้องไม่ส่งภาพ"""
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            RECOGNITION_METRICS.observe('capture', time.perf_counter() - started)
+            dropped = put_latest(self.output_queue, (self.frames_read, frame))
+            RECOGNITION_METRICS.inc('frames_dropped', dropped)
+            self.frames_dropped += dropped
+            self.frames_read += 1
+
+    def stop(self):
+        """สั่งให้ thread หยุดอ่านภาพ"""
+        self.stop_event.set()
+
+class RecognitionPipeline:
+    """
+    ไปป์ไลน์แบ่งขั้นตอน capture -> detect/recognize -> display/บันทึก
+    - FrameGrabber อ่านภาพและเก็บเฉพาะเฟรมล่าสุด
+    - worker หลาย thread ตรวจจับและรู้จำใบหน้า (OpenCV ปล่อย GIL ระหว่างคำนวณ)
+    - ผู้เรียกใช้ results() เป็นขั้นตอนสุดท้าย (แสดงผลและบันทึกการเข้าเรียน)
+    """
+
+    def __init__(self, cap, worker_factory, num_workers=2, queue_size=2):
+        """
+        สร้างไปป์ไลน์
+        - worker_factory ถูกเรียกหนึ่งครั้งต่อ worker และต้องคืนฟังก์ชัน process(frame)
+        - queue_size กำหนดขนาดคิวระหว่างขั้นตอน (ยิ่งเล็ก latency ยิ่งต่ำ)
+        """
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self.grabber = FrameGrabber(cap, self.frame_queue)
+        self.workers = [
+            threading.Thread(target=self._work, args=(worker_factory(),), daemon=True)
+            for _ in range(max(1, num_workers))
+        ]
+        self.results_dropped = 0
+        self.frames_processed = 0
+        self.stale_skipped = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """เริ่มการทำงานของทุก thread"""
+        self.grabber.start()
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self):
+        """หยุดการทำงานของทุก thread และรอให้จบ"""
+        self.grabber.stop()
+        self.grabber.join(timeout=1.0)
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+
+    def _work(self, process):
+        """ลูปของ worker: รับเฟรมล่าสุด ประมวลผล แล้วส่งผลลัพธ์ต่อ"""
+        while True:
+            try:
+                seq, frame = self.frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                if not self.grabber.is_alive():
+                    return
+                continue
+            started = time.perf_counter()
+            results = process(frame)
+            latency = time.perf_counter() - started
+            dropped = put_latest(self.result_queue, (seq, frame, results, latency))
+            RECOGNITION_METRICS.inc('frames_dropped', dropped)
+            with self._lock:
+                self.frames_processed += 1
+                self.results_dropped += dropped
+
+    def results(self):
+        """
+        Generator สำหรับขั้นตอนสุดท้าย
+        - คืนค่า (frame, results, latency) ตามลำดับเฟรม
+        - ข้ามผลลัพธ์ที่เก่ากว่าเฟรมที่แสดงไปแล้ว
+        """
+        last_seq = -1
+        while True:
+            try:
+                seq, frame, results, latency = self.result_queue.get(timeout=0.1)
+            except queue.Empty:
+                if (not any(worker.is_alive() for worker in self.workers)
+                        and self.result_queue.empty()):
+                    return
+                continue
+            if seq <= last_seq:
+                self.stale_skipped += 1
+                continue
+            last_seq = seq
+            yield frame, results, latency
+
+    def stats(self):
+        """คืนค่าสถิติของไปป์ไลน์เป็น dict"""
+        return {
+            'frames_read': self.grabber.frames_read,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.grabber.frames_dropped + self.results_dropped,
+            'stale_skipped': self.stale_skipped,
+        }
@@ -0,0 +1,186 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse    # ใช้สำหรับรับพารามิเตอร์จาก command line
+import os          # ใช้อ่านเวลาแก้ไขไฟล์วิดีโอ
+from concurrent.futures import ProcessPoolExecutor  # ใช้ประมวลผลช่วงเวลาของวิดีโอแบบหลาย process
+from datetime import datetime, timedelta  # ใช้คำนวณเวลาจริงของแต่ละเฟรม
+import cv2         # ใช้อ่านไฟล์วิดีโอและโมเดล LBPH
+from database import AttendanceRecorder  # ใช้บันทึกการเข้าเรียน
+from detection import FastFaceDetector  # ใช้ตรวจจับใบหน้าแบบย่อภาพและค้นหาเฉพาะ ROI
+from matcher import ShardedMatcher  # ใช้รู้จำเฉพาะนักศึกษาในกลุ่มเรียน
+from model_bundle import load_bundle, shard_path  # ใช้โหลดโมเดลและ mapping ที่ตรวจสอบแล้ว
+from preprocessing import PREPROCESS_PROFILES, FacePreprocessor  # ใช้เตรียมภาพใบหน้า
+from recognize_realtime import analyze_frame, handle_results, load_model, load_opencv_model  # ขั้นตอนรู้จำเดียวกับโหมด realtime
+
+class SightingCollector:
+    """เก็บผลการยืนยันตัวตน (student_id, เวลา) แทนการเขียนฐานข้อมูลทันที ใช้แทน AttendanceRecorder"""
+
+    def __init__(self):
+        """สร้างรายการผลการยืนยันตัวตนว่างๆ"""
+        self.sightings = []
+
+    def record(self, student_id, when=None):
+        """เก็บผลการยืนยันตัวตนหนึ่งครั้ง"""
+        self.sightings.append((student_id, when or datetime.now()))
+        return True
+
+# ฟังก์ชันอ่านข้อมูลของไฟล์วิดีโอ
+def video_info(path):
+    """คืนค่า (จำนวนเฟรม, fps) ของไฟล์วิดีโอ (จำนวนเฟรม <= 0 เมื่อไฟล์ไม่ระบุ เช่น webm หรือ stream)"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frames, fps
+
+# ฟังก์ชันประมาณเวลาเริ่มบันทึกวิดีโอ
+def video_start_time(path, frames, fps):
+    """
+    ประมาณเวลาเริ่มบันทึกจากเวลาแก้ไขไฟล์ (เวลาที่บันทึกเสร็จ) ลบด้วยความยาววิดีโอ
+    - ถ้าไม่รู้จำนวนเฟรม จะใช้เวลาแก้ไขไฟล์โดยตรง (ควรระบุเวลาเริ่มเองด้วย --start)
+    """
+    return datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=max(0, frames) / fps)
+
+# ฟังก์ชันโหลดโมเดลที่เทรนแล้วโดยไม่เทรนใหม่ (ใช้ใน process ลูก)
+def _load_trained_model(use_opencv=False, section=None, fallback=False):
+    """
+    โหลด face_model.bin (และ face_model.yml ถ้า use_opencv=True) คืนค่า (recognizer, num_to_id)
+    - section โหลด shard ของกลุ่มเรียนที่ process หลักสร้างไว้แล้ว
+    """
+    matcher, num_to_id = load_bundle()
+    if section is not None:
+        shard, _ = load_bundle(shard_path(section))
+        return ShardedMatcher(shard, matcher if fallback else None), num_to_id
+    if not use_opencv:
+        return matcher, num_to_id
+    recognizer = load_opencv_model(matcher)
+    if recognizer is None:
+        raise ValueError("face_model.yml does not match the model bundle")
+    return recognizer, num_to_id
+
+# ฟังก์ชันประมวลผลหนึ่งช่วงของวิดีโอ (ทำงานใน process ลูกได้)
+def process_segment(task):
+    """
+    รู้จำใบหน้าในช่วงเฟรม [start_frame, end_frame) ของวิดีโอ (end_frame=None = อ่านจนจบไฟล์)
+    - ประมวลผลทุก stride เฟรม และข้ามเฟรมอื่นด้วย cap.grab() โดยไม่ถอดรหัสภาพ
+    - เวลาของเฟรมคือ start_time + ลำดับเฟรม / fps
+    - คืนค่า list ของ (student_id, เวลา) ที่ยืนยันตัวตนได้
+    """
+    (path, start_frame, end_frame, fps, start_time, stride,
+     use_opencv, profile, confidence_threshold, fast_detection, section, fallback) = task
+    recognizer, num_to_id = _load_trained_model(use_opencv, section, fallback)
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    if fast_detection:
+        face_cascade = FastFaceDetector(face_cascade)
+    preprocessor = FacePreprocessor(profile)
+    collector = SightingCollector()
+    recognition_history = []
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    index = start_frame
+    try:
+        while end_frame is None or index < end_frame:
+            if (index - start_frame) % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            when = start_time + timedelta(seconds=index / fps)
+            results = analyze_frame(frame, face_cascade, recognizer, preprocessor=preprocessor)
+            handle_results(frame, results, num_to_id, confidence_threshold,
+                           recognition_history, collector, when=when, draw=False)
+            index += 1
+    finally:
+        cap.release()
+    return collector.sightings
+
+# ฟังก์ชันหลักสำหรับประมวลผลวิดีโอที่บันทึกไว้
+def process_videos(paths, stride=5, segments=1, workers=0, use_opencv=False,
+                   profile='accurate', start_time=None, confidence_threshold=65,
+                   fast_detection=False, section=None, fallback=False):
+    """
+    ประมวลผลไฟล์วิดีโอแบบไม่มีหน้าต่าง และบันทึกการเข้าเรียนด้วยเวลาจริงในวิดีโอ
+    - แบ่งวิดีโอแต่ละไฟล์เป็น segments ช่วง และประมวลผลแบบขนานด้วย workers process
+    - start_time คือเวลาเริ่มบันทึก (None = ประมาณจากเวลาแก้ไขไฟล์) ระบุได้เฉพาะเมื่อมีวิดีโอไฟล์เดียว
+    - วิดีโอที่ไม่ระบุจำนวนเฟรม (เช่น webm) ประมวลผลเป็นช่วงเดียวโดยอ่านจนจบไฟล์
+    - บันทึกการเข้าเรียนตามลำดับเวลา จึงเก็บเวลาที่พบครั้งแรกของแต่ละวัน
+    - fast_detection=True ใช้ FastFaceDetector (เหมาะกับวิดีโอความละเอียดสูง)
+    - section รู้จำเฉพาะนักศึกษาในกลุ่มเรียนนั้น (fallback=True เทียบกับนักศึกษาทั้งหมดเมื่อไม่รู้จัก)
+    - คืนค่าจำนวนรายการที่บันทึกใหม่
+    """
+    if start_time is not None and len(paths) > 1:
+        raise ValueError("start_time applies to a single video; omit it to use each file's time")
+    # เทรนหรืออัปเดตโมเดลใน process หลักครั้งเดียว ก่อนให้ process ลูกอ่านไฟล์โมเดล
+    recognizer, _ = load_model("dataset", use_opencv=use_opencv, section=section, fallback=fallback)
+    if recognizer is None:
+        return 0
+
+    tasks = []
+    for path in paths:
+        frames, fps = video_info(path)
+        begin = start_time or video_start_time(path, frames, fps)
+        if frames <= 0:
+            print(f"{path}: unknown length at {fps:.1f} fps, starting {begin:%Y-%m-%d %H:%M:%S}"
+                  + ("" if start_time else " (file time; use --start for the real start)"))
+            tasks.append((path, 0, None, fps, begin, stride, use_opencv, profile,
+                          confidence_threshold, fast_detection, section, fallback))
+            continue
+        print(f"{path}: {frames} frames at {fps:.1f} fps, starting {begin:%Y-%m-%d %H:%M:%S}")
+        step = -(-frames // max(1, segments))
+        for start_frame in range(0, frames, step):
+            tasks.append((path, start_frame, min(frames, start_frame + step), fps, begin,
+                          stride, use_opencv, profile, confidence_threshold, fast_detection,
+                          section, fallback))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process_segment, tasks))
+    else:
+        results = [process_segment(task) for task in tasks]
+
+    recorder = AttendanceRecorder()
+    recorded = 0
+    try:
+        for student_id, when in sorted((s for sightings in results for s in sightings),
+                                       key=lambda s: s[1]):
+            recorded += recorder.record(student_id, when)
+    finally:
+        recorder.close()
+    print(f"Processed {len(tasks)} segments, recorded {recorded} new attendance records")
+    return recorded
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="บันทึกการเข้าเรียนจากไฟล์วิดีโอที่บันทึกไว้ (ไม่มีหน้าต่าง)")
+    parser.add_argument("videos", nargs="+", help="ไฟล์วิดีโอ")
+    parser.add_argument("--stride", type=int, default=5, help="ประมวลผลทุกๆ N เฟรม")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="จำนวนช่วงที่แบ่งต่อวิดีโอเพื่อประมวลผลแบบขนาน")
+    parser.add_argument("--workers", type=int, default=0, help="จำนวน process (0 = ทุกคอร์)")
+    parser.add_argument("--opencv", action="store_true",
+                        help="รู้จำด้วยโมเดล OpenCV จาก face_model.yml แทน face_model.bin (เริ่มช้ากว่า)")
+    parser.add_argument("--profile", choices=PREPROCESS_PROFILES, default="accurate",
+                        help="โปรไฟล์การเตรียมภาพใบหน้า")
+    parser.add_argument("--start", help="เวลาเริ่มบันทึก YYYY-MM-DD HH:MM:SS ใช้ได้เมื่อมีวิดีโอไฟล์เดียว "
+                                        "(ค่าเริ่มต้น: ประมาณจากเวลาไฟล์)")
+    parser.add_argument("--threshold", type=float, default=65, help="confidence threshold")
+    parser.add_argument("--fast-detection", action="store_true",
+                        help="ตรวจจับใบหน้าบนภาพย่อและเฉพาะบริเวณรอบใบหน้าเดิม")
+    parser.add_argument("--section", help="รู้จำเฉพาะนักศึกษาใน roster ของกลุ่มเรียนนี้")
+    parser.add_argument("--fallback", action="store_true",
+                        help="เทียบใบหน้าที่ไม่รู้จักกับนักศึกษาทั้งหมด (ใช้กับ --section)")
+    args = parser.parse_args()
+    if args.start and len(args.videos) > 1:
+        parser.error("--start applies to a single video; process files separately to give each a start time")
+
+    start = datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S') if args.start else None
+    process_videos(args.videos, stride=max(1, args.stride), segments=args.segments,
+                   workers=args.workers, use_opencv=args.opencv, profile=args.profile,
+                   start_time=start, confidence_threshold=args.threshold,
+                   fast_detection=args.fast_detection, section=args.section,
+                   fallback=args.fallback)
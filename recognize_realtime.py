@@ -1,317 +1,560 @@
 # นำเข้าไลบรารีที่จำเป็นสำหรับระบบ
 import cv2          # ใช้สำหรับการประมวลผลภาพและการจดจำใบหน้า
-import pickle       # ใช้สำหรับบันทึกและโหลดข้อมูล mapping
-import sqlite3      # ใช้สำหรับจัดการฐานข้อมูล
 from datetime import datetime  # ใช้จัดการวันที่และเวลา
-import numpy as np  # ใช้สำหรับการคำนวณทางคณิตศาสตร์
+import numpy as np  # ใช้ตรวจว่าโมเดล OpenCV ตรงกับ bundle
 import os          # ใช้จัดการไฟล์และโฟลเดอร์
+import time        # ใช้สำหรับวัดเวลาประมวลผลต่อเฟรม
+from pipeline import RecognitionPipeline  # ใช้สำหรับโหมดแบ่งขั้นตอนแบบหลาย thread
+from multicam import MultiCameraServer, parse_source  # ใช้สำหรับโหมดหลายกล้อง
+from tracking import FaceTracker  # ใช้สำหรับโหมดติดตามใบหน้า
+from training import MODEL_PATH, scan_dataset, train_model  # ใช้สำหรับเทรนโมเดล (แบบเต็มหรือแบบเพิ่มทีละส่วน)
+from model_bundle import dataset_fingerprint, load_bundle, shard_path, write_shard  # ใช้โหลดโมเดลแบบ binary ที่ตรวจสอบแล้ว
+from matcher import LBPHMatcher, ShardedMatcher  # ใช้สำหรับรู้จำใบหน้าหลายใบพร้อมกันแบบ vectorized
+from detection import FastFaceDetector  # ใช้สำหรับตรวจจับใบหน้าแบบย่อภาพและค้นหาเฉพาะ ROI
+from preprocessing import FacePreprocessor  # ใช้สำหรับตรวจสอบและปรับปรุงภาพใบหน้าตามโปรไฟล์
+from database import AttendanceDB, AttendanceRecorder  # ใช้สำหรับฐานข้อมูลและบันทึกการเข้าเรียนแบบ write-behind
+from metrics import METRICS_DUMP_INTERVAL, RECOGNITION_METRICS  # ใช้เก็บเวลาของแต่ละขั้นตอนสำหรับ /metrics
 
-# ฟังก์ชันสำหรับเชื่อมต่อและสร้างฐานข้อมูล
-def init_database():
-    """สร้างและเชื่อมต่อฐานข้อมูล SQLite สำหรับเก็บประวัติการเข้าเรียน"""
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS attendance
-                 (student_id TEXT, date DATE, time TIME)''')
-    conn.commit()
-    return conn
-
-# ฟังก์ชันบันทึกการเข้าเรียน
-def record_attendance(conn, student_id):
-    """บันทึกการเข้าเรียนของนักศึกษาลงในฐานข้อมูล พร้อมตรวจสอบการซ้ำ"""
-    current_date = datetime.now().date()
-    current_time = datetime.now().strftime('%H:%M:%S')  # แปลงเวลาเป็น string
-    
-    # Check if already recorded today
-    c = conn.cursor()
-    c.execute('''SELECT * FROM attendance 
-                 WHERE student_id = ? AND date = ?''', 
-              (student_id, current_date))
-    
-    if not c.fetchone():
-        c.execute('''INSERT INTO attendance (student_id, date, time)
-                     VALUES (?, ?, ?)''', 
-                  (student_id, current_date, current_time))
-        conn.commit()
-        print(f"Recorded attendance for {student_id}")
+HISTORY_PAGE_SIZE = 20  # จำนวนรายการต่อหน้าในเมนูค้นหาประวัติ
 
 # ฟังก์ชันโหลดและเทรนโมเดล
-def load_known_faces(dataset_path):
+def load_known_faces(dataset_path, full_rebuild=False):
     """
     โหลดและเทรนโมเดลจากรูปในโฟลเดอร์ dataset
     - ตรวจจับใบหน้าจากรูปภาพ
-    - เทรนโมเดล LBPH
+    - เทรนโมเดล LBPH (เพิ่มเฉพาะรูปใหม่ถ้าทำได้)
     - สร้างและบันทึก mapping ระหว่าง ID กับ label
     """
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    
-    faces = []
-    ids = []
-    id_mapping = {}
-    
     print("Loading dataset...")
-    # เก็บรายการ ID ทั้งหมดก่อน
-    all_person_ids = sorted(os.listdir(dataset_path))
+    recognizer, _ = train_model(dataset_path, full_rebuild=full_rebuild)
+    return recognizer
+
+# ฟังก์ชันโหลดโมเดลและ mapping
+def load_model(dataset_path="dataset", use_opencv=False, section=None, fallback=False):
+    """
+    โหลดโมเดลที่เทรนไว้แล้ว หรือเทรนใหม่ถ้ายังไม่มี
+    - ถ้า fingerprint ของ dataset ตรงกับ face_model.bin จะไม่ต้องตรวจหรือเทรนโมเดลใหม่
+    - เทรนเพิ่มอัตโนมัติเมื่อมีนักศึกษาใหม่ใน dataset หรือ bundle ไม่ตรงกับ dataset
+    - mapping ระหว่าง label กับรหัสนักศึกษาอ่านจาก bundle และถูกตรวจสอบกับโมเดลแล้วเสมอ
+    - ค่าเริ่มต้นคืนค่า LBPHMatcher ที่ memory-map histogram จาก bundle (ไม่ต้องอ่าน face_model.yml
+      จึงเริ่มทำงานได้ทันที และผลเหมือน predict ของ OpenCV)
+    - use_opencv=True คืนค่า recognizer ของ OpenCV ที่อ่านจาก face_model.yml (ช้าตอนเริ่ม)
+      โดยตรวจว่าเป็นโมเดลเดียวกับ bundle ก่อนใช้ mapping ของ bundle
+    - section คือรหัสกลุ่มเรียน: โหลดเฉพาะ shard ของนักศึกษาใน roster ของกลุ่มนั้น (ใช้ matcher เสมอ)
+      และ fallback=True จะเทียบใบหน้าที่ไม่รู้จักกับโมเดลรวมอีกครั้ง
+    - คืนค่า (recognizer, num_to_id) หรือ (None, None) ถ้าเกิดข้อผิดพลาด
+    """
+    if not os.path.exists(dataset_path):
+        print(f"Error: Dataset directory '{dataset_path}' not found")
+        return None, None
+    if not os.listdir(dataset_path):
+        print(f"Error: Dataset directory '{dataset_path}' is empty")
+        return None, None
     
-    # สร้าง mapping โดยใช้ index เป็นลำดับตามตัวอักษร
-    for idx, person_id in enumerate(all_person_ids):
-        id_mapping[person_id] = idx
+    fingerprint = dataset_fingerprint(scan_dataset(dataset_path))
+    try:
+        matcher, num_to_id = load_bundle(fingerprint=fingerprint)
+    except (OSError, ValueError) as e:
+        # ไม่มี bundle หรือ bundle ไม่ตรงกับ dataset: เทรนเพิ่มเฉพาะส่วนที่เปลี่ยน
+        print(f"Model bundle not usable ({e}), training model...")
+        try:
+            load_known_faces(dataset_path)
+        except Exception as e:
+            print(f"Error loading face model: {str(e)}")
+            print("Attempting to retrain model...")
+            try:
+                load_known_faces(dataset_path, full_rebuild=True)
+            except Exception as e:
+                print(f"Error during model training: {str(e)}")
+                return None, None
+        try:
+            matcher, num_to_id = load_bundle(fingerprint=fingerprint)
+        except (OSError, ValueError) as e:
+            print(f"Error loading model bundle: {str(e)}")
+            return None, None
     
-    for person_id in all_person_ids:
-        person_dir = os.path.join(dataset_path, person_id)
-        if os.path.isdir(person_dir):
-            print(f"Processing ID: {person_id}")
-            face_count = 0
-            for image_file in os.listdir(person_dir):
-                image_path = os.path.join(person_dir, image_file)
-                img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                if img is not None:
-                    face_rect = face_cascade.detectMultiScale(img)
-                    for (x, y, w, h) in face_rect:
-                        faces.append(cv2.equalizeHist(img[y:y+h, x:x+w]))
-                        ids.append(id_mapping[person_id])
-                        face_count += 1
-            print(f"Found {face_count} faces for ID {person_id}")
+    if section is not None:
+        shard = load_section_shard(section, fingerprint)
+        if shard is None:
+            return None, None
+        return ShardedMatcher(shard, matcher if fallback else None), num_to_id
     
-    if not faces:
-        raise ValueError("No faces found in dataset")
+    if not use_opencv:
+        print(f"Model loaded ({matcher.histograms.shape[1]} histograms)")
+        return matcher, num_to_id
     
-    print(f"Training model with {len(faces)} faces...")
-    recognizer.train(faces, np.array(ids))
+    recognizer = load_opencv_model(matcher)
+    if recognizer is None:
+        return None, None
+    return recognizer, num_to_id
+
+# ฟังก์ชันตรวจว่าโมเดล OpenCV เป็นโมเดลเดียวกับ bundle
+def model_matches_bundle(recognizer, matcher, sample_bins=64):
+    """
+    เปรียบเทียบ recognizer ที่อ่านจาก face_model.yml กับ LBPHMatcher จาก bundle
+    - label ทั้งหมด (เรียงแล้ว) ต้องตรงกัน ไม่ใช่แค่จำนวนตัวอย่าง
+    - histogram ที่ bin ตัวอย่าง sample_bins ตำแหน่ง ต้องตรงกันทุกตัวอย่าง (checksum แบบถูก)
+    """
+    labels = np.asarray(recognizer.getLabels(), dtype=np.int32).reshape(-1)
+    if labels.shape != matcher.labels.shape:
+        return False
+    order = np.argsort(labels, kind="stable")  # bundle เรียง histogram ตาม label แบบ stable
+    if not np.array_equal(labels[order], matcher.labels):
+        return False
+    histograms = recognizer.getHistograms()
+    if not histograms:
+        return True
+    dim = histograms[0].size
+    bins = np.linspace(0, dim - 1, min(dim, sample_bins)).astype(np.intp)
+    sample = np.vstack([histograms[i].reshape(-1)[bins] for i in order])
+    return np.allclose(sample, np.asarray(matcher.histograms[bins, :]).T, atol=1e-6)
+
+# ฟังก์ชันโหลดโมเดล OpenCV จาก face_model.yml
+def load_opencv_model(matcher):
+    """อ่าน face_model.yml และตรวจกับ bundle คืนค่า recognizer หรือ None ถ้าไม่ตรงกัน"""
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(MODEL_PATH)
+    if not model_matches_bundle(recognizer, matcher):
+        print(f"Error: {MODEL_PATH} does not match the model bundle. Please retrain the model.")
+        return None
+    return recognizer
+
+# ฟังก์ชันโหลด shard ของกลุ่มเรียน
+def load_section_shard(section, fingerprint):
+    """
+    โหลด shard ของกลุ่มเรียน section ตามรายชื่อในตาราง roster
+    - สร้าง shard ใหม่จาก face_model.bin ถ้ายังไม่มี หรือ dataset/รายชื่อเปลี่ยนไป
+    - คืนค่า LBPHMatcher ของ shard หรือ None ถ้าเกิดข้อผิดพลาด
+    """
+    db = AttendanceDB()
+    roster = db.get_roster(section)
+    db.close()
+    if not roster:
+        print(f"Error: Section '{section}' has no students in its roster")
+        return None
+    path = shard_path(section)
+    try:
+        shard, _ = load_bundle(path, fingerprint=fingerprint, roster=roster)
+    except (OSError, ValueError):
+        try:
+            enrolled = write_shard(roster, path)
+            shard, _ = load_bundle(path, fingerprint=fingerprint, roster=roster)
+        except (OSError, ValueError) as e:
+            print(f"Error building shard for section '{section}': {str(e)}")
+            return None
+        print(f"Built shard for section '{section}': {enrolled} of {len(roster)} students enrolled")
+    print(f"Section '{section}' loaded ({shard.histograms.shape[1]} histograms)")
+    return shard
+
+# ฟังก์ชันตรวจจับใบหน้า
+def detect_faces(gray, face_cascade, min_neighbors=5):
+    """
+    ตรวจจับใบหน้าจากภาพโทนสีเทาที่ปรับ histogram แล้ว คืนค่าเป็นกรอบ (x, y, w, h)
+    - ถ้า face_cascade เป็น FastFaceDetector จะตรวจจับบนภาพย่อและเฉพาะ ROI รอบใบหน้าเดิม
+    """
+    if isinstance(face_cascade, FastFaceDetector):
+        return face_cascade.detect(gray)
+    return face_cascade.detectMultiScale(
+        gray,
+        scaleFactor=1.1,
+        minNeighbors=min_neighbors,
+        minSize=(60, 60),  # เพิ่มขนาดขั้นต่ำ
+        maxSize=(300, 300)  # จำกัดขนาดสูงสุด
+    )
+
+# ฟังก์ชันรู้จำใบหน้าหลายใบ
+def predict_faces(recognizer, faces):
+    """
+    รู้จำใบหน้าหลายใบ คืนค่า list ของ (label, confidence)
+    - ถ้าเป็น LBPHMatcher หรือ ShardedMatcher จะรู้จำทุกใบหน้าพร้อมกันในครั้งเดียว
+    - ถ้าเป็น recognizer ของ OpenCV จะเรียก predict ทีละใบหน้า
+    """
+    if isinstance(recognizer, (LBPHMatcher, ShardedMatcher)):
+        return [top[0] for top in recognizer.match(faces)]
+    return [recognizer.predict(face) for face in faces]
+
+# ฟังก์ชันตรวจจับและรู้จำใบหน้าในหนึ่งเฟรม
+def analyze_frame(frame, face_cascade, recognizer, min_neighbors=5, preprocessor=None):
+    """
+    ตรวจจับและรู้จำใบหน้าทั้งหมดในเฟรม
+    - ปรับปรุงคุณภาพภาพและตรวจจับใบหน้า
+    - ข้ามใบหน้าที่คุณภาพไม่ผ่าน
+    - preprocessor กำหนดโปรไฟล์การเตรียมภาพ (ค่าเริ่มต้นคือ 'accurate')
+    - เก็บเวลาของขั้นตอน detect, preprocess และ predict ใน RECOGNITION_METRICS
+    - คืนค่าเป็น list ของ (x, y, w, h, label, confidence)
+    """
+    started = time.perf_counter()
+    # ปรับปรุงคุณภาพภาพ
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.equalizeHist(gray)
     
-    # Save model and mapping
-    model_path = "face_model.yml"
-    mapping_path = "id_mapping.pickle"
+    # ตรวจจับใบหน้า
+    faces = detect_faces(gray, face_cascade, min_neighbors)
+    preprocessor = preprocessor or FacePreprocessor()
+    detected = time.perf_counter()
+    RECOGNITION_METRICS.observe('detect', detected - started)
+    RECOGNITION_METRICS.inc('frames')
+    RECOGNITION_METRICS.inc('faces', len(faces))
     
-    recognizer.save(model_path)
-    with open(mapping_path, "wb") as f:
-        # บันทึก mapping แบบสองทาง
-        mapping_data = {
-            'id_to_num': id_mapping,
-            'num_to_id': {v: k for k, v in id_mapping.items()}
-        }
-        pickle.dump(mapping_data, f)
+    boxes = []
+    face_imgs = []
+    for (x, y, w, h) in faces:
+        face_roi = gray[y:y+h, x:x+w]
+        
+        # ตรวจสอบคุณภาพใบหน้า
+        if not preprocessor.quality(face_roi)[0]:
+            continue
+            
+        # ปรับปรุงคุณภาพภาพใบหน้า
+        boxes.append((x, y, w, h))
+        face_imgs.append(preprocessor.enhance(cv2.resize(face_roi, (200, 200))))
+    prepared = time.perf_counter()
+    if len(faces):
+        RECOGNITION_METRICS.observe('preprocess', prepared - detected)
     
-    print("Model trained and saved successfully")
-    return recognizer
+    try:
+        # ทำการรู้จำใบหน้าทั้งหมดในเฟรม
+        predictions = predict_faces(recognizer, face_imgs)
+    except Exception as e:
+        print(f"Error during recognition: {str(e)}")
+        return []
+    if face_imgs:
+        RECOGNITION_METRICS.observe('predict', time.perf_counter() - prepared)
+    return [(x, y, w, h, label, confidence)
+            for (x, y, w, h), (label, confidence) in zip(boxes, predictions)]
 
-# ฟังก์ชันตรวจสอบคุณภาพใบหน้า
-def check_face_quality(face_img):
+# ฟังก์ชันวาดกรอบและข้อความบนใบหน้า
+def draw_face(frame, x, y, w, h, color, text):
+    """วาดกรอบใบหน้า ผลการรู้จำ และค่าคุณภาพภาพลงบนเฟรม"""
+    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+    cv2.putText(frame, text, (x, y-10),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    
+    # แสดงค่าคุณภาพภาพ (ใบหน้าที่ส่งมาถึงตรงนี้ผ่านการตรวจคุณภาพแล้ว)
+    cv2.putText(frame, "Quality: True", (x, y+h+20),
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+# ฟังก์ชันยืนยันผลการรู้จำ บันทึกการเข้าเรียน และแสดงผล
+def handle_results(frame, results, num_to_id, confidence_threshold,
+                   recognition_history, recorder, history_size=5, when=None, draw=True):
     """
-    ตรวจสอบคุณภาพของภาพใบหน้า
-    - วัดความชัดด้วย Laplacian
-    - ตรวจสอบความสว่าง
-    - ตรวจสอบความสมดุลของแสง
+    ยืนยันผลการรู้จำจากหลายเฟรมและบันทึกการเข้าเรียน
+    - ต้องรู้จำได้ ID เดียวกัน 3 เฟรมติดต่อกันจึงจะบันทึก
+    - when คือเวลาของเฟรม (None = เวลาปัจจุบัน) ใช้ตอนประมวลผลวิดีโอที่บันทึกไว้
+    - วาดผลลัพธ์ลงบนเฟรม ยกเว้น draw=False (ประมวลผลแบบไม่แสดงภาพ)
     """
-    # ตรวจสอบความชัดของภาพ
-    laplacian_var = cv2.Laplacian(face_img, cv2.CV_64F).var()
-    # ตรวจสอบความสว่าง
-    brightness = face_img.mean()
-    return laplacian_var > 100 and 50 < brightness < 200
+    for (x, y, w, h, label, confidence) in results:
+        if confidence < confidence_threshold:
+            student_id = num_to_id.get(label, "Unknown")
+            RECOGNITION_METRICS.inc('recognitions')
+            
+            # เพิ่มผลการรู้จำลงในประวัติ
+            recognition_history.append((student_id, confidence))
+            if len(recognition_history) > history_size:
+                recognition_history.pop(0)
+            
+            # ตรวจสอบความสอดคล้อง
+            if len(recognition_history) >= 3:
+                recent_ids = [r[0] for r in recognition_history[-3:]]
+                if all(id == student_id for id in recent_ids):
+                    started = time.perf_counter()
+                    recorder.record(student_id, when)
+                    RECOGNITION_METRICS.observe('record', time.perf_counter() - started)
+                    color = (0, 255, 0)
+                    text = f"ID: {student_id} ({confidence:.1f})"
+                else:
+                    color = (0, 255, 255)
+                    text = "Verifying..."
+            else:
+                color = (0, 255, 255)
+                text = "Verifying..."
+        else:
+            color = (0, 0, 255)
+            text = f"Unknown ({confidence:.1f})"
+        
+        # แสดงผล
+        if draw:
+            draw_face(frame, x, y, w, h, color, text)
 
-# ฟังก์ชันปรับปรุงคุณภาพภาพ
-def enhance_face_image(face_img):
+# ฟังก์ชันติดตามและรู้จำใบหน้าแบบแยกตาม track
+def track_frame(frame, tracker, face_cascade, recognizer, num_to_id,
+                confidence_threshold, recorder, min_neighbors=5, preprocessor=None):
     """
-    ปรับปรุงคุณภาพของภาพใบหน้า
-    - ปรับความคมชัดด้วย CLAHE
-    - ลดสัญญาณรบกวน
-    - เพิ่มความชัดของภาพ
+    ประมวลผลหนึ่งเฟรมในโหมดติดตามใบหน้า
+    - รัน face detector เฉพาะเฟรมที่ tracker ร้องขอ
+    - รู้จำใบหน้าเฉพาะ track ที่ยังไม่ยืนยันตัวตน
+    - โหวตผลการรู้จำแยกตาม track และบันทึกการเข้าเรียนครั้งเดียวต่อ track
     """
-    # ปรับความคมชัด
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-    enhanced = clahe.apply(face_img)
-    # ลดนอยส์
-    denoised = cv2.fastNlMeansDenoising(enhanced)
-    return denoised
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = cv2.equalizeHist(gray)
+    preprocessor = preprocessor or FacePreprocessor()
+    RECOGNITION_METRICS.inc('frames')
+    
+    started = time.perf_counter()
+    if tracker.needs_detection():
+        faces = detect_faces(gray, face_cascade, min_neighbors)
+        RECOGNITION_METRICS.observe('detect', time.perf_counter() - started)
+        RECOGNITION_METRICS.inc('faces', len(faces))
+        started = time.perf_counter()
+        tracker.update(gray, faces)
+    else:
+        tracker.update(gray)
+    RECOGNITION_METRICS.observe('track', time.perf_counter() - started)
+    
+    for track in tracker.tracks:
+        x, y, w, h = track.box
+        if track.confirmed_id is None and track.missed == 0:
+            face_roi = gray[y:y+h, x:x+w]
+            started = time.perf_counter()
+            if face_roi.size and preprocessor.quality(face_roi)[0]:
+                face = preprocessor.enhance(cv2.resize(face_roi, (200, 200)))
+                prepared = time.perf_counter()
+                RECOGNITION_METRICS.observe('preprocess', prepared - started)
+                try:
+                    label, confidence = recognizer.predict(face)
+                    RECOGNITION_METRICS.observe('predict', time.perf_counter() - prepared)
+                    student_id = num_to_id.get(label, "Unknown") if confidence < confidence_threshold else None
+                    if student_id is not None:
+                        RECOGNITION_METRICS.inc('recognitions')
+                    if track.add_vote(student_id, confidence):
+                        started = time.perf_counter()
+                        recorder.record(track.confirmed_id)
+                        RECOGNITION_METRICS.observe('record', time.perf_counter() - started)
+                except Exception as e:
+                    print(f"Error during recognition: {str(e)}")
+        
+        # แสดงผล
+        if track.confirmed_id is not None:
+            color = (0, 255, 0)
+            text = f"ID: {track.confirmed_id} ({track.last_confidence:.1f})"
+        elif track.votes and track.votes[-1] is None:
+            color = (0, 0, 255)
+            text = f"Unknown ({track.last_confidence:.1f})"
+        else:
+            color = (0, 255, 255)
+            text = "Verifying..."
+        draw_face(frame, x, y, w, h, color, text)
+
+# ฟังก์ชันจัดการการกดปุ่ม
+def handle_key(key, confidence_threshold):
+    """
+    จัดการปุ่มที่ผู้ใช้กด
+    - 'q' ออกจากโปรแกรม, '+'/'-' ปรับค่า threshold
+    - คืนค่า (ต้องการออกหรือไม่, threshold ใหม่)
+    """
+    if key == ord('q'):
+        return True, confidence_threshold
+    elif key == ord('+') and confidence_threshold < 100:
+        confidence_threshold += 5
+        print(f"Confidence threshold: {confidence_threshold}")
+    elif key == ord('-') and confidence_threshold > 0:
+        confidence_threshold -= 5
+        print(f"Confidence threshold: {confidence_threshold}")
+    return False, confidence_threshold
 
 # ฟังก์ชันหลักสำหรับการรู้จำใบหน้า
-def recognize_faces():
+def recognize_faces(pipelined=False, num_workers=2, tracking=False, detect_interval=10,
+                    use_opencv=False, profile='accurate', fast_detection=False,
+                    section=None, fallback=False):
     """
     ทำการรู้จำใบหน้าแบบ Real-time
     - เปิดกล้องและรับภาพ
     - ตรวจจับและรู้จำใบหน้า
     - แสดงผลและบันทึกการเข้าเรียน
+    - pipelined=True แยกการอ่านภาพ, การรู้จำ และการแสดงผลไว้คนละ thread
+    - tracking=True ตรวจจับใบหน้าทุก detect_interval เฟรมและติดตามใบหน้าระหว่างนั้น
+    - รู้จำด้วย LBPHMatcher จาก bundle (ทุกใบหน้าในเฟรมพร้อมกัน) หรือ use_opencv=True ใช้โมเดล OpenCV
+    - profile เลือกโปรไฟล์การเตรียมภาพใบหน้า ('accurate' หรือ 'fast')
+    - fast_detection=True ตรวจจับใบหน้าบนภาพย่อและเฉพาะ ROI รอบใบหน้าเดิม (FastFaceDetector)
+    - section รู้จำเฉพาะนักศึกษาในกลุ่มเรียนนั้น (fallback=True เทียบกับนักศึกษาทั้งหมดเมื่อไม่รู้จัก)
     """
     # Load face detector and recognizer
     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    
-    # Load or train model
-    dataset_path = "dataset"
-    need_training = not os.path.exists("face_model.yml") or not os.path.exists("id_mapping.pickle")
-    
-    if need_training:
-        print("Training new face model...")
-        if not os.path.exists(dataset_path):
-            print(f"Error: Dataset directory '{dataset_path}' not found")
-            return
-        if not os.listdir(dataset_path):
-            print(f"Error: Dataset directory '{dataset_path}' is empty")
-            return
-        try:
-            recognizer = load_known_faces(dataset_path)
-            print("Model training completed successfully")
-        except Exception as e:
-            print(f"Error during model training: {str(e)}")
-            return
-    else:
-        try:
-            recognizer.read("face_model.yml")
-            print("Existing model loaded successfully")
-        except Exception as e:
-            print(f"Error loading face model: {str(e)}")
-            print("Attempting to retrain model...")
-            recognizer = load_known_faces(dataset_path)
-    
-    # Load ID mapping
-    try:
-        with open("id_mapping.pickle", "rb") as f:
-            mapping_data = pickle.load(f)
-            num_to_id = mapping_data['num_to_id']
-    except FileNotFoundError:
-        print("Error: id_mapping.pickle not found. Please retrain the model.")
-        return
-    except Exception as e:
-        print(f"Error loading ID mapping: {str(e)}")
+    recognizer, num_to_id = load_model("dataset", use_opencv=use_opencv, section=section,
+                                       fallback=fallback)
+    if recognizer is None:
         return
 
     # Initialize variables
     confidence_threshold = 65
     min_neighbors = 5
+    if fast_detection:
+        face_cascade = FastFaceDetector(face_cascade, min_neighbors)
     recognition_history = []  # เก็บประวัติการรู้จำ
-    history_size = 5  # จำนวนเฟรมที่ใช้ในการยืนยัน
+    preprocessor = FacePreprocessor(profile)
     
-    conn = init_database()
     cap = cv2.VideoCapture(0)
     
     if not cap.isOpened():
         print("Error: Could not open camera")
         return
     
-    print(f"Recognition started. Confidence threshold: {confidence_threshold}")
+    print(f"Recognition started. Confidence threshold: {confidence_threshold}, "
+          f"preprocessing profile: {profile}, fast detection: {fast_detection}")
     print("Press 'q' to quit, '+'/'-' to adjust threshold")
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        # ปรับปรุงคุณภาพภาพ
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.equalizeHist(gray)
-        
-        # ตรวจจับใบหน้า
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=min_neighbors,
-            minSize=(60, 60),  # เพิ่มขนาดขั้นต่ำ
-            maxSize=(300, 300)  # จำกัดขนาดสูงสุด
-        )
-        
-        for (x, y, w, h) in faces:
-            face_roi = gray[y:y+h, x:x+w]
+    # บันทึกการเข้าเรียนผ่าน writer เบื้องหลัง เพื่อไม่ให้การเขียนฐานข้อมูลหน่วงลูปกล้อง
+    recorder = AttendanceRecorder()
+    try:
+        if pipelined:
+            # เก็บภาพในบัฟเฟอร์ของไดรเวอร์ให้น้อยที่สุด เพื่อให้ได้เฟรมล่าสุดเสมอ
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
-            # ตรวจสอบคุณภาพใบหน้า
-            if not check_face_quality(face_roi):
-                continue
-                
-            # ปรับปรุงคุณภาพภาพใบหน้า
-            face = enhance_face_image(cv2.resize(face_roi, (200, 200)))
+            def make_worker():
+                # CascadeClassifier ไม่ปลอดภัยเมื่อใช้ร่วมกันหลาย thread จึงสร้างแยกต่อ worker
+                cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+                if fast_detection:
+                    cascade = FastFaceDetector(cascade, min_neighbors)
+                return lambda frame: analyze_frame(frame, cascade, recognizer, min_neighbors,
+                                                   preprocessor)
             
+            pipeline = RecognitionPipeline(cap, make_worker, num_workers=num_workers)
+            pipeline.start()
             try:
-                # ทำการรู้จำใบหน้า
-                label, confidence = recognizer.predict(face)
-                
-                if confidence < confidence_threshold:
-                    student_id = num_to_id.get(label, "Unknown")
+                for frame, results, _ in pipeline.results():
+                    handle_results(frame, results, num_to_id, confidence_threshold,
+                                   recognition_history, recorder)
+                    cv2.imshow('Face Recognition', frame)
+                    RECOGNITION_METRICS.dump(interval=METRICS_DUMP_INTERVAL)
                     
-                    # เพิ่มผลการรู้จำลงในประวัติ
-                    recognition_history.append((student_id, confidence))
-                    if len(recognition_history) > history_size:
-                        recognition_history.pop(0)
-                    
-                    # ตรวจสอบความสอดคล้อง
-                    if len(recognition_history) >= 3:
-                        recent_ids = [r[0] for r in recognition_history[-3:]]
-                        if all(id == student_id for id in recent_ids):
-                            record_attendance(conn, student_id)
-                            color = (0, 255, 0)
-                            text = f"ID: {student_id} ({confidence:.1f})"
-                        else:
-                            color = (0, 255, 255)
-                            text = "Verifying..."
-                    else:
-                        color = (0, 255, 255)
-                        text = "Verifying..."
-                else:
-                    color = (0, 0, 255)
-                    text = f"Unknown ({confidence:.1f})"
-                
-                # แสดงผล
-                cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
-                cv2.putText(frame, text, (x, y-10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                    quit_requested, confidence_threshold = handle_key(cv2.waitKey(1) & 0xFF,
+                                                                      confidence_threshold)
+                    if quit_requested:
+                        break
+            finally:
+                pipeline.stop()
+            print(f"Pipeline stats: {dict(pipeline.stats(), profile=profile, fast_detection=fast_detection)}")
+        else:
+            tracker = FaceTracker(detect_interval=detect_interval) if tracking else None
+            frames = 0
+            busy = 0.0
+            while True:
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                RECOGNITION_METRICS.observe('capture', time.perf_counter() - started)
                 
-                # แสดงค่าคุณภาพภาพ
-                quality_text = f"Quality: {check_face_quality(face_roi)}"
-                cv2.putText(frame, quality_text, (x, y+h+20),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                started = time.perf_counter()
+                if tracker is not None:
+                    track_frame(frame, tracker, face_cascade, recognizer, num_to_id,
+                                confidence_threshold, recorder, min_neighbors, preprocessor)
+                else:
+                    results = analyze_frame(frame, face_cascade, recognizer, min_neighbors,
+                                            preprocessor)
+                    handle_results(frame, results, num_to_id, confidence_threshold,
+                                   recognition_history, recorder)
+                busy += time.perf_counter() - started
+                frames += 1
+                cv2.imshow('Face Recognition', frame)
+                RECOGNITION_METRICS.dump(interval=METRICS_DUMP_INTERVAL)
                 
-            except Exception as e:
-                print(f"Error during recognition: {str(e)}")
-        
-        cv2.imshow('Face Recognition', frame)
-        
-        # Handle key events
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        elif key == ord('+') and confidence_threshold < 100:
-            confidence_threshold += 5
-            print(f"Confidence threshold: {confidence_threshold}")
-        elif key == ord('-') and confidence_threshold > 0:
-            confidence_threshold -= 5
-            print(f"Confidence threshold: {confidence_threshold}")
-    
-    cap.release()
-    cv2.destroyAllWindows()
-    conn.close()
+                # Handle key events
+                quit_requested, confidence_threshold = handle_key(cv2.waitKey(1) & 0xFF,
+                                                                  confidence_threshold)
+                if quit_requested:
+                    break
+            stats = {
+                'frames_processed': frames,
+                'avg_frame_ms': round(1000 * busy / max(1, frames), 1),
+                'profile': profile,
+                'fast_detection': fast_detection,
+            }
+            print(f"Recognition stats: {stats}")
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+        recorder.close()
+        RECOGNITION_METRICS.dump()
+
+# ฟังก์ชันรู้จำใบหน้าจากหลายกล้องพร้อมกัน
+def recognize_multi_camera(sources, use_opencv=False, profile='accurate', show=True,
+                           stats_interval=10.0, fast_detection=False, section=None,
+                           fallback=False):
+    """
+    รู้จำใบหน้าจากหลายแหล่งภาพใน process เดียว
+    - sources คือ list ของเลขอุปกรณ์ ไฟล์วิดีโอ หรือ URL ของ stream
+    - ทุกกล้องใช้โมเดลชุดเดียวกันและ AttendanceRecorder ตัวเดียวกัน
+      (รายการซ้ำจากหลายประตูจึงถูกตัดในที่เดียว)
+    - แต่ละกล้องมี thread, face detector และประวัติการรู้จำของตัวเอง
+    - พิมพ์สถิติ FPS และเวลาประมวลผลของแต่ละกล้องทุก stats_interval วินาที
+    - fast_detection=True ใช้ FastFaceDetector แยกกันในแต่ละกล้อง
+    - section / fallback เลือก shard ของกลุ่มเรียนเหมือน recognize_faces
+    """
+    recognizer, num_to_id = load_model("dataset", use_opencv=use_opencv, section=section,
+                                       fallback=fallback)
+    if recognizer is None:
+        return
+
+    confidence_threshold = 65
+    min_neighbors = 5
+    preprocessor = FacePreprocessor(profile)
+    recorder = AttendanceRecorder()
+
+    def make_worker(name, source):
+        # CascadeClassifier ไม่ปลอดภัยเมื่อใช้ร่วมกันหลาย thread จึงสร้างแยกต่อกล้อง
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if fast_detection:
+            cascade = FastFaceDetector(cascade, min_neighbors)
+        history = []  # ประวัติการรู้จำของกล้องนี้
+        process = lambda frame: analyze_frame(frame, cascade, recognizer, min_neighbors,
+                                              preprocessor)
+        handle = lambda frame, results: handle_results(frame, results, num_to_id,
+                                                       confidence_threshold, history, recorder)
+        return process, handle
+
+    server = MultiCameraServer(sources, make_worker)
+    server.start()
+    print(f"Multi-camera recognition started with {len(sources)} sources, "
+          f"preprocessing profile: {profile}")
+    print("Press 'q' (or Ctrl+C) to quit")
+    try:
+        last_report = time.monotonic()
+        while server.alive():
+            if show:
+                # cv2.imshow ต้องเรียกจาก main thread เท่านั้น
+                for name, frame in server.latest_frames().items():
+                    cv2.imshow(f'Face Recognition - {name}', frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            else:
+                time.sleep(0.1)
+            RECOGNITION_METRICS.dump(interval=METRICS_DUMP_INTERVAL)
+            if time.monotonic() - last_report >= stats_interval:
+                print(f"Camera stats: {server.stats()}")
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        recorder.close()
+        RECOGNITION_METRICS.dump()
+        if show:
+            cv2.destroyAllWindows()
+    print(f"Camera stats: {server.stats()}")
 
 # ฟังก์ชันค้นหาประวัติ
-def search_attendance_history(student_id=None, date=None):
+def search_attendance_history(student_id=None, date=None, before=None, limit=HISTORY_PAGE_SIZE):
     """
-    ค้นหาประวัติการเข้าเรียน
+    ค้นหาประวัติการเข้าเรียนทีละหน้า
     - ค้นหาตาม ID หรือวันที่
-    - แสดงผลแบบเรียงลำดับตามเวลา
+    - แสดงผลแบบเรียงลำดับตามเวลา (ล่าสุดก่อน)
+    - before คือ cursor (date, time, id) ของรายการสุดท้ายในหน้าก่อน (None = หน้าแรก)
+    - คืนค่า list ของ dict ไม่เกิน limit รายการ
     """
-    conn = sqlite3.connect('attendance.db')
-    c = conn.cursor()
-    
-    query = "SELECT student_id, date, time FROM attendance WHERE 1=1"
-    params = []
-    
-    if student_id:
-        query += " AND student_id = ?"
-        params.append(student_id)
-    if date:
-        query += " AND date = ?"
-        params.append(date)
-    
-    query += " ORDER BY date DESC, time DESC"
-    
-    c.execute(query, params)
-    results = c.fetchall()
-    conn.close()
-    return results
+    db = AttendanceDB()
+    try:
+        return db.search_attendance(student_id=student_id, start_date=date, end_date=date,
+                                    limit=limit, before=before)
+    finally:
+        db.close()
 
 # ฟังก์ชันแสดงเมนูค้นหา
 def display_attendance_menu():
     """
     แสดงเมนูสำหรับค้นหาประวัติ
     - มีตัวเลือกค้นหาหลายรูปแบบ
-    - แสดงผลในรูปแบบตาราง
+    - แสดงผลในรูปแบบตาราง ทีละ HISTORY_PAGE_SIZE รายการ
     """
     while True:
         print("\nAttendance History Search")
@@ -323,54 +566,99 @@ def display_attendance_menu():
         choice = input("Enter your choice (1-4): ")
         
         if choice == '1':
-            student_id = input("Enter Student ID: ")
-            results = search_attendance_history(student_id=student_id)
+            criteria = {'student_id': input("Enter Student ID: ")}
         elif choice == '2':
             date_str = input("Enter Date (YYYY-MM-DD): ")
             try:
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                results = search_attendance_history(date=date)
+                criteria = {'date': datetime.strptime(date_str, '%Y-%m-%d').date()}
             except ValueError:
                 print("Invalid date format! Please use YYYY-MM-DD")
                 continue
         elif choice == '3':
-            results = search_attendance_history()
+            criteria = {}
         elif choice == '4':
             break
         else:
             print("Invalid choice!")
             continue
         
-        if results:
-            print("\nAttendance Records:")
-            print("Student ID\tDate\t\tTime")
-            print("-" * 40)
-            for record in results:
-                print(f"{record[0]}\t\t{record[1]}\t{record[2]}")
-        else:
+        results = search_attendance_history(**criteria)
+        if not results:
             print("No records found!")
+            continue
+        print("\nAttendance Records:")
+        print("Student ID\tDate\t\tTime")
+        print("-" * 40)
+        while results:
+            for record in results:
+                print(f"{record['student_id']}\t\t{record['date']}\t{record['time']}")
+            if len(results) < HISTORY_PAGE_SIZE:
+                break
+            if input("Press Enter for more, or 'q' to stop: ").lower() == 'q':
+                break
+            last = results[-1]
+            results = search_attendance_history(before=(last['date'], last['time'], last['id']),
+                                                **criteria)
 
 # ฟังก์ชันหลัก
 def main():
     """
     เมนูหลักของโปรแกรม
-    - เริ่มการรู้จำใบหน้า
+    - เริ่มการรู้จำใบหน้า (แบบปกติ แบบแบ่งขั้นตอน แบบติดตามใบหน้า แบบโมเดล OpenCV หรือหลายกล้อง)
+    - สลับโปรไฟล์การเตรียมภาพใบหน้า และเปิด/ปิดการตรวจจับแบบย่อภาพ
+    - เลือกกลุ่มเรียน (รู้จำเฉพาะนักศึกษาใน roster ของกลุ่มนั้น)
     - ค้นหาประวัติ
     - ออกจากโปรแกรม
     """
+    profile = 'accurate'
+    fast_detection = False
+    section = None
+    fallback = False
     while True:
+        options = dict(profile=profile, fast_detection=fast_detection, section=section,
+                       fallback=fallback)
         print("\nFace Recognition Attendance System")
         print("1. Start Recognition")
-        print("2. Search Attendance History")
-        print("3. Exit")
+        print("2. Start Recognition (Pipelined)")
+        print("3. Start Recognition (Tracking)")
+        print("4. Start Recognition (OpenCV Model)")
+        print("5. Start Recognition (Multi-Camera)")
+        print(f"6. Switch Preprocessing Profile (current: {profile})")
+        print(f"7. Toggle Fast Detection (current: {'on' if fast_detection else 'off'})")
+        print(f"8. Select Class Section (current: {section or 'all students'})")
+        print("9. Search Attendance History")
+        print("10. Exit")
         
-        choice = input("Enter your choice (1-3): ")
+        choice = input("Enter your choice (1-10): ")
         
         if choice == '1':
-            recognize_faces()
+            recognize_faces(**options)
         elif choice == '2':
-            display_attendance_menu()
+            recognize_faces(pipelined=True, **options)
         elif choice == '3':
+            recognize_faces(tracking=True, **options)
+        elif choice == '4':
+            recognize_faces(use_opencv=True, **options)
+        elif choice == '5':
+            text = input("Enter camera indexes, video files or stream URLs (comma separated): ")
+            sources = [parse_source(t) for t in text.split(",") if t.strip()]
+            if sources:
+                recognize_multi_camera(sources, **options)
+            else:
+                print("No sources given!")
+        elif choice == '6':
+            profile = 'fast' if profile == 'accurate' else 'accurate'
+            print(f"Preprocessing profile: {profile}")
+        elif choice == '7':
+            fast_detection = not fast_detection
+            print(f"Fast detection: {'on' if fast_detection else 'off'}")
+        elif choice == '8':
+            section = input("Enter section ID (blank = all students): ").strip() or None
+            fallback = bool(section) and input("Fall back to all students for unknown faces? (y/n): ").lower() == 'y'
+            print(f"Class section: {section or 'all students'}")
+        elif choice == '9':
+            display_attendance_menu()
+        elif choice == '10':
             print("Goodbye!")
             break
         else:
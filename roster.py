@@ -0,0 +1,59 @@
+# นำเข้าไลบรารีที่จำเป็น
+import argparse  # ใช้สำหรับรับพารามิเตอร์จาก command line
+import csv       # ใช้อ่านรายชื่อนักศึกษาจากไฟล์ CSV
+from database import AttendanceDB  # ใช้บันทึกรายชื่อกลุ่มเรียน
+
+HEADER_NAMES = {'student_id', 'id', 'รหัส', 'รหัสนักศึกษา'}  # ชื่อคอลัมน์แรกของบรรทัดหัวตาราง
+
+# ฟังก์ชันตัดบรรทัดหัวตารางของไฟล์ CSV
+def skip_header(rows, path):
+    """
+    ตัดบรรทัดแรกออกถ้าคอลัมน์แรกเป็นชื่อคอลัมน์ใน HEADER_NAMES (ไม่สนตัวพิมพ์เล็กใหญ่)
+    - ไม่ดูว่าเป็นตัวเลขหรือไม่ รหัสนักศึกษาที่มีตัวอักษร (เช่น B6501234) จึงไม่ถูกตัดทิ้ง
+    - แสดงบรรทัดที่ถูกข้าม
+    """
+    if rows and rows[0][0].strip().lower() in HEADER_NAMES:
+        print(f"{path}: skipping header row {','.join(rows[0])}")
+        return rows[1:]
+    return rows
+
+# ฟังก์ชันอ่านรหัสนักศึกษาจากไฟล์ CSV
+def read_student_ids(path):
+    """
+    อ่านรหัสนักศึกษาจากคอลัมน์แรกของไฟล์ CSV
+    - ข้ามบรรทัดว่าง และบรรทัดหัวตาราง (เช่น student_id)
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    return [row[0].strip() for row in skip_header(rows, path)]
+
+# ฟังก์ชันแสดงกลุ่มเรียนทั้งหมด
+def list_sections(db):
+    """แสดงรหัส ชื่อ และจำนวนนักศึกษาของทุกกลุ่มเรียน"""
+    sections = db.get_sections()
+    if not sections:
+        print("ยังไม่มีกลุ่มเรียน")
+    for section in sections:
+        print(f"{section['id']}: {section['name'] or '-'} ({section['students']} คน)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="จัดการรายชื่อนักศึกษาของกลุ่มเรียน (ใช้เลือก shard ตอนรู้จำใบหน้า)")
+    parser.add_argument("section", nargs="?", help="รหัสกลุ่มเรียน (ไม่ระบุ = แสดงกลุ่มเรียนทั้งหมด)")
+    parser.add_argument("students", nargs="*", help="รหัสนักศึกษาที่จะเพิ่ม")
+    parser.add_argument("--csv", help="ไฟล์ CSV ที่มีรหัสนักศึกษาในคอลัมน์แรก")
+    parser.add_argument("--name", help="ชื่อกลุ่มเรียน")
+    parser.add_argument("--replace", action="store_true", help="ล้างรายชื่อเดิมก่อนเพิ่ม")
+    args = parser.parse_args()
+
+    db = AttendanceDB()
+    try:
+        if args.section is None:
+            list_sections(db)
+        else:
+            student_ids = list(args.students)
+            if args.csv:
+                student_ids += read_student_ids(args.csv)
+            count = db.add_to_roster(args.section, student_ids, name=args.name, replace=args.replace)
+            print(f"กลุ่มเรียน {args.section} มีนักศึกษา {count} คน")
+    finally:
+        db.close()
@@ -0,0 +1,5 @@
+# ให้ test import โมดูลในโฟลเดอร์หลักของโปรเจกต์ได้
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
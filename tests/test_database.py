@@ -0,0 +1,144 @@
+# ทดสอบฐานข้อมูลการเข้าเรียน
+import sqlite3
+import time
+from datetime import datetime
+import database
+from database import AttendanceRecorder
+
+def test_recorder_allows_rerecord_after_failed_write(tmp_path, monkeypatch):
+    """ชุดรายการที่เขียนไม่สำเร็จต้องไม่ถูกจำว่าบันทึกแล้ว จึงบันทึกได้อีกเมื่อพบใบหน้าครั้งถัดไป"""
+    monkeypatch.setattr(database, 'BUSY_TIMEOUT_MS', 0)
+    monkeypatch.setattr(database, 'WRITE_RETRIES', 1)
+    monkeypatch.setattr(database, 'WRITE_RETRY_DELAY', 0.01)
+    db_path = str(tmp_path / 'attendance.db')
+    recorder = AttendanceRecorder(db_path, flush_interval=0.01)
+
+    blocker = sqlite3.connect(db_path)
+    blocker.execute('BEGIN IMMEDIATE')  # โปรแกรมอื่นถือ lock การเขียนไว้
+    assert recorder.record('A')
+    deadline = time.monotonic() + 5
+    while recorder.failed == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    blocker.rollback()
+    blocker.close()
+    assert recorder.failed == 1
+
+    assert recorder.record('A')
+    recorder.close()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT student_id FROM attendance').fetchall() == [('A',)]
+    conn.close()
+
+def test_concurrent_readers_and_recorder(tmp_path):
+    """หลาย thread อ่านจาก AttendanceDB ตัวเดียวกันพร้อมกับ AttendanceRecorder เขียน ต้องไม่มี error"""
+    import threading
+    from datetime import datetime, timedelta
+    from database import AttendanceDB
+
+    db_path = str(tmp_path / 'attendance.db')
+    db = AttendanceDB(db_path)
+    db.add_students([(f's{i}', f'Student {i}') for i in range(200)])
+    recorder = AttendanceRecorder(db_path, batch_size=10, flush_interval=0.01)
+    errors = []
+    stop = threading.Event()
+
+    def read_loop():
+        while not stop.is_set():
+            try:
+                db.get_dashboard_summary()
+                db.search_attendance(limit=20)
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read_loop) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    start = datetime(2030, 1, 1, 8)
+    expected = 0
+    for day in range(5):
+        for i in range(200):
+            assert recorder.record(f's{i}', start + timedelta(days=day))
+            expected += 1
+    recorder.close()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert recorder.failed == 0
+    assert recorder.written == expected
+    count = db.conn.execute("SELECT COUNT(*) FROM attendance WHERE date >= '2030-01-01'").fetchone()[0]
+    assert count == expected
+    db.close()
+
+def test_rollups_follow_writes_and_clear(tmp_path):
+    """ตารางสรุปต้องตรงกับตาราง attendance ทั้งหลังบันทึก ลบ และล้างข้อมูลทั้งหมด"""
+    from datetime import date
+    from database import AttendanceDB
+
+    db = AttendanceDB(str(tmp_path / 'attendance.db'))
+    db.add_students([('a', 'A'), ('b', 'B'), ('c', 'C')], register_date='2030-01-01')
+    db.add_to_roster('S1', ['a', 'b'])
+    rows = [('a', '2030-01-02'), ('b', '2030-01-02'), ('a', '2030-01-03'),
+            ('c', '2030-01-04'), ('a', '2030-02-01')]
+    with db.conn:
+        db.conn.executemany("INSERT INTO attendance (student_id, date, time) VALUES (?, ?, '08:00:00')", rows)
+
+    days = db.get_daily_totals(date(2030, 1, 1), date(2030, 2, 28))
+    assert [(d['date'], d['present']) for d in days] == [
+        ('2030-01-02', 2), ('2030-01-03', 1), ('2030-01-04', 1), ('2030-02-01', 1)]
+    rates = {s['id']: s for s in db.get_student_rates(date(2030, 1, 1), date(2030, 2, 28))}
+    assert (rates['a']['attended'], rates['a']['class_days']) == (3, 4)
+    # วันที่มีเฉพาะนักศึกษานอกกลุ่มเรียนเข้าเรียน (2030-01-04) ไม่นับเป็นวันเรียนของกลุ่ม
+    section = {s['id']: s for s in db.get_student_rates(date(2030, 1, 1), date(2030, 2, 28), 'S1')}
+    assert set(section) == {'a', 'b'}
+    assert (section['a']['attended'], section['a']['class_days']) == (3, 3)
+
+    with db.conn:
+        db.conn.execute("DELETE FROM attendance WHERE student_id = 'c'")
+    assert [d['date'] for d in db.get_daily_totals(date(2030, 1, 1), date(2030, 2, 28))] == [
+        '2030-01-02', '2030-01-03', '2030-02-01']
+
+    assert db.delete_all_attendance()
+    assert db.get_daily_totals(date(2030, 1, 1), date(2030, 2, 28)) == []
+    assert db.conn.execute('SELECT COUNT(*) FROM attendance_monthly').fetchone()[0] == 0
+    db.record_attendance('a')  # trigger ต้องถูกใส่กลับหลังล้างข้อมูล
+    assert db.conn.execute('SELECT SUM(present) FROM attendance_daily').fetchone()[0] == 1
+    db.close()
+
+def test_add_students_keeps_register_date(tmp_path):
+    """นำเข้านักศึกษาเดิมซ้ำต้องอัปเดตเฉพาะชื่อ ไม่เปลี่ยนวันที่ลงทะเบียน"""
+    from database import AttendanceDB
+
+    db = AttendanceDB(str(tmp_path / 'attendance.db'))
+    db.add_students([('a', 'Old Name')], register_date='2030-01-01')
+    db.add_students([('a', 'New Name'), ('b', 'B')], register_date='2030-06-01')
+    rows = db.conn.execute('SELECT student_id, name, register_date FROM students ORDER BY student_id').fetchall()
+    assert [tuple(row) for row in rows] == [('a', 'New Name', '2030-01-01'), ('b', 'B', '2030-06-01')]
+    db.close()
+
+def test_recorder_counts_inserted_rows_and_survives_unexpected_errors(tmp_path):
+    """written ต้องไม่นับแถวที่ INSERT OR IGNORE ข้าม และ error ที่ไม่ใช่ของ sqlite ต้องไม่ทำให้ thread เขียนหยุด"""
+    db_path = str(tmp_path / 'attendance.db')
+    recorder = AttendanceRecorder(db_path, flush_interval=0.01)
+    today = str(datetime.now().date())
+    conn = sqlite3.connect(db_path)
+    with conn:
+        # โปรแกรมอื่นบันทึก B ไปแล้วหลังจาก recorder โหลดรายชื่อของวันนี้
+        conn.execute("INSERT INTO attendance (student_id, date, time) VALUES ('B', ?, '08:00:00')", (today,))
+
+    class Unstorable:
+        pass
+    sqlite3.register_adapter(Unstorable, lambda value: 1 / 0)
+    assert recorder.record(Unstorable())
+    deadline = time.monotonic() + 5
+    while recorder.failed == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert recorder.failed == 1
+
+    assert recorder.record('A')
+    assert recorder.record('B')
+    recorder.close()
+    assert recorder.written == 1
+    assert conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,41 @@
+# ทดสอบตัวตรวจจับใบหน้าแบบย่อภาพและ ROI
+import glob
+import os
+import cv2
+import numpy as np
+from detection import FastFaceDetector
+from training import create_face_detector
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset')
+
+# ฟังก์ชันสร้างเฟรมที่มีคนใกล้กล้อง และคนไกลกล้องเข้ามาตั้งแต่เฟรม far_from
+def mixed_frames(frames=60, far_from=7, size=(1280, 720)):
+    """คืนค่า (list ของเฟรมที่ปรับ histogram แล้ว, กรอบโดยประมาณของใบหน้าไกล)"""
+    paths = sorted(glob.glob(os.path.join(DATASET, '*', '*.jpg')))
+    near = cv2.imread(paths[0], cv2.IMREAD_GRAYSCALE)
+    far = cv2.resize(cv2.imread(paths[len(paths) // 2], cv2.IMREAD_GRAYSCALE), None,
+                     fx=0.4, fy=0.4, interpolation=cv2.INTER_AREA)
+    width, height = size
+    background = np.tile(np.linspace(70, 180, width, dtype=np.uint8), (height, 1))
+    fy = height - far.shape[0] - 20
+    result = []
+    for i in range(frames):
+        frame = background.copy()
+        frame[100:100 + near.shape[0], 600:600 + near.shape[1]] = near
+        if i >= far_from:
+            frame[fy:fy + far.shape[0], 20:20 + far.shape[1]] = far
+        result.append(cv2.equalizeHist(frame))
+    return result, (20, fy, far.shape[1], far.shape[0])
+
+def test_finds_smaller_face_after_larger_one():
+    """ใบหน้าไกล (เล็กกว่าใบหน้าที่พบก่อนหน้ามาก) ต้องถูกพบภายในรอบการตรวจแบบเต็มช่วง"""
+    frames, (fx, fy, fw, fh) = mixed_frames()
+    detector = FastFaceDetector(create_face_detector())
+    found_at = None
+    for i, gray in enumerate(frames):
+        boxes = detector.detect(gray)
+        if any(fx <= x + w // 2 < fx + fw and fy <= y + h // 2 < fy + fh for (x, y, w, h) in boxes):
+            found_at = i
+            break
+    assert found_at is not None
+    assert found_at <= 7 + detector.wide_scan_interval + detector.full_scan_interval
@@ -0,0 +1,19 @@
+# ทดสอบตัวเก็บสถิติของโปรแกรมรู้จำใบหน้า
+from metrics import StageMetrics, load_snapshot
+
+def test_window_counts_only_since_last_dump(tmp_path):
+    """ตัวนับใน window ต้องเป็นค่าที่เพิ่มขึ้นหลัง dump ครั้งก่อน ไม่ใช่ค่าสะสมตั้งแต่เริ่มโปรแกรม"""
+    path = str(tmp_path / "metrics.json")
+    metrics = StageMetrics()
+    metrics.inc('frames', 100)
+    metrics.inc('faces', 100)
+    metrics.dump(path)
+
+    metrics.inc('frames', 10)
+    metrics.inc('faces', 30)
+    metrics.dump(path)
+
+    snapshot = load_snapshot(path)
+    assert snapshot['counters'] == {'frames': 110, 'faces': 130}
+    assert snapshot['window']['counters'] == {'frames': 10, 'faces': 30}
+    assert 0 <= snapshot['window']['seconds'] < 60
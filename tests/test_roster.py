@@ -0,0 +1,18 @@
+# ทดสอบการอ่านรายชื่อนักศึกษาจากไฟล์ CSV
+from bulk_enroll import read_roster
+from roster import read_student_ids
+
+def test_alphanumeric_first_id_is_not_a_header(tmp_path):
+    """รหัสนักศึกษาที่มีตัวอักษรในบรรทัดแรกต้องไม่ถูกข้ามเหมือนหัวตาราง"""
+    path = tmp_path / 'students.csv'
+    path.write_text('B6501234,Alice\n6501235,Bob\n', encoding='utf-8')
+    assert read_student_ids(str(path)) == ['B6501234', '6501235']
+    assert read_roster(str(path)) == {'B6501234': 'Alice', '6501235': 'Bob'}
+
+def test_named_header_is_skipped(tmp_path):
+    """บรรทัดหัวตารางที่คอลัมน์แรกเป็นชื่อที่รู้จักต้องถูกข้าม"""
+    path = tmp_path / 'students.csv'
+    path.write_text('รหัสนักศึกษา,ชื่อ\nB6501234,Alice\n', encoding='utf-8')
+    assert read_roster(str(path)) == {'B6501234': 'Alice'}
+    path.write_text('Student_ID\nB6501234\n', encoding='utf-8')
+    assert read_student_ids(str(path)) == ['B6501234']
@@ -0,0 +1,47 @@
+# ทดสอบการติดตามใบหน้าระหว่างเฟรม
+import numpy as np
+from tracking import FaceTracker
+
+# ฟังก์ชันสร้างเฟรมพื้นหลังที่มีลวดลาย (optical flow ติดตามได้ตลอด)
+def textured_frame(seed=0, size=(240, 320)):
+    """คืนค่าภาพโทนสีเทาที่มีลวดลายสุ่มแบบกำหนด seed"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=size, dtype=np.uint8)
+
+def test_face_leaves_and_new_face_arrives_at_same_spot():
+    """ใบหน้าใหม่ที่มาอยู่ตำแหน่งเดิมต้องได้ track ใหม่ ไม่สืบทอดรหัสนักศึกษาของคนก่อน"""
+    tracker = FaceTracker(detect_interval=10)
+    frame = textured_frame()
+    box = (100, 80, 60, 60)
+
+    # คน A ถูกรู้จำและยืนยันตัวตน
+    track = tracker.update(frame, [box])[0]
+    for _ in range(3):
+        track.add_vote('A', 40.0)
+    assert track.confirmed_id == 'A'
+
+    # คน A ออกไป: ตรวจจับไม่พบใบหน้า แต่ optical flow บนพื้นหลังยังติดตามได้
+    lost = False
+    for _ in range(200):
+        detections = [] if tracker.needs_detection() else None
+        tracker.update(frame, detections)
+        lost = lost or tracker.track_lost
+    assert lost
+    assert tracker.tracks == []
+
+    # คน B มายืนที่ตำแหน่งเดิม
+    tracks = tracker.update(frame, [box])
+    assert len(tracks) == 1
+    assert tracks[0].track_id != track.track_id
+    assert tracks[0].confirmed_id is None
+
+def test_matched_track_survives_between_detections():
+    """track ที่ตรงกับผลการตรวจจับทุกรอบต้องไม่ถูกลบ"""
+    tracker = FaceTracker(detect_interval=10)
+    frame = textured_frame()
+    box = (100, 80, 60, 60)
+    first = tracker.update(frame, [box])[0]
+    for _ in range(100):
+        detections = [box] if tracker.needs_detection() else None
+        tracker.update(frame, detections)
+    assert [t.track_id for t in tracker.tracks] == [first.track_id]
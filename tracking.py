@@ -0,0 +1,152 @@
+# นำเข้าไลบรารีที่จำเป็น
+import cv2          # ใช้สำหรับ optical flow
+import numpy as np  # ใช้สำหรับคำนวณตำแหน่งของกรอบใบหน้า
+
+# ฟังก์ชันคำนวณพื้นที่ซ้อนทับของกรอบ
+def iou(box_a, box_b):
+    """
+    คำนวณค่า Intersection over Union ของกรอบ (x, y, w, h) สองกรอบ
+    - คืนค่าระหว่าง 0 (ไม่ซ้อนกัน) ถึง 1 (ทับกันพอดี)
+    """
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+class FaceTrack:
+    """ข้อมูลของใบหน้าหนึ่งใบที่ติดตามอยู่ พร้อมผลโหวตการรู้จำของตัวเอง"""
+
+    def __init__(self, track_id, box):
+        """สร้าง track ใหม่จากกรอบใบหน้าที่ตรวจพบ"""
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.votes = []            # ประวัติการรู้จำ (student_id, confidence) ของ track นี้
+        self.confirmed_id = None   # รหัสนักศึกษาเมื่อยืนยันตัวตนแล้ว
+        self.last_confidence = None
+        self.missed = 0            # จำนวนเฟรมที่ติดตามไม่สำเร็จติดต่อกัน
+        self.unmatched = 0         # จำนวนรอบตรวจจับติดต่อกันที่ไม่พบใบหน้าตรงกับ track นี้
+
+    def add_vote(self, student_id, confidence, history_size=5, required=3):
+        """
+        เพิ่มผลการรู้จำหนึ่งครั้ง
+        - student_id เป็น None เมื่อ confidence ไม่ผ่าน threshold
+        - ยืนยันตัวตนเมื่อ required ครั้งล่าสุดได้ ID เดียวกัน
+        - คืนค่า True เฉพาะครั้งที่เพิ่งยืนยันตัวตนสำเร็จ
+        """
+        self.last_confidence = confidence
+        self.votes.append(student_id)
+        if len(self.votes) > history_size:
+            self.votes.pop(0)
+
+        recent = self.votes[-required:]
+        if (student_id is not None and len(recent) == required
+                and all(v == student_id for v in recent)):
+            self.confirmed_id = student_id
+            return True
+        return False
+
+class FaceTracker:
+    """
+    ติดตามใบหน้าระหว่างเฟรม เพื่อไม่ต้องตรวจจับใบหน้าทุกเฟรม
+    - ตรวจจับใหม่ทุก detect_interval เฟรม หรือเมื่อไม่มี track / track หาย
+    - ระหว่างนั้นเลื่อนกรอบตาม optical flow (Lucas-Kanade)
+    - จับคู่ผลการตรวจจับกับ track เดิมด้วยค่า IoU
+    - track ที่ไม่ตรงกับผลการตรวจจับเกิน max_unmatched รอบติดต่อกันจะถูกลบ แม้ optical flow
+      ยังเลื่อนกรอบได้ (เช่น ใบหน้าออกไปแล้วแต่กรอบค้างอยู่บนพื้นหลังที่มีลวดลาย)
+    """
+
+    def __init__(self, detect_interval=10, iou_threshold=0.3, max_missed=5, max_unmatched=1):
+        """กำหนดค่าพารามิเตอร์ของการติดตาม"""
+        self.detect_interval = detect_interval
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.max_unmatched = max_unmatched
+        self.tracks = []
+        self.next_id = 0
+        self.frame_index = 0
+        self.prev_gray = None
+        self.track_lost = False
+
+    def needs_detection(self):
+        """ตรวจสอบว่าเฟรมปัจจุบันต้องรัน face detector หรือไม่"""
+        return (not self.tracks or self.track_lost
+                or self.frame_index % self.detect_interval == 0)
+
+    def update(self, gray, detections=None):
+        """
+        อัปเดต track ด้วยภาพเฟรมใหม่
+        - ถ้ามี detections ให้จับคู่กับ track เดิม และสร้าง track ใหม่สำหรับใบหน้าใหม่
+        - ถ้าไม่มี ให้เลื่อนกรอบตาม optical flow จากเฟรมก่อนหน้า
+        - คืนค่า list ของ track ที่ยังติดตามอยู่
+        """
+        self.track_lost = False
+        if detections is not None:
+            self._match(detections)
+        elif self.prev_gray is not None:
+            for track in self.tracks:
+                self._follow(track, gray)
+
+        alive = [t for t in self.tracks
+                 if t.missed <= self.max_missed and t.unmatched <= self.max_unmatched]
+        if len(alive) != len(self.tracks):
+            self.track_lost = True
+        self.tracks = alive
+        self.prev_gray = gray
+        self.frame_index += 1
+        return self.tracks
+
+    def _match(self, detections):
+        """จับคู่กรอบที่ตรวจพบกับ track เดิมแบบ greedy ตามค่า IoU"""
+        pairs = sorted(
+            ((iou(track.box, box), ti, di)
+             for ti, track in enumerate(self.tracks)
+             for di, box in enumerate(detections)),
+            reverse=True
+        )
+        used_tracks, used_detections = set(), set()
+        for score, ti, di in pairs:
+            if score < self.iou_threshold:
+                break
+            if ti in used_tracks or di in used_detections:
+                continue
+            self.tracks[ti].box = tuple(int(v) for v in detections[di])
+            self.tracks[ti].missed = 0
+            self.tracks[ti].unmatched = 0
+            used_tracks.add(ti)
+            used_detections.add(di)
+
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                track.missed += 1
+                track.unmatched += 1
+        for di, box in enumerate(detections):
+            if di not in used_detections:
+                self.tracks.append(FaceTrack(self.next_id, box))
+                self.next_id += 1
+
+    def _follow(self, track, gray):
+        """เลื่อนกรอบของ track ตามค่ามัธยฐานของ optical flow ภายในกรอบ"""
+        x, y, w, h = track.box
+        mask = np.zeros_like(self.prev_gray)
+        mask[y:y+h, x:x+w] = 255
+        points = cv2.goodFeaturesToTrack(self.prev_gray, maxCorners=30, qualityLevel=0.01,
+                                         minDistance=5, mask=mask)
+        if points is None:
+            track.missed += 1
+            return
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, points, None)
+        good = status.reshape(-1) == 1
+        if good.sum() < 5:
+            track.missed += 1
+            return
+
+        dx, dy = np.median((new_points - points).reshape(-1, 2)[good], axis=0)
+        height, width = gray.shape[:2]
+        x = int(min(max(0, x + dx), width - w))
+        y = int(min(max(0, y + dy), height - h))
+        track.box = (x, y, w, h)
+        track.missed = 0
@@ -0,0 +1,291 @@
+# นำเข้าไลบรารีที่จำเป็น
+import cv2          # ใช้สำหรับตรวจจับใบหน้าและโมเดล LBPH
+import numpy as np  # ใช้สำหรับจัดการ array ของ label
+import os           # ใช้จัดการไฟล์และโฟลเดอร์
+import pickle       # ใช้สำหรับบันทึก mapping และ manifest
+from concurrent.futures import ProcessPoolExecutor  # ใช้สำหรับตัดใบหน้าแบบหลาย process
+from face_cache import FaceCropCache  # ใช้สำหรับ cache ใบหน้าที่ตัดแล้วบนดิสก์
+from face_pack import (ENTRY_SEPARATOR, PACK_SUFFIX, load_pack, pack_path,
+                       read_pack_header, split_entry)  # ใช้อ่านใบหน้าที่ตัดไว้แล้วแบบ pack
+from model_bundle import bundle_is_current, write_bundle  # ใช้บันทึกโมเดลแบบ binary สำหรับการรู้จำ
+
+MODEL_PATH = "face_model.yml"           # ไฟล์โมเดล LBPH
+MAPPING_PATH = "id_mapping.pickle"      # ไฟล์ mapping ระหว่างรหัสนักศึกษากับ label
+MANIFEST_PATH = "model_manifest.pickle" # ไฟล์บันทึกว่ารูปใดถูกเทรนเข้าโมเดลแล้ว
+FACE_SIZE = (200, 200)                  # ขนาดภาพใบหน้าที่ใช้เทรน (ตรงกับตอนรู้จำ)
+TRAIN_CHUNK_SIZE = 500                  # จำนวนรูปที่ตัดใบหน้าและเทรนต่อครั้ง (จำกัดหน่วยความจำ)
+
+# ฟังก์ชันสร้างตัวตรวจจับใบหน้า
+def create_face_detector():
+    """สร้าง Haar cascade สำหรับตรวจจับใบหน้า"""
+    return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+# ฟังก์ชันสำรวจรูปภาพใน dataset
+def scan_dataset(dataset_path="dataset"):
+    """
+    สำรวจรูปภาพทั้งหมดในโฟลเดอร์ dataset
+    - คืนค่า dict ของ {image_path: (person_id, size, mtime)}
+    - ใช้เฉพาะข้อมูลจาก stat ไม่ต้องเปิดอ่านรูป
+    - ใบหน้าใน pack (dataset/<person_id>.faces) ใช้ path "<pack>#<ลำดับ>" และขนาด/mtime ของ pack
+      (อ่านเฉพาะส่วนหัว) ถ้านักศึกษามีทั้ง pack และโฟลเดอร์ จะใช้ pack แทนโฟลเดอร์
+    """
+    images = {}
+    for name in sorted(os.listdir(dataset_path)):
+        path = os.path.join(dataset_path, name)
+        if name.endswith(PACK_SUFFIX) and os.path.isfile(path):
+            try:
+                count = read_pack_header(path)[0]
+            except ValueError as e:
+                print(f"Skipped {path}: {e}")
+                continue
+            st = os.stat(path)
+            for index in range(count):
+                images[f"{path}{ENTRY_SEPARATOR}{index}"] = (name[:-len(PACK_SUFFIX)],
+                                                             st.st_size, st.st_mtime_ns)
+            continue
+        person_id, person_dir = name, path
+        if not os.path.isdir(person_dir) or os.path.isfile(pack_path(dataset_path, person_id)):
+            continue
+        for image_name in sorted(os.listdir(person_dir)):
+            image_path = os.path.join(person_dir, image_name)
+            st = os.stat(image_path)
+            images[image_path] = (person_id, st.st_size, st.st_mtime_ns)
+    return images
+
+# ฟังก์ชันตัดใบหน้าจากภาพโทนสีเทา
+def crop_face(gray, face_detector):
+    """
+    ตัดเฉพาะใบหน้าที่ใหญ่ที่สุดจากภาพโทนสีเทา
+    - ปรับ histogram และปรับขนาดเป็น FACE_SIZE
+    - คืนค่า None ถ้าไม่พบใบหน้า
+    """
+    detected = face_detector.detectMultiScale(gray, 1.1, 5)
+    if len(detected) == 0:
+        return None
+    x, y, w, h = max(detected, key=lambda r: r[2] * r[3])
+    return cv2.resize(cv2.equalizeHist(gray[y:y+h, x:x+w]), FACE_SIZE)
+
+# ฟังก์ชันโหลด manifest
+def load_manifest():
+    """โหลด manifest ของโมเดลปัจจุบัน คืนค่า None ถ้ายังไม่มีหรืออ่านไม่ได้"""
+    try:
+        with open(MANIFEST_PATH, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+# ฟังก์ชันบันทึกโมเดล mapping และ manifest
+def save_model(recognizer, id_to_num, images):
+    """
+    บันทึกโมเดลและข้อมูลประกอบทั้งหมด
+    - face_model.yml สำหรับโมเดล (ใช้ตอนเทรนเพิ่มด้วย recognizer.update)
+    - face_model.bin สำหรับการรู้จำ (histogram, mapping และ fingerprint ของ dataset ในไฟล์เดียว)
+    - id_mapping.pickle สำหรับ mapping แบบสองทาง
+    - model_manifest.pickle สำหรับการเทรนแบบเพิ่มทีละส่วน
+    """
+    recognizer.write(MODEL_PATH)
+    write_bundle(recognizer, id_to_num, images)
+    with open(MAPPING_PATH, "wb") as f:
+        pickle.dump({
+            'id_to_num': id_to_num,
+            'num_to_id': {v: k for k, v in id_to_num.items()}
+        }, f)
+    with open(MANIFEST_PATH, "wb") as f:
+        pickle.dump({'images': images, 'id_to_num': id_to_num}, f)
+
+# detector ของแต่ละ process ใน process pool (สร้างครั้งแรกที่ใช้งาน)
+_worker_detector = None
+
+# ฟังก์ชันตัดใบหน้าจากรูปภาพหลายรูป (ใช้ได้ทั้งใน process หลักและใน process pool)
+def _encode_images(image_paths, face_detector=None):
+    """
+    ถอดรหัสรูปและตัดใบหน้าจากรายการรูปภาพ
+    - ถ้าไม่ส่ง face_detector มา จะใช้ detector ประจำ process
+    - คืนค่า list ของ (image_path, face, reason) โดย reason เป็นสาเหตุที่ไม่ได้ใบหน้า
+    """
+    global _worker_detector
+    if face_detector is None:
+        if _worker_detector is None:
+            _worker_detector = create_face_detector()
+        face_detector = _worker_detector
+
+    results = []
+    for image_path in image_paths:
+        gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            results.append((image_path, None, "unreadable"))
+            continue
+        face = crop_face(gray, face_detector)
+        results.append((image_path, face, None if face is not None else "no face"))
+    return results
+
+# ฟังก์ชันพิมพ์สรุปรูปที่ตัดใบหน้าไม่ได้
+def _print_failures(failures):
+    """พิมพ์สรุปรูปที่ตัดใบหน้าไม่ได้ แยกตามสาเหตุ แทนการพิมพ์แทรกระหว่างประมวลผล"""
+    for reason, paths in sorted(failures.items()):
+        print(f"Skipped {len(paths)} images ({reason}):")
+        for path in paths:
+            print(f"  {path}")
+
+# ฟังก์ชันตัดใบหน้าทีละชุด
+def _iter_face_chunks(image_paths, images, id_to_num, face_detector, cache=None,
+                      executor=None, workers=1, chunk_size=TRAIN_CHUNK_SIZE):
+    """
+    generator ที่ตัดใบหน้าจากรายการรูปภาพทีละ chunk_size รูป และ yield (faces, labels) ของแต่ละชุด
+    - ใบหน้าใน pack ถูกตัดไว้แล้ว จึงอ่านจาก memory-map โดยตรงโดยไม่ผ่าน cache และการตรวจจับ
+    - ใช้ใบหน้าจาก cache ถ้ามี เพื่อไม่ต้องถอดรหัสรูปและตรวจจับใบหน้าซ้ำ
+    - ถ้ามี executor กระจายรูปที่ไม่มีใน cache ของชุดนั้นไปยัง workers process
+    - ลำดับของใบหน้าและ label ขึ้นกับ image_paths เท่านั้น ไม่ขึ้นกับจำนวน workers หรือ chunk_size
+    - บันทึกจำนวนใบหน้าที่พบลงใน images และพิมพ์สรุปรูปที่ตัดไม่ได้เมื่อครบทุกชุด
+    """
+    failures = {}  # {reason: [image_path]}
+    packs = {}     # {path ของ pack: ใบหน้าทั้งหมดแบบ memory-map}
+    for begin in range(0, len(image_paths), chunk_size):
+        batch = image_paths[begin:begin + chunk_size]
+        crops = {}    # {image_path: (face, reason)}
+        digests = {}  # {image_path: digest} ของรูปที่ยังไม่มีใน cache
+        pending = []  # รูปที่ต้องตรวจจับใบหน้า
+        for image_path in batch:
+            person_id, size, mtime = images[image_path][:3]
+            entry = split_entry(image_path)
+            if entry is not None:
+                if entry[0] not in packs:
+                    packs[entry[0]] = load_pack(entry[0])
+                face = np.asarray(packs[entry[0]][entry[1]])
+                crops[image_path] = ((face, None) if face.shape == (FACE_SIZE[1], FACE_SIZE[0])
+                                     else (None, "wrong face size"))
+                continue
+            if cache is not None:
+                digest, entry = cache.lookup(image_path, size, mtime)
+                if entry is not None:
+                    crops[image_path] = entry
+                    continue
+                digests[image_path] = digest
+            pending.append(image_path)
+
+        if pending:
+            if executor is not None and len(pending) > 1:
+                step = -(-len(pending) // workers)
+                parts = [pending[i:i + step] for i in range(0, len(pending), step)]
+                results = [r for part in executor.map(_encode_images, parts) for r in part]
+            else:
+                results = _encode_images(pending, face_detector)
+            for image_path, face, reason in results:
+                crops[image_path] = (face, reason)
+                if cache is not None:
+                    cache.store(digests[image_path], face, reason)
+
+        faces = []
+        labels = []
+        for image_path in batch:
+            person_id, size, mtime = images[image_path][:3]
+            face, reason = crops[image_path]
+            if face is None:
+                failures.setdefault(reason, []).append(image_path)
+                images[image_path] = (person_id, size, mtime, 0)
+                continue
+            faces.append(face)
+            labels.append(id_to_num[person_id])
+            images[image_path] = (person_id, size, mtime, 1)
+        if faces:
+            yield faces, labels
+    _print_failures(failures)
+
+# ฟังก์ชันเทรนโมเดลจากรูปภาพทีละชุด
+def _train_streaming(recognizer, image_paths, images, id_to_num, face_detector, cache=None,
+                     workers=1, chunk_size=TRAIN_CHUNK_SIZE, update=False):
+    """
+    ตัดใบหน้าและเทรนโมเดลทีละชุด หน่วยความจำของใบหน้าจึงขึ้นกับ chunk_size ไม่ใช่ขนาด dataset
+    - ชุดแรกใช้ recognizer.train() (ยกเว้น update=True) ชุดถัดไปใช้ recognizer.update()
+    - LBPH เก็บ histogram ของแต่ละใบหน้าแยกกัน ผลจึงเหมือนการเทรนด้วยใบหน้าทั้งหมดครั้งเดียว
+    - คืนค่าจำนวนใบหน้าที่ใช้เทรน
+    """
+    executor = None
+    if workers > 1:
+        print(f"Detecting faces using {workers} processes...")
+        executor = ProcessPoolExecutor(max_workers=workers)
+    total = 0
+    try:
+        for faces, labels in _iter_face_chunks(image_paths, images, id_to_num, face_detector,
+                                               cache, executor, workers, chunk_size):
+            if total or update:
+                recognizer.update(faces, np.array(labels))
+            else:
+                recognizer.train(faces, np.array(labels))
+            total += len(faces)
+            print(f"  {total} faces trained")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return total
+
+# ฟังก์ชันเทรนโมเดล (เต็มรูปแบบหรือเพิ่มเฉพาะส่วนที่เปลี่ยน)
+def train_model(dataset_path="dataset", full_rebuild=False, workers=1,
+                chunk_size=TRAIN_CHUNK_SIZE):
+    """
+    เทรนโมเดล LBPH จากโฟลเดอร์ dataset
+    - เปรียบเทียบรูปใน dataset กับ manifest ของโมเดลเดิม
+    - ถ้ามีแต่รูปใหม่ จะใช้ recognizer.update() เทรนเพิ่มเฉพาะรูปใหม่
+    - เทรนใหม่ทั้งหมดเมื่อ full_rebuild=True, ไม่มีโมเดลเดิม, หรือมีรูปถูกลบ/แก้ไข
+    - workers กำหนดจำนวน process ที่ใช้ตัดใบหน้า (0 = ใช้ทุกคอร์)
+    - อ่านรูปและเทรนทีละ chunk_size รูป จึงไม่ต้องเก็บใบหน้าทั้ง dataset ไว้ในหน่วยความจำ
+    - คืนค่า (recognizer, id_to_num)
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    face_detector = create_face_detector()
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    cache = FaceCropCache(FACE_SIZE)
+    current = scan_dataset(dataset_path)
+    manifest = load_manifest()
+
+    if (not full_rebuild and manifest is not None
+            and os.path.exists(MODEL_PATH) and os.path.exists(MAPPING_PATH)):
+        known = manifest['images']
+        removed = [p for p, info in known.items()
+                   if p not in current or current[p] != info[:3]]
+        if not removed:
+            id_to_num = dict(manifest['id_to_num'])
+            new_paths = [p for p in current if p not in known]
+            recognizer.read(MODEL_PATH)
+            if not new_paths:
+                if not bundle_is_current(known):
+                    # โมเดลจากเวอร์ชันก่อนที่ยังไม่มี face_model.bin
+                    write_bundle(recognizer, id_to_num, known)
+                print("Model is up to date")
+                return recognizer, id_to_num
+
+            # กำหนด label ให้นักศึกษาใหม่ต่อจาก label เดิม
+            next_label = max(id_to_num.values(), default=-1) + 1
+            for path in new_paths:
+                person_id = current[path][0]
+                if person_id not in id_to_num:
+                    id_to_num[person_id] = next_label
+                    next_label += 1
+
+            images = dict(known)
+            images.update({p: current[p] for p in new_paths})
+            print(f"Updating model with {len(new_paths)} new images...")
+            _train_streaming(recognizer, new_paths, images, id_to_num, face_detector, cache,
+                             workers, chunk_size, update=True)
+            cache.save()
+            save_model(recognizer, id_to_num, images)
+            print("Model updated successfully")
+            return recognizer, id_to_num
+        print(f"{len(removed)} images removed or changed, rebuilding model...")
+
+    # เทรนใหม่ทั้งหมด โดยกำหนด label ตามลำดับตัวอักษรของรหัสนักศึกษา
+    person_ids = sorted({info[0] for info in current.values()})
+    id_to_num = {person_id: idx for idx, person_id in enumerate(person_ids)}
+    images = dict(current)
+    print(f"Training model from {len(current)} images in chunks of {chunk_size}...")
+    total = _train_streaming(recognizer, list(current), images, id_to_num, face_detector,
+                             cache, workers, chunk_size)
+    cache.save()
+    print(f"Face cache: {cache.hits} hits, {cache.misses} images detected")
+    if not total:
+        raise ValueError("No faces found in dataset")
+
+    save_model(recognizer, id_to_num, images)
+    print("Model trained and saved successfully")
+    return recognizer, id_to_num
@@ -1,12 +1,25 @@
 # นำเข้าไลบรารีที่จำเป็น
-from flask import Flask, render_template_string, redirect, url_for  # สำหรับสร้างเว็บแอพพลิเคชั่น
+from flask import Flask, render_template_string, redirect, url_for, request, jsonify, Response  # สำหรับสร้างเว็บแอพพลิเคชั่น
 from database import AttendanceDB  # สำหรับจัดการฐานข้อมูล
-from datetime import datetime  # สำหรับจัดการวันที่และเวลา
+from metrics import load_snapshot, render_prometheus  # สำหรับหน้า /metrics
+from datetime import datetime, timedelta  # สำหรับจัดการวันที่และเวลา
+from functools import lru_cache  # สำหรับจำผลการแปลงวันที่ที่ซ้ำกัน
 import pandas as pd  # สำหรับจัดการข้อมูล
+import json  # สำหรับแปลงข้อมูลเป็น JSON ใน event stream
+import csv  # สำหรับ export ข้อมูลการเข้าเรียนเป็น CSV
+import io  # สำหรับเขียน CSV ทีละส่วนก่อนส่งให้เบราว์เซอร์
+import tempfile  # สำหรับไฟล์ชั่วคราวของ export แบบ XLSX
+import time  # สำหรับรอระหว่างตรวจสอบรายการใหม่ใน event stream
 
 # สร้าง Flask application
 app = Flask(__name__)
 db = AttendanceDB()  # สร้างอินสแตนซ์ของฐานข้อมูล
+STREAM_POLL_INTERVAL = 1.0   # วินาทีระหว่างการตรวจสอบรายการใหม่ของ event stream
+STREAM_HEARTBEAT = 15.0      # วินาทีระหว่าง heartbeat เพื่อไม่ให้การเชื่อมต่อถูกตัด
+HISTORY_PAGE_LIMIT = 500     # จำนวนรายการสูงสุดต่อหน้าของ /api/attendance/history
+EXPORT_FLUSH_ROWS = 1000     # จำนวนแถวที่สะสมก่อนส่ง CSV แต่ละส่วน
+EXPORT_COLUMNS = ['date', 'time', 'student_id', 'name']
+REPORT_DEFAULT_DAYS = 120    # ช่วงเริ่มต้นของรายงาน (ประมาณหนึ่งภาคเรียน) เมื่อไม่ระบุ start
 
 # เทมเพลต HTML สำหรับหน้าเว็บ
 HTML_TEMPLATE = '''
@@ -36,7 +49,7 @@ HTML_TEMPLATE = '''
                             </div>
                             <div class="col-6">
                                 <h6>เข้าเรียนวันนี้:</h6>
-                                <h3>{{today_count}} คน</h3>
+                                <h3 id="today-count">{{today_count}} คน</h3>
                             </div>
                         </div>
                     </div>
@@ -48,6 +61,7 @@ HTML_TEMPLATE = '''
                         <h5 class="mb-0">การจัดการ</h5>
                     </div>
                     <div class="card-body">
+                        <a href="/report" class="btn btn-primary">รายงานการเข้าเรียน</a>
                         <a href="/clear" class="btn btn-danger" 
                            onclick="return confirm('ยืนยันการลบข้อมูลการเช็คชื่อทั้งหมด?')">
                             ลบข้อมูลการเช็คชื่อทั้งหมด
@@ -76,18 +90,18 @@ HTML_TEMPLATE = '''
                             </thead>
                             <tbody>
                                 {% for student in students %}
-                                <tr>
+                                <tr data-student-id="{{student.id}}">
                                     <td>{{student.id}}</td>
                                     <td>{{student.name}}</td>
                                     <td>{{student.register_date}}</td>
-                                    <td>
+                                    <td class="status">
                                         {% if student.attended_today %}
                                         <span class="badge bg-success">เข้าเรียนแล้ว</span>
                                         {% else %}
                                         <span class="badge bg-secondary">ยังไม่เข้าเรียน</span>
                                         {% endif %}
                                     </td>
-                                    <td>{{student.last_attendance or '-'}}</td>
+                                    <td class="last-attendance">{{student.last_attendance or '-'}}</td>
                                 </tr>
                                 {% endfor %}
                             </tbody>
@@ -113,7 +127,7 @@ HTML_TEMPLATE = '''
                                     <th>ชื่อ-นามสกุล</th>
                                 </tr>
                             </thead>
-                            <tbody>
+                            <tbody id="history-body">
                                 {% for record in attendance_records %}
                                 <tr>
                                     <td>{{record.date}}</td>
@@ -130,17 +144,169 @@ HTML_TEMPLATE = '''
         </div>
     </div>
     <script>
-        setTimeout(function(){ location.reload(); }, 30000);
+        // รับเฉพาะรายการเช็คชื่อใหม่ และแก้ไขเฉพาะแถวที่เปลี่ยน แทนการโหลดหน้าใหม่ทั้งหน้า
+        var todayStr = {{ today_str|tojson }};
+        var todayCount = {{ today_count }};
+        var cursor = {{ cursor }};
+
+        function cell(text) {
+            var td = document.createElement('td');
+            td.textContent = text;
+            return td;
+        }
+
+        function applyEvent(ev) {
+            cursor = Math.max(cursor, ev.id);
+            var history = document.getElementById('history-body');
+            var tr = document.createElement('tr');
+            [ev.date, ev.time, ev.student_id, ev.name].forEach(function(v) { tr.appendChild(cell(v)); });
+            history.insertBefore(tr, history.firstChild);
+
+            if (ev.date > todayStr) { location.reload(); return; }  // ขึ้นวันใหม่
+            if (ev.date !== todayStr) { return; }
+            var row = document.querySelector('tr[data-student-id="' + CSS.escape(ev.student_id) + '"]');
+            if (!row) { location.reload(); return; }  // นักศึกษาที่เพิ่งลงทะเบียน
+            var status = row.querySelector('.status');
+            if (!status.querySelector('.bg-success')) {
+                status.innerHTML = '<span class="badge bg-success">เข้าเรียนแล้ว</span>';
+                todayCount += 1;
+                document.getElementById('today-count').textContent = todayCount + ' คน';
+            }
+            row.querySelector('.last-attendance').textContent = ev.time;
+        }
+
+        function poll() {
+            fetch('/api/attendance?after=' + cursor)
+                .then(function(r) { return r.json(); })
+                .then(function(data) { data.events.forEach(applyEvent); })
+                .finally(function() { setTimeout(poll, 5000); });
+        }
+
+        if (window.EventSource) {
+            var source = new EventSource('/api/attendance/stream?after=' + cursor);
+            source.onmessage = function(e) {
+                var ev = JSON.parse(e.data);
+                if (ev.id > cursor) { applyEvent(ev); }
+            };
+        } else {
+            poll();
+        }
     </script>
 </body>
 </html>
 '''
 
+# เทมเพลต HTML สำหรับหน้ารายงานการเข้าเรียน
+REPORT_TEMPLATE = '''
+<!DOCTYPE html>
+<html>
+<head>
+    <title>รายงานการเข้าเรียน</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
+</head>
+<body>
+    <div class="container mt-4">
+        <h1 class="mb-4">รายงานการเข้าเรียน</h1>
+
+        <form class="row g-2 mb-4" method="get">
+            <div class="col-auto"><input type="date" class="form-control" name="start" value="{{start}}"></div>
+            <div class="col-auto"><input type="date" class="form-control" name="end" value="{{end}}"></div>
+            <div class="col-auto">
+                <select class="form-select" name="section">
+                    <option value="">ทุกกลุ่มเรียน</option>
+                    {% for s in sections %}
+                    <option value="{{s.id}}" {% if s.id == section %}selected{% endif %}>{{s.id}} {{s.name or ''}}</option>
+                    {% endfor %}
+                </select>
+            </div>
+            <div class="col-auto"><button class="btn btn-primary">แสดงรายงาน</button></div>
+            <div class="col-auto"><a href="/" class="btn btn-secondary">กลับหน้าหลัก</a></div>
+        </form>
+
+        <div class="row mb-4">
+            <div class="col-md-4"><div class="card"><div class="card-body">
+                <h6>จำนวนวันเรียน</h6><h3>{{days|length}} วัน</h3>
+            </div></div></div>
+            <div class="col-md-4"><div class="card"><div class="card-body">
+                <h6>ผู้เข้าเรียนเฉลี่ยต่อวัน</h6><h3>{{'%.1f'|format(average_present)}} คน</h3>
+            </div></div></div>
+            <div class="col-md-4"><div class="card"><div class="card-body">
+                <h6>อัตราการเข้าเรียนเฉลี่ย</h6><h3>{{'%.1f'|format(average_rate * 100)}}%</h3>
+            </div></div></div>
+        </div>
+
+        <div class="row">
+            <div class="col-md-7">
+                <div class="card">
+                    <div class="card-header bg-success text-white">
+                        <h5 class="mb-0">อัตราการเข้าเรียนรายบุคคล (น้อยไปมาก)</h5>
+                    </div>
+                    <div class="card-body">
+                        <table class="table table-bordered table-hover">
+                            <thead class="table-light">
+                                <tr>
+                                    <th>รหัสนักศึกษา</th>
+                                    <th>ชื่อ-นามสกุล</th>
+                                    <th>เข้าเรียน</th>
+                                    <th>อัตรา</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {% for student in students %}
+                                <tr>
+                                    <td>{{student.id}}</td>
+                                    <td>{{student.name}}</td>
+                                    <td>{{student.attended}} / {{student.class_days}}</td>
+                                    <td>{{'%.1f'|format(student.rate * 100)}}%</td>
+                                </tr>
+                                {% endfor %}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+            </div>
+            <div class="col-md-5">
+                <div class="card">
+                    <div class="card-header bg-warning">
+                        <h5 class="mb-0">จำนวนผู้เข้าเรียนรายวัน</h5>
+                    </div>
+                    <div class="card-body">
+                        <table class="table table-bordered table-hover">
+                            <thead class="table-light">
+                                <tr>
+                                    <th>วันที่</th>
+                                    <th>เข้าเรียน</th>
+                                    <th>อัตรา</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {% for day in days|reverse %}
+                                <tr>
+                                    <td>{{day.date}}</td>
+                                    <td>{{day.present}} / {{day.enrolled}}</td>
+                                    <td>{{'%.1f'|format(day.rate * 100)}}%</td>
+                                </tr>
+                                {% endfor %}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+'''
+
+@lru_cache(maxsize=1024)
 def convert_to_thai_date(date_str):
     """
     แปลงวันที่เป็นรูปแบบภาษาไทย
     - รับวันที่ในรูปแบบ YYYY-MM-DD
     - แปลงเป็นวันที่ภาษาไทย เช่น 1 มกราคม 2567
+    - จำผลไว้ เพราะนักศึกษาส่วนใหญ่ลงทะเบียนในไม่กี่วัน
     """
     thai_months = [
         "มกราคม", "กุมภาพันธ์", "มีนาคม", "เมษายน", "พฤษภาคม", "มิถุนายน",
@@ -156,40 +322,22 @@ def index():
     - แสดงรายชื่อนักศึกษาทั้งหมด
     - แสดงสถานะการเข้าเรียนวันนี้
     - แสดงประวัติการเช็คชื่อ 7 วันล่าสุด
+    - หน้าเว็บรับรายการใหม่ผ่าน /api/attendance/stream แทนการโหลดหน้าใหม่
     """
-    # ดึงข้อมูลนักศึกษาทั้งหมด
-    students = db.get_all_students()
-    
-    # ดึงข้อมูลการเข้าเรียนวันนี้
     today = datetime.now().date()
     today_str = today.strftime('%Y-%m-%d')
-    attendance_records = db.get_recent_attendance(7)  # ดึงข้อมูล 7 วันล่าสุด
     
-    # ประมวลผลข้อมูลนักศึกษา
-    student_list = []
-    for student in students:
-        # ตรวจสอบการเข้าเรียนวันนี้
-        attended_today = any(
-            record['student_id'] == student['id'] and 
-            record['date'] == today_str 
-            for record in attendance_records
-        )
-        
-        # ดึงเวลาเข้าเรียนล่าสุด
-        student_records = [r for r in attendance_records if r['student_id'] == student['id']]
-        last_attendance = student_records[0]['time'] if student_records else None
-        
-        # สร้างข้อมูลสำหรับแสดงผล
-        student_list.append({
-            'id': student['id'],
-            'name': student['name'],
-            'register_date': convert_to_thai_date(student['register_date']),
-            'attended_today': attended_today,
-            'last_attendance': last_attendance
-        })
+    # เก็บ cursor ก่อนดึงข้อมูล เพื่อไม่ให้พลาดรายการที่บันทึกระหว่างสร้างหน้าเว็บ
+    cursor = db.get_last_attendance_id()
     
-    # นับจำนวนผู้เข้าเรียนวันนี้
-    today_count = len([s for s in student_list if s['attended_today']])
+    # ดึงสถานะวันนี้และเวลาเข้าเรียนล่าสุดของนักศึกษาทุกคนด้วย query เดียว
+    summary = db.get_dashboard_summary(today, 7)
+    attendance_records = db.get_recent_attendance(7)  # ดึงข้อมูล 7 วันล่าสุด
+    
+    # แปลงวันที่ลงทะเบียนเป็นภาษาไทย
+    student_list = summary['students']
+    for student in student_list:
+        student['register_date'] = convert_to_thai_date(student['register_date'])
     
     # แสดงผลหน้าเว็บ
     return render_template_string(
@@ -197,10 +345,233 @@ def index():
         students=student_list,
         attendance_records=attendance_records,
         today_thai=convert_to_thai_date(today_str),
-        today_count=today_count,
-        total_students=len(students)
+        today_count=summary['today_count'],
+        total_students=summary['total_students'],
+        today_str=today_str,
+        cursor=cursor
+    )
+
+@app.route('/api/attendance')
+def attendance_events():
+    """
+    คืนค่ารายการเช็คชื่อที่ใหม่กว่า cursor เป็น JSON
+    - รับพารามิเตอร์ after (attendance.id ล่าสุดที่ผู้เรียกมีอยู่แล้ว)
+    - คืนค่า events และ cursor ใหม่สำหรับการเรียกครั้งถัดไป
+    """
+    after = request.args.get('after', 0, type=int)
+    events = db.get_attendance_since(after)
+    return jsonify({
+        'events': events,
+        'cursor': events[-1]['id'] if events else after
+    })
+
+@app.route('/api/attendance/stream')
+def attendance_stream():
+    """
+    ส่งรายการเช็คชื่อใหม่แบบ Server-Sent Events
+    - เริ่มจาก cursor ใน Last-Event-ID (เมื่อเบราว์เซอร์เชื่อมต่อใหม่) หรือพารามิเตอร์ after
+    - id ของแต่ละ event คือ attendance.id
+    """
+    after = request.headers.get('Last-Event-ID', type=int)
+    if after is None:
+        after = request.args.get('after', 0, type=int)
+
+    def generate(cursor):
+        last_sent = time.monotonic()
+        while True:
+            events = db.get_attendance_since(cursor)
+            for event in events:
+                cursor = event['id']
+                yield f"id: {cursor}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent > STREAM_HEARTBEAT:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    return Response(generate(after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/attendance/history')
+def attendance_history():
+    """
+    ประวัติการเข้าเรียนแบบแบ่งหน้า (ล่าสุดก่อน) เป็น JSON
+    - กรองด้วยพารามิเตอร์ student_id, start และ end (YYYY-MM-DD)
+    - limit คือจำนวนรายการต่อหน้า (ไม่เกิน HISTORY_PAGE_LIMIT)
+    - before คือ cursor "date,time,id" จาก next ของหน้าก่อน (แบ่งหน้าแบบ keyset ไม่ใช้ OFFSET)
+    """
+    limit = min(max(1, request.args.get('limit', 50, type=int)), HISTORY_PAGE_LIMIT)
+    before = None
+    if request.args.get('before'):
+        try:
+            date, time_str, last_id = request.args['before'].split(',')
+            before = (date, time_str, int(last_id))
+        except ValueError:
+            return jsonify({'error': 'before must be "date,time,id"'}), 400
+    records = db.search_attendance(student_id=request.args.get('student_id'),
+                                   start_date=request.args.get('start'),
+                                   end_date=request.args.get('end'),
+                                   limit=limit, before=before)
+    last = records[-1] if len(records) == limit else None
+    return jsonify({
+        'records': records,
+        'next': f"{last['date']},{last['time']},{last['id']}" if last else None
+    })
+
+# ฟังก์ชันอ่านช่วงวันที่ของรายงาน
+def _report_range():
+    """
+    อ่านพารามิเตอร์ start และ end (YYYY-MM-DD) ของรายงาน
+    - ค่าเริ่มต้นคือ REPORT_DEFAULT_DAYS วันล่าสุดจนถึงวันนี้
+    - คืนค่า (start, end) เป็น datetime.date (ValueError ถ้ารูปแบบผิดหรือ start อยู่หลัง end)
+    """
+    end = request.args.get('end')
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else datetime.now().date()
+    start = request.args.get('start')
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=REPORT_DEFAULT_DAYS)
+    if start > end:
+        raise ValueError('start is after end')
+    return start, end
+
+@app.route('/report')
+def report():
+    """
+    หน้ารายงานการเข้าเรียนทั้งภาคเรียน
+    - กรองด้วยพารามิเตอร์ start, end และ section
+    - อ่านจากตารางสรุปรายวันและรายเดือน จึงไม่ต้องอ่านรายการเข้าเรียนทั้งหมดทุกครั้งที่เปิดหน้า
+    """
+    try:
+        start, end = _report_range()
+    except ValueError:
+        return "start and end must be YYYY-MM-DD with start <= end", 400
+    section = request.args.get('section') or None
+    days = db.get_daily_totals(start, end)
+    students = db.get_student_rates(start, end, section)
+    return render_template_string(
+        REPORT_TEMPLATE,
+        start=start, end=end, section=section,
+        sections=db.get_sections(),
+        days=days,
+        students=students,
+        average_present=sum(d['present'] for d in days) / len(days) if days else 0.0,
+        average_rate=sum(s['rate'] for s in students) / len(students) if students else 0.0
     )
 
+@app.route('/api/report/daily')
+def report_daily():
+    """จำนวนผู้เข้าเรียนรายวันในช่วง start ถึง end เป็น JSON (สำหรับกราฟแนวโน้ม)"""
+    try:
+        start, end = _report_range()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD with start <= end'}), 400
+    return jsonify({'start': str(start), 'end': str(end), 'days': db.get_daily_totals(start, end)})
+
+@app.route('/api/report/students')
+def report_students():
+    """อัตราการเข้าเรียนของนักศึกษาแต่ละคนในช่วง start ถึง end เป็น JSON (กรองด้วย section ได้)"""
+    try:
+        start, end = _report_range()
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD with start <= end'}), 400
+    section = request.args.get('section') or None
+    return jsonify({'start': str(start), 'end': str(end), 'section': section,
+                    'students': db.get_student_rates(start, end, section)})
+
+# ฟังก์ชันสร้าง CSV ทีละส่วน
+def _generate_csv(rows):
+    """แปลงแถวเป็น CSV (UTF-8 พร้อม BOM ให้ Excel อ่านภาษาไทยได้) และส่งทุก EXPORT_FLUSH_ROWS แถว"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+# ฟังก์ชันสร้างไฟล์ XLSX แล้วส่งทีละส่วน
+def _generate_xlsx(rows, workbook_class):
+    """
+    เขียนแถวลงไฟล์ XLSX ชั่วคราวด้วยโหมด write-only ของ openpyxl (ไม่เก็บทั้งตารางในหน่วยความจำ)
+    แล้วส่งไฟล์ทีละ 64 KB (ไฟล์ XLSX เป็น zip จึงต้องเขียนให้เสร็จก่อนส่ง)
+    """
+    workbook = workbook_class(write_only=True)
+    sheet = workbook.create_sheet('attendance')
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            yield chunk
+
+@app.route('/export/attendance.<fmt>')
+def export_attendance(fmt):
+    """
+    ดาวน์โหลดข้อมูลการเข้าเรียนเป็น CSV หรือ XLSX (เรียงจากเก่าไปใหม่)
+    - กรองด้วยพารามิเตอร์ student_id, start และ end (YYYY-MM-DD) เช่น ข้อมูลทั้งปีสำหรับงานทะเบียน
+    - อ่านข้อมูลจากฐานข้อมูลทีละ batch และส่งออกทีละส่วน หน่วยความจำจึงคงที่ไม่ว่าจะมีกี่แถว
+    - ใช้การเชื่อมต่อฐานข้อมูลแยก จึงไม่ขวางหน้า dashboard ระหว่าง export
+    """
+    if fmt not in ('csv', 'xlsx'):
+        return "Unsupported export format (use csv or xlsx)", 404
+    start, end = request.args.get('start'), request.args.get('end')
+    rows = db.iter_attendance(student_id=request.args.get('student_id'),
+                              start_date=start, end_date=end)
+    filename = f"attendance_{start or 'all'}_{end or 'all'}.{fmt}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"',
+               'X-Accel-Buffering': 'no'}
+    if fmt == 'csv':
+        return Response(_generate_csv(rows), mimetype='text/csv; charset=utf-8',
+                        headers=headers)
+    try:
+        from openpyxl import Workbook  # ต้องใช้เฉพาะการ export แบบ XLSX
+    except ImportError:
+        return "XLSX export requires openpyxl (pip install openpyxl)", 501
+    return Response(_generate_xlsx(rows, Workbook), headers=headers,
+                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+@app.route('/metrics')
+def metrics():
+    """
+    สถิติประสิทธิภาพในรูปแบบ Prometheus text exposition
+    - เวลาของแต่ละขั้นตอนการรู้จำ (capture, detect, preprocess, predict, record) และตัวนับ
+      อ่านจาก snapshot ที่โปรแกรมรู้จำใบหน้าบันทึกไว้ทุกไม่กี่วินาที
+    - ใบหน้าต่อเฟรมและการรู้จำต่อวินาทีคำนวณจากช่วงระหว่าง snapshot สองครั้งล่าสุด
+      (ใช้ rate(scancheck_recognition_recognitions_total[1m]) ใน Prometheus สำหรับช่วงอื่น)
+    - เวลาของแต่ละ query ของฐานข้อมูลใน web_app
+    """
+    lines = render_prometheus(db.metrics.snapshot(), 'scancheck_db_query_seconds', 'query')
+    snapshot = load_snapshot()
+    if snapshot:
+        lines += render_prometheus(snapshot, 'scancheck_recognition_stage_seconds', 'stage',
+                                   counter_prefix='scancheck_recognition_')
+        window = snapshot.get('window')
+        if window:
+            counters = window['counters']
+            frames = counters.get('frames', 0)
+            seconds = window['seconds']
+            lines += [
+                "# TYPE scancheck_recognition_faces_per_frame gauge",
+                f"scancheck_recognition_faces_per_frame {counters.get('faces', 0) / frames if frames else 0:.3f}",
+                "# TYPE scancheck_recognition_recognitions_per_second gauge",
+                f"scancheck_recognition_recognitions_per_second "
+                f"{counters.get('recognitions', 0) / seconds if seconds > 0 else 0:.3f}",
+            ]
+        lines += [
+            "# TYPE scancheck_recognition_last_update_timestamp_seconds gauge",
+            f"scancheck_recognition_last_update_timestamp_seconds {snapshot['updated_at']:.0f}",
+        ]
+    return Response("\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
+
 @app.route('/clear')
 def clear_attendance():
     """
@@ -212,4 +583,4 @@ def clear_attendance():
     return redirect(url_for('index'))
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)  # เริ่มต้นเซิร์ฟเวอร์ที่พอร์ต 5000
+    app.run(debug=True, port=5000, threaded=True)  # เริ่มต้นเซิร์ฟเวอร์ที่พอร์ต 5000 (export ไม่ขวางหน้าอื่น)